@@ -2,18 +2,95 @@
 NexCast Backend API
 FastAPI server with WebSocket for live commentary
 """
+import asyncio
 import os
+import signal
+import threading
+from contextlib import asynccontextmanager
 from pathlib import Path
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routes.ws_stream import router as ws_router
+from fastapi.responses import JSONResponse, Response
 
-# Load environment variables
+# Load environment variables (before importing services that read settings at import time)
 env_path = Path(__file__).parent / "config" / ".env"
 load_dotenv(env_path)
 
-app = FastAPI(title="NexCast API", version="1.0.0")
+from .routes.audio import router as audio_router
+from .routes.ws_stream import router as ws_router
+from .services import metrics
+from .services.artifacts import get_audio_artifacts
+from .services.history import get_history_writer
+from .services.pipeline import get_llm_service, get_tts_service, get_vision_service
+from .services.loop_monitor import LoopLagMonitor
+from .services.sessions import get_session_registry
+
+loop_monitor = LoopLagMonitor()
+
+
+def _drain_on_sigterm(registry, timeout: float) -> None:
+    """
+    Let live sessions finish their in-flight frames before uvicorn shuts down
+
+    uvicorn closes every WebSocket as soon as it handles SIGTERM, so we take
+    the signal first, drain the registry, then hand it on to uvicorn.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return  # Embedded (e.g. TestClient); signals are only delivered to the main thread
+    server_handler = signal.getsignal(signal.SIGTERM)
+    if not callable(server_handler) or timeout <= 0:
+        return
+    loop = asyncio.get_running_loop()
+
+    async def drain_then_exit(sig, frame):
+        await registry.drain(timeout)
+        server_handler(sig, frame)
+
+    def handle(sig, frame):
+        signal.signal(signal.SIGTERM, server_handler)  # A second SIGTERM exits immediately
+        loop.call_soon_threadsafe(lambda: loop.create_task(drain_then_exit(sig, frame)))
+
+    signal.signal(signal.SIGTERM, handle)
+
+
+def _require_absolute_audio_urls(history, artifacts) -> None:
+    """
+    History rows are read back through another origin (the history API) long
+    after this node is gone, so the audio links written into them must be
+    absolute: refuse to start with a relative AUDIO_BASE_URL
+    """
+    if history.enabled and artifacts.enabled and not urlsplit(artifacts.base_url).netloc:
+        raise RuntimeError(
+            "AUDIO_BASE_URL must be an absolute URL (https://host/...) when both "
+            "HISTORY_STORE and ARTIFACT_STORE are enabled"
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the idle-session reaper, loop-lag monitor and history writer for the lifetime of the server"""
+    registry = get_session_registry()
+    history = get_history_writer()
+    _require_absolute_audio_urls(history, get_audio_artifacts())
+    reaper = asyncio.create_task(registry.run_reaper())
+    monitor = asyncio.create_task(loop_monitor.run())
+    writer = asyncio.create_task(history.run())
+    _drain_on_sigterm(registry, float(os.getenv("DRAIN_TIMEOUT", "20")))
+    yield
+    reaper.cancel()
+    monitor.cancel()
+    writer.cancel()
+    # Let a cancelled write put its batch back before the final flush
+    await asyncio.gather(writer, return_exceptions=True)
+    await history.close()
+    await get_audio_artifacts().close()
+    await registry.store.close()
+    metrics.worker_exited()
+
+
+app = FastAPI(title="NexCast API", version="1.0.0", lifespan=lifespan)
 
 # CORS configuration for frontend
 app.add_middleware(
@@ -24,11 +101,47 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
-# Include WebSocket router
+# Include WebSocket router and stored audio clips
 app.include_router(ws_router)
+app.include_router(audio_router)
 
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (503 while draining for shutdown)"""
+    if get_session_registry().draining:
+        return JSONResponse({"status": "draining", "service": "nexcast-api"}, status_code=503)
     return {"status": "healthy", "service": "nexcast-api"}
+
+
+@app.get("/stats")
+async def stats():
+    """Session, provider queue and cache statistics for tuning"""
+    return {
+        "sessions": get_session_registry().stats(),
+        "event_loop": loop_monitor.stats(),
+        # Queue wait vs. in-flight tells saturation (our limits) apart from provider slowness
+        "providers": {
+            "vision": get_vision_service().limiter.stats(),
+            "llm": get_llm_service().limiter.stats(),
+            "tts": get_tts_service().limiter.stats()
+        },
+        # Deadline misses, hedges and fallbacks per stage
+        "deadlines": {
+            "vision": get_vision_service().policy.stats(),
+            "llm": get_llm_service().policy.stats(),
+            "tts": get_tts_service().policy.stats()
+        },
+        # Write-behind backlog: pending/oldest_pending_seconds growing means the database is behind
+        "history": get_history_writer().stats(),
+        "audio_artifacts": get_audio_artifacts().stats(),
+        "vision_cache": get_vision_service().cache.stats(),
+        "tts_cache": get_tts_service().cache.stats()
+    }
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: per-stage latency histograms, gauges and byte counters"""
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
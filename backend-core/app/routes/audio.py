@@ -0,0 +1,77 @@
+"""
+Audio artifact endpoint
+Serves stored clips by id with range requests and long-lived cache headers
+"""
+import re
+
+from fastapi import APIRouter, Request, Response
+
+from ..services.artifacts import AUDIO_CONTENT_TYPE, get_audio_artifacts
+
+router = APIRouter()
+
+# Clips never change under an id (it's their content hash)
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_CLIP_ID = re.compile(r"^[0-9a-f]{32}$")
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Resolve a single-range Range header against the clip size
+
+    Returns:
+        (start, end) inclusive, or None if the range can't be satisfied
+    """
+    match = _RANGE.match(header.strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return None
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return None
+    return start, end
+
+
+@router.get("/audio/{clip_id}.mp3")
+async def get_audio(clip_id: str, request: Request):
+    """
+    A stored clip (MP3)
+
+    Supports If-None-Match (the ETag is the clip id) and single byte ranges,
+    so players can seek and CDNs can cache clips forever.
+    """
+    artifacts = get_audio_artifacts()
+    if not artifacts.enabled or not _CLIP_ID.match(clip_id):
+        return Response(status_code=404)
+
+    etag = f'"{clip_id}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    size = await artifacts.size(clip_id)
+    if size is None:
+        return Response(status_code=404)
+
+    range_header = request.headers.get("range")
+    if range_header is None or size == 0:
+        body = await artifacts.read(clip_id, 0, size - 1) if size else b""
+        return Response(body, media_type=AUDIO_CONTENT_TYPE, headers=headers)
+
+    byte_range = _parse_range(range_header, size)
+    if byte_range is None:
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    body = await artifacts.read(clip_id, start, end)
+    return Response(body, status_code=206, media_type=AUDIO_CONTENT_TYPE, headers=headers)
@@ -0,0 +1,46 @@
+"""
+Binary WebSocket protocol
+Raw JPEG frames in, raw MP3 audio out, behind a small fixed header
+
+Negotiated in the init handshake: {"type": "init", "protocol": "binary", ...}
+Every binary message starts with a 5-byte header followed by the payload:
+    kind (uint8) | index (uint32, big-endian) | payload...
+
+    FRAME        client -> server   index = client frame sequence number
+    AUDIO        server -> client   index = sequence number of the source frame
+    AUDIO_CHUNK  server -> client   index = segment number (streaming mode)
+
+Control messages (init, ready, audio_end, ...) stay JSON text messages.
+"""
+import struct
+
+PROTOCOL_JSON = "json"
+PROTOCOL_BINARY = "binary"
+
+FRAME = 0x01
+AUDIO = 0x02
+AUDIO_CHUNK = 0x03
+
+_HEADER = struct.Struct("!BI")
+HEADER_SIZE = _HEADER.size
+
+
+def pack(kind: int, index: int, payload: bytes) -> bytes:
+    """Prefix payload with the binary message header"""
+    return _HEADER.pack(kind, index & 0xFFFFFFFF) + payload
+
+
+def unpack(message: bytes) -> tuple[int, int, bytes]:
+    """
+    Split a binary message into header fields and payload
+
+    Returns:
+        tuple[int, int, bytes]: (kind, index, payload)
+
+    Raises:
+        ValueError: Message is shorter than the header
+    """
+    if len(message) < HEADER_SIZE:
+        raise ValueError(f"Binary message too short: {len(message)} bytes")
+    kind, index = _HEADER.unpack_from(message)
+    return kind, index, message[HEADER_SIZE:]
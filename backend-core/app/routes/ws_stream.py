@@ -2,14 +2,285 @@
 WebSocket endpoint for real-time frame processing
 Receives frames, sends back audio commentary
 """
+import asyncio
+import base64
+import json
+import time
+from typing import Callable
+
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
-from ..services.pipeline import process_frame
+from . import protocol
+from ..services import metrics, mp3
+from ..services.artifacts import get_audio_artifacts
+from ..services.history import get_history_writer
+from ..services.pipeline import DescribedFrame, describe_frame, speak, speak_streaming
+from ..services.sessions import SessionState, get_session_registry
 
 router = APIRouter()
 
-# In-memory session storage: {session_id: {"preferences": {...}}}
-sessions = {}
+
+async def _receive_frame(websocket: WebSocket, session: SessionState) -> tuple[int, bytes | str] | None:
+    """
+    Read the next message and extract a frame from either protocol
+
+    Client playback reports (an "audio_queued" field on JSON frames, or a
+    {"type": "playback", "audio_queued": seconds} message) go to the pacer.
+
+    Returns:
+        (sequence number, JPEG bytes or base64 string), or None for non-frame
+        and malformed messages (dropped, so one bad message can't end the session)
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+
+    if message.get("bytes") is not None:
+        metrics.BYTES_IN.labels("binary").inc(len(message["bytes"]))
+        try:
+            kind, seq, payload = protocol.unpack(message["bytes"])
+        except ValueError as e:
+            print(f"[{session.session_id}] Dropped malformed binary message: {e}")
+            return None
+        return (seq, payload) if kind == protocol.FRAME else None
+
+    metrics.BYTES_IN.labels("json").inc(len(message["text"]))
+    try:
+        data = json.loads(message["text"])
+        if not isinstance(data, dict):
+            raise ValueError(f"expected an object, got {type(data).__name__}")
+    except ValueError as e:
+        print(f"[{session.session_id}] Dropped malformed JSON message: {e}")
+        return None
+    if "audio_queued" in data:
+        try:
+            session.pacer.client_report(data["audio_queued"])
+        except ValueError as e:
+            print(f"[{session.session_id}] Ignored playback report: {e}")
+    if data.get("type") != "frame":
+        return None
+    frame, seq = data.get("frame"), data.get("seq", 0)
+    if not isinstance(frame, str) or not frame:
+        print(f"[{session.session_id}] Dropped frame message without a base64 frame")
+        return None
+    if not isinstance(seq, int) or isinstance(seq, bool) or not 0 <= seq < 2 ** 32:
+        print(f"[{session.session_id}] Dropped frame message with bad seq: {seq!r}")
+        return None
+    return seq, frame
+
+
+async def _send_bytes(websocket: WebSocket, data: bytes):
+    """send_bytes, timed and counted"""
+    with metrics.timed("send", "websocket"):
+        await websocket.send_bytes(data)
+    metrics.BYTES_OUT.labels("binary").inc(len(data))
+
+
+async def _send_json(websocket: WebSocket, message: dict):
+    """send_json (same encoding as Starlette's), timed and counted"""
+    text = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+    with metrics.timed("send", "websocket"):
+        await websocket.send_text(text)
+    metrics.BYTES_OUT.labels("json").inc(len(text))
+
+
+def _b64(audio: bytes) -> str:
+    """Base64 audio for JSON clients, timed"""
+    with metrics.timed("encode"):
+        return base64.b64encode(audio).decode("utf-8")
+
+
+def _audio_message(session: SessionState, seq: int, audio: bytes, clip_id: str | None) -> dict:
+    """
+    JSON audio message: inline base64, plus the clip's id and URL when the
+    pipeline saved it to the artifact store (audio_delivery = "url" sends only those)
+    """
+    if clip_id is None:
+        return {"type": "audio", "audio": _b64(audio)}
+    message = {"type": "audio", "seq": seq, "audio_id": clip_id, "url": get_audio_artifacts().url(clip_id)}
+    if session.preferences.get("audio_delivery") != "url":
+        message["audio"] = _b64(audio)
+    return message
+
+
+async def _describe(
+    session: SessionState,
+    seq: int,
+    frame: bytes | str
+) -> tuple[int | None, DescribedFrame | None]:
+    """
+    Front stage: dedup, normalize and vision
+
+    Returns:
+        (frame hash for session.dedup.commit(), description or None if the screen hasn't visibly changed)
+    """
+    duplicate, frame_hash = await session.dedup.check(frame)
+    session.pacer.observe_scene(session.dedup.last_distance)
+    if duplicate:
+        print(f"[{session.session_id}] Frame {seq} unchanged, skipped")
+        metrics.FRAMES.labels("unchanged").inc()
+        return None, None
+    print(f"[{session.session_id}] Processing frame...")
+    return frame_hash, await describe_frame(session, frame, frame_hash)
+
+
+async def _send_pace(websocket: WebSocket, session: SessionState):
+    """Push a new recommended capture interval if it has moved (adaptive_pace clients only)"""
+    if not session.preferences.get("adaptive_pace"):
+        return
+    message = session.pacer.update()
+    if message is not None:
+        print(f"[{session.session_id}] Pace {message['interval_ms']} ms ({message['reason']})")
+        await _send_json(websocket, message)
+
+
+async def _send_audio(
+    websocket: WebSocket,
+    session: SessionState,
+    seq: int,
+    described: DescribedFrame | None,
+    started: float,
+    frame_hash: int | None = None,
+    commit: Callable[[], None] = lambda: None
+):
+    """
+    Back stage: commentary and speech for a described frame, sent as it's produced
+
+    Once the frame's first audio is ready it can no longer be cancelled
+    (commit) and becomes the dedup reference for later frames
+    """
+    if described is None:
+        await _send_json(websocket, {"type": "no_change", "seq": seq})
+        await _send_pace(websocket, session)
+        return
+    description, comment, comment_model = described
+
+    binary = session.protocol == protocol.PROTOCOL_BINARY
+    if session.preferences.get("streaming"):
+        # Forward audio chunks as soon as TTS produces them
+        segments = 0
+        async for segment, audio_chunk in speak_streaming(session, description, comment, comment_model):
+            commit()
+            session.dedup.commit(frame_hash)
+            if not segments:
+                metrics.FRAME_SECONDS.labels("streaming").observe(time.perf_counter() - started)
+            segments = segment + 1
+            session.pacer.audio_sent(mp3.duration(audio_chunk))
+            if binary:
+                await _send_bytes(websocket, protocol.pack(protocol.AUDIO_CHUNK, segment, audio_chunk))
+            else:
+                await _send_json(websocket, {"type": "audio_chunk", "segment": segment, "audio": _b64(audio_chunk)})
+        await _send_json(websocket, {"type": "audio_end", "seq": seq, "segments": segments})
+    else:
+        audio_bytes, clip_id = await speak(session, description, comment, comment_model)
+        commit()
+        session.dedup.commit(frame_hash)
+
+        # Send audio back
+        if binary:
+            await _send_bytes(websocket, protocol.pack(protocol.AUDIO, seq, audio_bytes))
+        else:
+            await _send_json(websocket, _audio_message(session, seq, audio_bytes, clip_id))
+        session.pacer.audio_sent(mp3.duration(audio_bytes))
+        metrics.FRAME_SECONDS.labels("complete").observe(time.perf_counter() - started)
+    metrics.FRAMES.labels("answered").inc()
+    session.pacer.observe_latency(time.perf_counter() - started)
+    await _send_pace(websocket, session)
+
+
+async def _send_commentary(websocket: WebSocket, session: SessionState, seq: int, frame: bytes | str):
+    """Run one frame through the pipeline and send its audio back"""
+    started = time.perf_counter()
+    frame_hash, described = await _describe(session, seq, frame)
+    await _send_audio(websocket, session, seq, described, started, frame_hash, commit=session.ingest.commit)
+
+
+def _frame_started(session: SessionState) -> None:
+    session.frames_in_flight += 1
+    metrics.IN_FLIGHT_FRAMES.inc()
+
+
+def _frame_finished(session: SessionState) -> None:
+    session.frames_in_flight -= 1
+    metrics.IN_FLIGHT_FRAMES.dec()
+
+
+async def _frame_worker(websocket: WebSocket, session: SessionState):
+    """Process the newest frame whenever the previous one is done"""
+    slot = session.ingest
+    while True:
+        seq, frame = await slot.get()
+        _frame_started(session)
+        try:
+            if not await slot.run(_send_commentary(websocket, session, seq, frame)):
+                print(f"[{session.session_id}] Frame {seq} superseded by a newer frame")
+                metrics.FRAMES.labels("superseded").inc()
+        except Exception as e:
+            # One failed frame shouldn't end the session; the next frame gets a fresh try
+            print(f"[{session.session_id}] Error processing frame {seq}: {e}")
+            metrics.FRAMES.labels("failed").inc()
+        finally:
+            _frame_finished(session)
+
+
+async def _pipelined_worker(websocket: WebSocket, session: SessionState):
+    """
+    Describe frame N+1 while frame N's commentary and speech are produced
+
+    Vision runs here, one frame at a time in order (each description extends
+    the rolling context). A single sender task speaks and sends described
+    frames in that same order, so audio never reorders. At most
+    session.pipeline_depth frames are in flight; until one finishes, newer
+    frames keep replacing each other in the slot (latest still wins).
+
+    The slot's cancel policy covers the vision stage only: once a frame is
+    described it is always spoken, because the next frame's vision already
+    built on its description.
+    """
+    slot = session.ingest
+    capacity = asyncio.Semaphore(session.pipeline_depth)
+    described: asyncio.Queue[tuple[int, float, tuple[int | None, DescribedFrame | None]]] = asyncio.Queue()
+
+    async def send():
+        while True:
+            seq, started, (frame_hash, scene) = await described.get()
+            try:
+                await _send_audio(websocket, session, seq, scene, started, frame_hash)
+            except Exception as e:
+                print(f"[{session.session_id}] Error processing frame {seq}: {e}")
+                metrics.FRAMES.labels("failed").inc()
+            finally:
+                _frame_finished(session)
+                capacity.release()
+
+    async def describe(seq: int, frame: bytes | str, started: float):
+        described.put_nowait((seq, started, await _describe(session, seq, frame)))
+
+    sender = asyncio.create_task(send())
+    try:
+        while True:
+            await capacity.acquire()
+            seq, frame = await slot.get()
+            _frame_started(session)
+            handed_off = False
+            try:
+                handed_off = await slot.run(describe(seq, frame, time.perf_counter()))
+                if not handed_off:
+                    print(f"[{session.session_id}] Frame {seq} superseded by a newer frame")
+                    metrics.FRAMES.labels("superseded").inc()
+            except Exception as e:
+                print(f"[{session.session_id}] Error processing frame {seq}: {e}")
+                metrics.FRAMES.labels("failed").inc()
+            finally:
+                if not handed_off:
+                    _frame_finished(session)
+                    capacity.release()
+    finally:
+        sender.cancel()
+        # Described frames the sender never got to are finished too (keeps the in-flight gauge true)
+        while not described.empty():
+            described.get_nowait()
+            _frame_finished(session)
 
 
 @router.websocket("/ws/{session_id}")
@@ -22,40 +293,95 @@ async def websocket_stream(websocket: WebSocket, session_id: int):
         2. Client sends initial preferences: {"type": "init", "preferences": {...}}
         3. Client sends frames: {"type": "frame", "frame": "base64..."}
         4. Server responds with: {"type": "audio", "audio": "base64..."}
+           or {"type": "no_change", "seq": n} if the frame matches the last processed one
+
+    Streaming mode (preferences.streaming = true) replaces step 4 with:
+        - {"type": "audio_chunk", "segment": n, "audio": "base64..."} as audio arrives
+        - {"type": "audio_end", "seq": n, "segments": n} once the frame's commentary is complete
+
+    Binary mode ({"type": "init", "protocol": "binary", ...}, confirmed in "ready")
+    carries frames and audio as raw bytes in binary messages instead of base64
+    JSON; see protocol.py for the header layout. Control messages stay JSON.
+
+    Frames are read continuously while the previous one is processed; only the
+    newest unprocessed frame is kept. With frame_policy = "cancel" a newer frame
+    also cancels in-flight work that hasn't started sending audio.
+
+    preferences.commentary_mode = "fused" (COMMENTARY_MODE) has Gemini write the
+    commentary in the same call that describes the frame, skipping Grok.
+
+    With pipeline_depth > 1 (PIPELINE_DEPTH, default 2) vision for the next
+    frame overlaps commentary and speech for the current one; responses
+    still arrive in frame order.
+
+    With an artifact store (ARTIFACT_STORE) audio messages also carry
+    "audio_id" and "url" (GET /audio/<id>.mp3); preferences.audio_delivery =
+    "url" drops the inline base64 and the client fetches the clip instead.
+
+    With preferences.adaptive_pace = true the server also sends
+    {"type": "pace", "interval_ms": n, "reason": "..."} whenever its recommended
+    capture interval moves (see pacing.py). Clients should capture at that
+    interval and may report queued playback with "audio_queued" (seconds) on
+    frame messages or in {"type": "playback", "audio_queued": s}.
     """
     await websocket.accept()
     print(f"[{session_id}] WebSocket connected")
 
+    registry = get_session_registry()
+    session = None
     try:
         # Wait for initial handshake with preferences
         init_data = await websocket.receive_json()
-        if init_data.get("type") == "init":
-            sessions[session_id] = {"preferences": init_data.get("preferences", {})}
-            print(f"[{session_id}] Session initialized with preferences")
-            await websocket.send_json({"type": "ready"})
+        if init_data.get("type") != "init":
+            await websocket.close(code=1002, reason="Expected init")
+            return
 
-        # Main frame processing loop
-        while True:
-            data = await websocket.receive_json()
+        # Shutting down: send the client to another worker/node
+        if registry.draining:
+            await websocket.close(code=1013, reason="Server restarting")
+            return
+
+        # Unknown protocols fall back to JSON so old clients keep working
+        requested = init_data.get("protocol", protocol.PROTOCOL_JSON)
+        wire = protocol.PROTOCOL_BINARY if requested == protocol.PROTOCOL_BINARY else protocol.PROTOCOL_JSON
+        session = await registry.open(session_id, init_data.get("preferences", {}), wire)
 
-            if data.get("type") == "frame":
-                frame_base64 = data["frame"]
-                preferences = sessions[session_id]["preferences"]
+        # Registry evictions (idle TTL, capacity, reconnect elsewhere, shutdown) close this socket
+        def on_evict(reason: str):
+            code = {"capacity": 1013, "shutdown": 1012}.get(reason, 1001)
+            asyncio.create_task(websocket.close(code=code, reason=f"Session evicted: {reason}"))
+        session.on_evict = on_evict
+        metrics.ACTIVE_SESSIONS.inc()
 
-                # Process through pipeline
-                print(f"[{session_id}] Processing frame...")
-                audio_base64 = await process_frame(session_id, frame_base64, preferences)
+        print(f"[{session_id}] Session initialized with preferences ({wire} protocol)")
+        await websocket.send_json({"type": "ready", "protocol": wire})
 
-                # Send audio back
-                await websocket.send_json({"type": "audio", "audio": audio_base64})
+        # Receive frames into the session slot; the worker always takes the newest
+        run_frames = _pipelined_worker if session.pipeline_depth > 1 else _frame_worker
+        worker = asyncio.create_task(run_frames(websocket, session))
+        try:
+            while True:
+                received = await _receive_frame(websocket, session)
+                if received is not None and not registry.draining:
+                    registry.get(session_id)  # Mark active for idle/LRU eviction
+                    session.ingest.put(received)
+        finally:
+            worker.cancel()
+            print(f"[{session_id}] Frame stats: {session.ingest.stats()}, dedup: {session.dedup.stats()}, "
+                  f"pace: {session.pacer.stats()}")
 
     except WebSocketDisconnect:
-        # Cleanup session
-        if session_id in sessions:
-            del sessions[session_id]
         print(f"[{session_id}] WebSocket disconnected")
     except Exception as e:
         print(f"[{session_id}] Error: {e}")
-        if session_id in sessions:
-            del sessions[session_id]
         raise
+    finally:
+        # Explicit teardown: drop all per-session state on this node
+        if session is not None:
+            metrics.ACTIVE_SESSIONS.dec()
+            await registry.release(session_id, session)
+            try:
+                # Persist this session's queued commentaries now that the socket is closed
+                await get_history_writer().flush()
+            except Exception as e:
+                print(f"[{session_id}] History flush failed: {e}")
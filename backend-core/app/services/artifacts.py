@@ -0,0 +1,336 @@
+"""
+Audio Artifact Store
+Keep every synthesized clip under a content-hash key so clients and history
+replay can fetch it by URL instead of receiving (or re-synthesizing) it inline
+
+Clips are written in the background: save() hashes the clip, holds it in
+memory and returns its id at once, and the write to the backend happens off
+the audio path. Until the write lands, reads are served from memory, so a
+URL is valid as soon as it's handed out. Identical clips (cached TTS) map to
+the same key and are only written once.
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+from . import metrics
+
+ARTIFACTS_NONE = "none"    # Audio is only sent inline
+ARTIFACTS_LOCAL = "local"  # Directory on this node (single node, or a shared volume)
+ARTIFACTS_S3 = "s3"        # Any S3-compatible object store (AWS S3, MinIO, R2, ...)
+
+AUDIO_CONTENT_TYPE = "audio/mpeg"
+_EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+
+
+def audio_id(audio: bytes) -> str:
+    """Content hash of a clip (128 bits of SHA-256, hex)"""
+    return hashlib.sha256(audio).hexdigest()[:32]
+
+
+def artifact_key(clip_id: str) -> str:
+    """Storage key of a clip, fanned out by hash prefix"""
+    return f"{clip_id[:2]}/{clip_id}.mp3"
+
+
+class ArtifactStore(ABC):
+    """Backend interface; keys are immutable once written"""
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes, content_type: str) -> None:
+        """Store an object (overwriting is harmless: same key, same content)"""
+
+    @abstractmethod
+    async def size(self, key: str) -> int | None:
+        """Object size in bytes, or None if it doesn't exist"""
+
+    @abstractmethod
+    async def read(self, key: str, start: int, end: int) -> bytes:
+        """Bytes start..end inclusive of an existing object"""
+
+    async def close(self) -> None:
+        """Release connections"""
+
+
+class LocalArtifactStore(ArtifactStore):
+    """Objects as files under a directory"""
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: Root directory (created if missing)
+        """
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        path = (self._dir / key).resolve()
+        if not path.is_relative_to(self._dir.resolve()):
+            raise ValueError(f"Invalid artifact key: {key}")
+        return path
+
+    def _write(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so readers never see a partial clip
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+
+    def _read(self, key: str, start: int, end: int) -> bytes:
+        with open(self._path(key), "rb") as f:
+            f.seek(start)
+            return f.read(end - start + 1)
+
+    async def put(self, key: str, data: bytes, content_type: str) -> None:
+        await asyncio.to_thread(self._write, key, data)
+
+    async def size(self, key: str) -> int | None:
+        try:
+            return (await asyncio.to_thread(self._path(key).stat)).st_size
+        except FileNotFoundError:
+            return None
+
+    async def read(self, key: str, start: int, end: int) -> bytes:
+        return await asyncio.to_thread(self._read, key, start, end)
+
+
+def sign_v4(
+    method: str,
+    url: str,
+    headers: dict[str, str],
+    payload_hash: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    now: datetime | None = None,
+    service: str = "s3"
+) -> dict[str, str]:
+    """
+    AWS Signature Version 4 headers for a request (S3 and compatible stores)
+
+    Args:
+        url: Full request URL (path already percent-encoded as it will be sent)
+        headers: Extra headers to sign (e.g. range, content-type)
+        payload_hash: Hex SHA-256 of the body
+
+    Returns:
+        dict[str, str]: headers plus host, x-amz-date, x-amz-content-sha256 and authorization
+    """
+    now = now or datetime.now(timezone.utc)
+    amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+    scope = f"{amz_date[:8]}/{region}/{service}/aws4_request"
+    parts = urlsplit(url)
+
+    signed = {k.lower(): v.strip() for k, v in headers.items()}
+    signed.update({"host": parts.netloc, "x-amz-content-sha256": payload_hash, "x-amz-date": amz_date})
+    names = sorted(signed)
+    query = "&".join(sorted(parts.query.split("&"))) if parts.query else ""
+    canonical = "\n".join([
+        method,
+        parts.path or "/",
+        query,
+        "".join(f"{name}:{signed[name]}\n" for name in names),
+        ";".join(names),
+        payload_hash,
+    ])
+    to_sign = "\n".join([
+        "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical.encode()).hexdigest()
+    ])
+
+    key = f"AWS4{secret_key}".encode()
+    for part in (amz_date[:8], region, service, "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    signature = hmac.new(key, to_sign.encode(), hashlib.sha256).hexdigest()
+
+    signed["authorization"] = (
+        f"AWS4-HMAC-SHA256 Credential={access_key}/{scope}, "
+        f"SignedHeaders={';'.join(names)}, Signature={signature}"
+    )
+    return signed
+
+
+class S3ArtifactStore(ArtifactStore):
+    """Objects in an S3-compatible bucket, path-style URLs over a pooled async HTTP client"""
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint: str,
+        region: str,
+        access_key: str,
+        secret_key: str,
+        prefix: str = ""
+    ):
+        """
+        Args:
+            bucket: Bucket name
+            endpoint: Service URL, e.g. https://s3.us-east-1.amazonaws.com or http://minio:9000
+            region: Signing region (MinIO and most stand-ins accept us-east-1)
+            access_key, secret_key: Credentials
+            prefix: Key namespace inside the bucket
+        """
+        import httpx
+
+        self._base = f"{endpoint.rstrip('/')}/{quote(bucket)}/"
+        self._region = region
+        self._access_key = access_key
+        self._secret_key = secret_key
+        self._prefix = prefix
+        self._client = httpx.AsyncClient(timeout=10.0)
+
+    async def _request(self, method: str, key: str, body: bytes = b"", headers: dict | None = None):
+        url = self._base + quote(self._prefix + key)
+        payload_hash = hashlib.sha256(body).hexdigest() if body else _EMPTY_SHA256
+        signed = sign_v4(method, url, headers or {}, payload_hash, self._access_key, self._secret_key, self._region)
+        signed.pop("host")  # httpx sets it from the URL
+        return await self._client.request(method, url, content=body or None, headers=signed)
+
+    async def put(self, key: str, data: bytes, content_type: str) -> None:
+        response = await self._request("PUT", key, data, {"content-type": content_type})
+        response.raise_for_status()
+
+    async def size(self, key: str) -> int | None:
+        response = await self._request("HEAD", key)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return int(response.headers["content-length"])
+
+    async def read(self, key: str, start: int, end: int) -> bytes:
+        response = await self._request("GET", key, headers={"range": f"bytes={start}-{end}"})
+        response.raise_for_status()
+        return response.content
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class AudioArtifacts:
+    """Background writer and reader of clips in an ArtifactStore"""
+
+    def __init__(self, store: ArtifactStore | None, base_url: str = "", known: int = 4096):
+        """
+        Args:
+            store: Backend (None disables the store; audio is only sent inline)
+            base_url: Prefix of clip URLs handed to clients and written to history
+                ("" = relative /audio/<id>.mp3 on this server)
+            known: Recently written ids remembered to skip rewriting repeated clips
+        """
+        self.store = store
+        self.base_url = base_url.rstrip("/")
+        self._pending: dict[str, bytes] = {}  # Saved but not yet written
+        self._known: OrderedDict[str, None] = OrderedDict()
+        self._known_max = known
+        self._tasks: set[asyncio.Task] = set()
+
+        # Counters
+        self.saved = 0
+        self.written = 0
+        self.deduplicated = 0
+        self.failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None
+
+    def url(self, clip_id: str) -> str:
+        """Where clients fetch a clip"""
+        return f"{self.base_url}/audio/{clip_id}.mp3"
+
+    def save(self, audio: bytes) -> str:
+        """Hash a clip and schedule its write; returns its id immediately"""
+        clip_id = audio_id(audio)
+        self.saved += 1
+        if clip_id in self._pending or clip_id in self._known:
+            self.deduplicated += 1
+            return clip_id
+        self._pending[clip_id] = audio
+        task = asyncio.create_task(self._write(clip_id, audio))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return clip_id
+
+    async def _write(self, clip_id: str, audio: bytes) -> None:
+        try:
+            with metrics.timed("artifact_write", type(self.store).__name__):
+                await self.store.put(artifact_key(clip_id), audio, AUDIO_CONTENT_TYPE)
+            self.written += 1
+            self._known[clip_id] = None
+            while len(self._known) > self._known_max:
+                self._known.popitem(last=False)
+        except Exception as e:
+            # The clip was already delivered inline; only replay loses it
+            print(f"Audio artifact {clip_id} write failed: {e}")
+            self.failed += 1
+        finally:
+            self._pending.pop(clip_id, None)
+
+    async def size(self, clip_id: str) -> int | None:
+        """Clip size, or None if unknown"""
+        pending = self._pending.get(clip_id)
+        if pending is not None:
+            return len(pending)
+        return await self.store.size(artifact_key(clip_id))
+
+    async def read(self, clip_id: str, start: int, end: int) -> bytes:
+        """Bytes start..end inclusive of a clip known to exist"""
+        pending = self._pending.get(clip_id)
+        if pending is not None:
+            return pending[start:end + 1]
+        return await self.store.read(artifact_key(clip_id), start, end)
+
+    async def close(self) -> None:
+        """Finish outstanding writes, then release the store"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.store is not None:
+            await self.store.close()
+
+    def stats(self) -> dict:
+        """Write counters and backlog"""
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.store).__name__ if self.store is not None else None,
+            "pending": len(self._pending),
+            "saved": self.saved,
+            "written": self.written,
+            "deduplicated": self.deduplicated,
+            "failed": self.failed,
+        }
+
+
+def create_audio_artifacts() -> AudioArtifacts:
+    """Build the store selected by ARTIFACT_STORE (none, local or s3)"""
+    backend = os.getenv("ARTIFACT_STORE", ARTIFACTS_NONE)
+    base_url = os.getenv("AUDIO_BASE_URL", "")
+    if backend == ARTIFACTS_LOCAL:
+        return AudioArtifacts(LocalArtifactStore(os.getenv("ARTIFACT_DIR", "./data/audio")), base_url)
+    if backend == ARTIFACTS_S3:
+        region = os.getenv("S3_REGION", os.getenv("AWS_REGION", "us-east-1"))
+        return AudioArtifacts(S3ArtifactStore(
+            bucket=os.getenv("S3_BUCKET", "nexcast-audio"),
+            endpoint=os.getenv("S3_ENDPOINT_URL") or f"https://s3.{region}.amazonaws.com",
+            region=region,
+            access_key=os.getenv("AWS_ACCESS_KEY_ID", ""),
+            secret_key=os.getenv("AWS_SECRET_ACCESS_KEY", ""),
+            prefix=os.getenv("S3_PREFIX", "audio/")
+        ), base_url)
+    return AudioArtifacts(None, base_url)
+
+
+_audio_artifacts = None
+
+
+def get_audio_artifacts() -> AudioArtifacts:
+    """Get or create audio artifact store singleton"""
+    global _audio_artifacts
+    if _audio_artifacts is None:
+        _audio_artifacts = create_audio_artifacts()
+    return _audio_artifacts
@@ -0,0 +1,179 @@
+"""
+TTS Audio Cache
+Content-addressed cache of synthesized clips: in-memory LRU plus optional disk tier
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from .cache import LruCache
+
+
+def audio_key(text: str, voice_id: str, model_id: str, output_format: str, **voice_settings) -> str:
+    """Stable content hash of everything that affects the synthesized audio"""
+    payload = json.dumps(
+        [text, voice_id, model_id, output_format, sorted(voice_settings.items())],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _DiskTier:
+    """
+    Directory of clips named by key, evicting least recently used files over a byte cap
+
+    The LRU index and byte cap are per process: with several workers sharing
+    TTS_CACHE_DIR each one evicts only what it has written or read, so the
+    directory can grow to (workers x TTS_CACHE_DISK_MAX_BYTES). Clips written
+    by another worker are still served, and adopted into this worker's index.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+
+        # Rebuild LRU order from file mtimes (touched on every hit)
+        files = []
+        for path in self._dir.glob("*/*.mp3"):
+            try:
+                files.append((path.stat(), path.stem))
+            except FileNotFoundError:
+                continue  # Evicted by another worker mid-scan
+        files.sort(key=lambda entry: entry[0].st_mtime)
+        self._sizes: OrderedDict[str, int] = OrderedDict((key, stat.st_size) for stat, key in files)
+        self._bytes = sum(self._sizes.values())
+        self._lock = threading.Lock()  # Tier is used from worker threads
+
+        # Counters
+        self.read_errors = 0
+        self.write_errors = 0
+
+    def _path(self, key: str) -> Path:
+        return self._dir / key[:2] / f"{key}.mp3"
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            return self._get(key)
+
+    def put(self, key: str, audio: bytes) -> None:
+        with self._lock:
+            self._put(key, audio)
+
+    def _get(self, key: str) -> bytes | None:
+        path = self._path(key)
+        try:
+            audio = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            if key in self._sizes:
+                self._bytes -= self._sizes.pop(key)
+            return None
+        except OSError as e:
+            print(f"TTS disk cache read failed ({path}): {e}")
+            self.read_errors += 1
+            return None
+        if key not in self._sizes:  # Written by another worker
+            self._sizes[key] = len(audio)
+            self._bytes += len(audio)
+        self._sizes.move_to_end(key)
+        return audio
+
+    def _put(self, key: str, audio: bytes) -> None:
+        if key in self._sizes or len(audio) > self._max_bytes:
+            return
+        path = self._path(key)
+        # Write a uniquely named temp file then rename, so readers never see a
+        # partial clip and workers writing the same key don't share a temp file
+        tmp = None
+        try:
+            path.parent.mkdir(exist_ok=True)
+            fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=path.parent)
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"TTS disk cache write skipped ({path}): {e}")
+            self.write_errors += 1
+            if tmp is not None:
+                Path(tmp).unlink(missing_ok=True)
+            return
+        self._sizes[key] = len(audio)
+        self._bytes += len(audio)
+
+        while self._bytes > self._max_bytes:
+            old_key, size = self._sizes.popitem(last=False)
+            try:
+                self._path(old_key).unlink(missing_ok=True)
+            except OSError as e:
+                print(f"TTS disk cache eviction failed ({old_key}): {e}")
+            self._bytes -= size
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._sizes),
+            "bytes": self._bytes,
+            "read_errors": self.read_errors,
+            "write_errors": self.write_errors,
+        }
+
+
+class AudioCache:
+    def __init__(self):
+        """Configure memory and (optional) disk tiers from the environment"""
+        self._memory = LruCache(
+            max_entries=int(os.getenv("TTS_CACHE_SIZE", "512")),
+            max_bytes=int(os.getenv("TTS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        )
+        directory = os.getenv("TTS_CACHE_DIR")
+        self._disk = (
+            _DiskTier(directory, int(os.getenv("TTS_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024))))
+            if directory
+            else None
+        )
+
+        # Counters
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    async def get(self, key: str) -> bytes | None:
+        """Look up a clip in memory, then on disk (promoting disk hits to memory)"""
+        audio = self._memory.get(key)
+        if audio is None and self._disk is not None:
+            audio = await asyncio.to_thread(self._disk.get, key)
+            if audio is not None:
+                self.disk_hits += 1
+                self._memory.put(key, audio, len(audio))
+
+        if audio is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.bytes_saved += len(audio)
+        return audio
+
+    async def put(self, key: str, audio: bytes) -> None:
+        """Store a freshly synthesized clip in both tiers"""
+        self._memory.put(key, audio, len(audio))
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.put, key, audio)
+
+    def stats(self) -> dict:
+        """Hit ratio and ElevenLabs bytes saved"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "memory": self._memory.stats(),
+            "disk": self._disk.stats() if self._disk is not None else None,
+        }
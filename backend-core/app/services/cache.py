@@ -0,0 +1,143 @@
+"""
+Bounded in-memory caches
+LRU eviction with a TTL, an entry cap and an approximate memory cap
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterator
+
+ENTRY_OVERHEAD = 100  # Rough per-entry bytes for keys, timestamps and dict slots
+
+
+class LruCache:
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024, ttl: float | None = None):
+        """
+        Args:
+            max_entries: Entry cap (0 disables the cache)
+            max_bytes: Approximate memory cap across all values
+            ttl: Seconds before an entry expires (None = never)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[Any, int, float]] = OrderedDict()
+        self._bytes = 0
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def _remove(self, key: Hashable) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def peek(self, key: Hashable) -> Any | None:
+        """Return a live value without touching counters or LRU order"""
+        entry = self._entries.get(key)
+        if entry is None or self._expired(entry[2], time.monotonic()):
+            return None
+        return entry[0]
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the cached value (refreshing its LRU position) or None"""
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry[2], time.monotonic()):
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        """
+        Store a value, evicting least-recently-used entries to stay within limits
+
+        Args:
+            size: Approximate size of the value in bytes
+        """
+        if self.max_entries <= 0:
+            return
+        size += ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, size, time.monotonic())
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        """Remove an entry if present"""
+        if key in self._entries:
+            self._remove(key)
+
+    def keys(self) -> Iterator[Hashable]:
+        """Iterate over keys that haven't expired, least recently used first"""
+        now = time.monotonic()
+        return (k for k, (_, _, stored_at) in list(self._entries.items()) if not self._expired(stored_at, now))
+
+    def stats(self) -> dict:
+        """Size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+class SimilarityCache:
+    """LRU cache keyed by perceptual hash, matching any key within a Hamming radius"""
+
+    def __init__(self, radius: int = 4, **limits):
+        """
+        Args:
+            radius: Largest Hamming distance that still counts as the same frame
+            limits: max_entries / max_bytes / ttl for the underlying LruCache
+        """
+        self.radius = radius
+        self._cache = LruCache(**limits)
+
+    @property
+    def enabled(self) -> bool:
+        return self._cache.max_entries > 0
+
+    def _nearest(self, frame_hash: int) -> int:
+        """Closest stored key within the radius, or frame_hash itself if none"""
+        if self.radius <= 0 or self._cache.peek(frame_hash) is not None:
+            return frame_hash
+        # Linear scan is fine at the entry caps we run with (a few thousand ints)
+        best, best_distance = frame_hash, self.radius + 1
+        for key in self._cache.keys():
+            distance = (key ^ frame_hash).bit_count()
+            if distance < best_distance:
+                best, best_distance = key, distance
+        return best
+
+    def get(self, frame_hash: int) -> Any | None:
+        """Return the value for the nearest similar frame, or None"""
+        return self._cache.get(self._nearest(frame_hash))
+
+    def put(self, frame_hash: int, value: Any, size: int) -> None:
+        """Store a value under this frame's hash"""
+        self._cache.put(frame_hash, value, size)
+
+    def stats(self) -> dict:
+        """Size and hit/miss counters, plus the similarity radius"""
+        return {"radius": self.radius, **self._cache.stats()}
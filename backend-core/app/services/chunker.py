@@ -0,0 +1,62 @@
+"""
+Speech Chunker
+Split streamed LLM text into speakable chunks for streaming TTS
+"""
+import re
+
+SPEAKER_SEPARATOR = " | "
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets) before whitespace
+_SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*(?=\s)")
+
+
+class SpeechChunker:
+    def __init__(self, min_chars: int = 20):
+        """
+        Args:
+            min_chars: Shortest sentence worth a TTS request on its own;
+                shorter sentences are merged with the next one
+        """
+        self._min_chars = min_chars
+        self._buffer = ""
+        self._speaker = 0
+
+    def feed(self, text: str) -> list[tuple[int, str]]:
+        """
+        Add streamed text and return any chunks that are now complete
+
+        Returns:
+            list[tuple[int, str]]: (speaker_index, text) pairs, speaker 0 first
+        """
+        self._buffer += text
+        chunks = []
+        while True:
+            separator = self._buffer.find(SPEAKER_SEPARATOR)
+            search_end = separator if separator >= 0 else len(self._buffer)
+
+            cut = self._sentence_cut(search_end)
+            if cut is not None:
+                chunks.append((self._speaker, self._buffer[:cut].strip()))
+                self._buffer = self._buffer[cut:]
+            elif separator >= 0:
+                # Speaker switch always ends the current chunk
+                head = self._buffer[:separator].strip()
+                if head:
+                    chunks.append((self._speaker, head))
+                self._buffer = self._buffer[separator + len(SPEAKER_SEPARATOR):]
+                self._speaker += 1
+            else:
+                return chunks
+
+    def flush(self) -> list[tuple[int, str]]:
+        """Return whatever text remains once the stream has ended"""
+        tail = self._buffer.strip()
+        self._buffer = ""
+        return [(self._speaker, tail)] if tail else []
+
+    def _sentence_cut(self, end: int) -> int | None:
+        """Index just past the first sentence of at least min_chars, if any"""
+        for match in _SENTENCE_END.finditer(self._buffer, 0, end):
+            if len(self._buffer[:match.end()].strip()) >= self._min_chars:
+                return match.end()
+        return None
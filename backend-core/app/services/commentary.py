@@ -0,0 +1,77 @@
+"""
+Commentary Format
+Commentator prompts and validation of the "[tag] text | [tag] text" speaker format
+"""
+import re
+
+from .chunker import SPEAKER_SEPARATOR
+
+# Commentator personas and output format (Grok, and Gemini in fused mode)
+DUAL_SPEAKER_PROMPT = (
+    "You are TWO sports commentators (American hype caster + British analyst) providing real-time commentary.\n\n"
+    "FORMAT: '[tag] commentary text | [tag] commentary text'\n"
+    "- First speaker (American): Play-by-play with high energy and excitement\n"
+    "- Second speaker (British): Tactical analysis with dry wit and humor\n"
+    "- TARGET: 15-20 words per speaker (30-40 words total)\n\n"
+    "AUDIO TAGS (use them!):\n"
+    "[excited], [intense], [dramatic], [analytical], [humorous], [laughs], [gasps]\n\n"
+    "EXAMPLES:\n"
+    "'[excited] Reinhardt just charged in and absolutely OBLITERATED their entire backline with that hammer! Devastating play! | [analytical] Notice how he baited out the sleep dart first—smart positioning to avoid the stun before committing.'\n"
+    "'[intense] They're getting shredded! Three down in five seconds and the fight just started! | [humorous] Their Mercy is panic-flying around like a headless chicken trying to rez everyone! [laughs]'\n"
+    "'[dramatic] Overtime! The point is contested and one team wipe ends this entire match right now! | [excited] The pressure is absolutely INSANE—every single second counts!'\n\n"
+    "REQUIREMENTS:\n"
+    "- Speaker 1: Describe the ACTION happening with HYPE and ENERGY\n"
+    "- Speaker 2: Provide INSIGHT, ANALYSIS, or HUMOR about the play\n"
+    "- Keep it fast-paced but give full thoughts—aim for 15-20 words each"
+)
+
+SINGLE_SPEAKER_PROMPT = (
+    "You are a high-energy sports commentator providing FAST real-time commentary.\n\n"
+    "FORMAT: '[tag] commentary text'\n"
+    "LENGTH: 15-20 words max\n"
+    "STYLE: Play-by-play with hype and excitement\n\n"
+    "AUDIO TAGS: [excited], [intense], [dramatic], [laughs], [gasps]\n\n"
+    "EXAMPLE: '[excited] Reinhardt just charged in and absolutely DEMOLISHED their entire backline!'\n\n"
+    "Keep it FAST and PUNCHY for quick action commentary."
+)
+
+
+_TAGGED = re.compile(r"^\[[A-Za-z][A-Za-z ]*\]\s*\S")
+_AUDIO_TAG = re.compile(r"\s*\[[A-Za-z][A-Za-z ]*\]\s*")
+
+
+def strip_tags(text: str) -> str:
+    """Remove [tag] audio tags (an eleven_v3 feature) for models that would read them out"""
+    return _AUDIO_TAG.sub(" ", text).strip()
+
+
+class CommentaryFormatError(ValueError):
+    """Commentary doesn't match the speaker format TTS expects"""
+
+
+def validate(text: str, dual_speaker: bool) -> str:
+    """
+    Check commentary against the speaker format and tidy it for TTS
+
+    Strips wrapping quotes (the prompt examples are quoted) and normalizes the
+    speaker separator, so "[a] x|[b] y" becomes "[a] x | [b] y".
+
+    Args:
+        text: Model output
+        dual_speaker: Expect exactly two speakers (else exactly one)
+
+    Returns:
+        str: Commentary in canonical form
+
+    Raises:
+        CommentaryFormatError: Wrong speaker count, or a part without a leading [tag] and text
+    """
+    text = text.strip().strip("'\"`").strip()
+    parts = [part.strip() for part in text.split("|")]
+    expected = 2 if dual_speaker else 1
+    if len(parts) != expected:
+        raise CommentaryFormatError(f"Expected {expected} speaker(s), got {len(parts)}: {text!r}")
+    for part in parts:
+        if not _TAGGED.match(part):
+            raise CommentaryFormatError(f"Speaker part needs a leading [tag] and text: {part!r}")
+    return SPEAKER_SEPARATOR.join(parts)
@@ -0,0 +1,92 @@
+"""
+Session Conversation
+Token-budgeted rolling window of recent descriptions and commentaries, so the
+LLM remembers what it just said and resends as little as possible
+
+The prompt is laid out oldest-first behind a fixed system prompt, and the
+window is trimmed in large steps rather than one turn per frame: between
+trims every request extends the previous one, so the provider's prompt cache
+covers everything but the newest turn.
+"""
+import os
+from collections import deque
+
+CHARS_PER_TOKEN = 4  # Rough English average; only used for budgeting
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of text"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+class Conversation:
+    def __init__(self, session_id, budget: int | None = None, summary_budget: int | None = None):
+        """
+        Args:
+            session_id: Used as the provider conversation id (routes requests to a warm cache)
+            budget: Token budget for summary + turns (defaults to LLM_CONTEXT_TOKENS, 1200)
+            summary_budget: Tokens of trimmed scenes kept as a one-line recap
+                (defaults to LLM_SUMMARY_TOKENS, 150; 0 = just drop them)
+        """
+        self.id = f"session-{session_id}"
+        self.budget = budget if budget is not None else int(os.getenv("LLM_CONTEXT_TOKENS", "1200"))
+        self.summary_budget = (
+            summary_budget if summary_budget is not None else int(os.getenv("LLM_SUMMARY_TOKENS", "150"))
+        )
+        self.turns: deque[tuple[str, str]] = deque()  # (description, commentary), oldest first
+        self.summary = ""  # Recap of scenes trimmed from the window
+        self._tokens = 0
+
+        # Counters
+        self.frames = 0
+        self.trims = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+
+    @staticmethod
+    def _turn_tokens(description: str, comment: str) -> int:
+        return estimate_tokens(description) + estimate_tokens(comment)
+
+    def add(self, description: str, comment: str) -> None:
+        """Record one frame's exchange, trimming the window if it's over budget"""
+        self.turns.append((description, comment))
+        self._tokens += self._turn_tokens(description, comment)
+        if self._tokens + estimate_tokens(self.summary) > self.budget:
+            self._trim()
+
+    def _trim(self) -> None:
+        """Drop the oldest turns down to half the budget, folding their scenes into the recap"""
+        dropped = []
+        while self.turns and self._tokens + estimate_tokens(self.summary) > self.budget // 2:
+            description, comment = self.turns.popleft()
+            self._tokens -= self._turn_tokens(description, comment)
+            dropped.append(description)
+        if not dropped:
+            return
+        self.trims += 1
+
+        # Keep the most recent scenes that fit; older ones fall off the recap
+        scenes = [s for s in self.summary.split(" / ") if s] + [d.strip().rstrip(".") for d in dropped]
+        kept: list[str] = []
+        for scene in reversed(scenes):
+            if estimate_tokens(" / ".join([scene, *kept])) > self.summary_budget:
+                break
+            kept.insert(0, scene)
+        self.summary = " / ".join(kept)
+
+    def record_usage(self, prompt_tokens: int, cached_prompt_tokens: int = 0) -> None:
+        """Provider-reported prompt tokens for one frame's LLM call"""
+        self.frames += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_prompt_tokens += cached_prompt_tokens
+
+    def stats(self) -> dict:
+        """Window size and prompt-token totals"""
+        return {
+            "turns": len(self.turns),
+            "window_tokens": self._tokens + estimate_tokens(self.summary),
+            "trims": self.trims,
+            "frames": self.frames,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+        }
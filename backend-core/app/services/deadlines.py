@@ -0,0 +1,236 @@
+"""
+Stage Deadlines
+Per-stage deadline, optional hedged request and fast-model fallback, so one
+slow provider response can't leave a session silent
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, TypeVar
+
+from . import metrics
+from .limiter import ProviderLimiter, percentile
+
+T = TypeVar("T")
+
+LATENCY_SAMPLES = 512  # Recent attempt latencies kept for the hedge delay
+HEDGE_MIN_SAMPLES = 20  # Don't hedge until the p95 means something
+_END = object()
+
+# (stage, model) that served the latest call()/stream() made from this task
+_served: ContextVar[tuple[str, str] | None] = ContextVar("served_model", default=None)
+
+
+class StagePolicy:
+    """
+    Tail-latency policy for one provider stage
+
+    call() takes a provider slot, then runs attempt(model) under the
+    deadline, so time spent queued behind other sessions never counts as
+    provider latency. With hedging on, a second identical attempt starts once
+    the first has run longer than the stage's recent p95 (only if the
+    provider has a free slot, so hedges never queue behind real traffic) and
+    whichever finishes first wins. If the deadline passes, the work is
+    cancelled and retried once on the fallback model with a fresh deadline,
+    in the slot already held, so the retry keeps its place.
+
+    Attempts make the provider request only; the policy holds the slot.
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        model: str,
+        deadline: float = 0.0,
+        fallback_model: str | None = None,
+        hedge: bool = False,
+        limiter: ProviderLimiter | None = None
+    ):
+        """
+        Args:
+            stage: Stage name for stats and metrics ("vision", "llm", "tts")
+            model: Primary model
+            deadline: Seconds before giving up on an attempt (0 = no deadline)
+            fallback_model: Faster model to retry with after a missed deadline (None = just fail)
+            hedge: Fire a duplicate request after the p95 delay
+            limiter: Provider limiter each call (and hedge) takes a slot from
+        """
+        self.stage = stage
+        self.model = model
+        self.deadline = deadline
+        self.fallback_model = fallback_model if fallback_model != model else None
+        self.hedge = hedge
+        self.limiter = limiter
+        self._latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.events = {"deadline_missed": 0, "fallback": 0, "fallback_missed": 0, "hedged": 0, "hedge_won": 0}
+
+    @classmethod
+    def from_env(
+        cls,
+        prefix: str,
+        stage: str,
+        model: str,
+        deadline: float,
+        fallback_model: str,
+        limiter: ProviderLimiter | None = None
+    ) -> "StagePolicy":
+        """
+        Build from <PREFIX>_DEADLINE, <PREFIX>_FALLBACK_MODEL (empty = none) and <PREFIX>_HEDGE (0/1)
+
+        Args:
+            deadline: Default for <PREFIX>_DEADLINE, in seconds
+            fallback_model: Default for <PREFIX>_FALLBACK_MODEL
+        """
+        return cls(
+            stage,
+            model,
+            deadline=float(os.getenv(f"{prefix}_DEADLINE", str(deadline))),
+            fallback_model=os.getenv(f"{prefix}_FALLBACK_MODEL", fallback_model) or None,
+            hedge=os.getenv(f"{prefix}_HEDGE", "0") == "1",
+            limiter=limiter
+        )
+
+    def _count(self, event: str) -> None:
+        self.events[event] += 1
+        metrics.TAIL_EVENTS.labels(self.stage, event).inc()
+
+    def served_model(self) -> str:
+        """Model (primary or fallback) behind this task's latest result from this stage"""
+        served = _served.get()
+        return served[1] if served is not None and served[0] == self.stage else self.model
+
+    def hedge_delay(self) -> float | None:
+        """Seconds to wait before hedging (recent p95), or None if hedging is off or unwarmed"""
+        if not self.hedge or len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return percentile(list(self._latencies), 0.95)
+
+    def _slot(self):
+        return self.limiter.slot() if self.limiter is not None else nullcontext()
+
+    async def _within_deadline(self, awaitable: Awaitable[T]) -> T:
+        if self.deadline <= 0:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, self.deadline)
+
+    async def _timed(self, attempt: Callable[[str], Awaitable[T]]) -> T:
+        start = time.monotonic()
+        try:
+            return await attempt(self.model)
+        finally:
+            # Cancelled (hedged or timed-out) attempts count too: they were at least this slow
+            self._latencies.append(time.monotonic() - start)
+
+    async def _hedge(self, attempt: Callable[[str], Awaitable[T]]) -> T:
+        async with self._slot():  # Free when the hedge was decided, so no queueing
+            return await self._timed(attempt)
+
+    async def _hedged(self, attempt: Callable[[str], Awaitable[T]]) -> T:
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._timed(attempt)
+
+        first = asyncio.ensure_future(self._timed(attempt))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or (self.limiter is not None and not self.limiter.has_capacity):
+                return await first
+            self._count("hedged")
+            tasks.append(asyncio.ensure_future(self._hedge(attempt)))
+
+            # First success wins; if one attempt fails, keep waiting on the other
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self._count("hedge_won")
+                        return task.result()
+            return first.result()  # Both failed: raise the original attempt's error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _missed(self) -> str:
+        """Count a missed deadline and return the model to fall back to (raises if none)"""
+        self._count("deadline_missed")
+        if self.fallback_model is None:
+            raise asyncio.TimeoutError(f"{self.stage} missed its {self.deadline:g}s deadline")
+        self._count("fallback")
+        print(f"{self.stage}: {self.model} missed its {self.deadline:g}s deadline, retrying on {self.fallback_model}")
+        return self.fallback_model
+
+    async def call(self, attempt: Callable[[str], Awaitable[T]]) -> T:
+        """
+        Run attempt(model) under this stage's deadline, hedging and fallback
+
+        Args:
+            attempt: Makes one provider request with the given model
+        """
+        async with self._slot():
+            try:
+                result = await self._within_deadline(self._hedged(attempt))
+                _served.set((self.stage, self.model))
+                return result
+            except asyncio.TimeoutError:
+                fallback = self._missed()
+            try:
+                result = await self._within_deadline(attempt(fallback))
+                _served.set((self.stage, fallback))
+                return result
+            except asyncio.TimeoutError:
+                self._count("fallback_missed")
+                raise
+
+    async def stream(self, attempt: Callable[[str], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """
+        Stream attempt(model) with the deadline applied to its first item
+
+        Once a stream has started (first token or audio chunk), it is left to
+        finish: output is already on its way to the client. Streams aren't
+        hedged, since two would hold two provider slots for the whole stream.
+
+        Args:
+            attempt: Opens one streaming provider request with the given model
+        """
+        async with self._slot():  # Held for the whole stream, fallback included
+            model = self.model
+            stream = attempt(model)
+            try:
+                first = await self._within_deadline(anext(stream, _END))
+            except asyncio.TimeoutError:
+                await stream.aclose()
+                model = self._missed()
+                stream = attempt(model)
+                try:
+                    first = await self._within_deadline(anext(stream, _END))
+                except asyncio.TimeoutError:
+                    await stream.aclose()
+                    self._count("fallback_missed")
+                    raise
+
+            _served.set((self.stage, model))
+            try:
+                if first is _END:
+                    return
+                yield first
+                async for item in stream:
+                    yield item
+            finally:
+                await stream.aclose()
+
+    def stats(self) -> dict:
+        """Deadline settings, recent p95 and event counts"""
+        return {
+            "model": self.model,
+            "deadline": self.deadline,
+            "fallback_model": self.fallback_model,
+            "hedge": self.hedge,
+            "latency_p95": percentile(list(self._latencies), 0.95),
+            **self.events,
+        }
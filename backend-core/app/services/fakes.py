@@ -0,0 +1,217 @@
+"""
+Fake Provider Clients
+Stand-ins for the Gemini, Grok and ElevenLabs SDK clients with configurable
+latency and error rates, for load testing without API keys or quota
+
+The fakes replace only the SDK client inside each real service, so caching,
+rate limiting, MP3 joining and streaming all run exactly as in production.
+"""
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import zlib
+from types import SimpleNamespace
+from typing import AsyncIterator
+
+from .commentary import SINGLE_SPEAKER_PROMPT
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, stereo: 417-byte frames of ~26 ms
+_MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+_MP3_FRAME_SECONDS = 1152 / 44100
+_SPEECH_SECONDS_PER_WORD = 0.35
+FUSED_LATENCY_SCALE = 1.3  # Fused vision+commentary call vs. a plain description
+
+_DESCRIPTIONS = (
+    "Two teams clash at the central objective",
+    "A player flanks through the side corridor",
+    "The scoreboard shows a close match in overtime",
+    "A sniper holds the high ground over the bridge",
+    "The team regroups at spawn after a lost fight",
+)
+
+_COMMENTS = (
+    "[excited] What a charge straight into the backline! | [analytical] Textbook timing, they baited the cooldowns first.",
+    "[intense] Three down in five seconds, this fight is over! | [humorous] Their healer is flying around like a lost pigeon. [laughs]",
+    "[dramatic] Overtime and the point is contested! | [analytical] One pick here decides the entire match.",
+)
+
+# Numbers every fake comment, so no two calls' text (and so TTS audio) is the same
+_takes = itertools.count(1)
+
+
+def _numbered(comment: str) -> str:
+    """A fake comment made unique to this call"""
+    return f"{comment} Take {next(_takes)}."
+
+
+class FakeProviderError(Exception):
+    """Injected provider failure (stands in for 429s, 5xx and timeouts)"""
+
+
+class LatencyModel:
+    """Log-normal latency, parameterised by its median and p95 like provider dashboards"""
+
+    def __init__(self, median: float, p95: float, error_rate: float = 0.0):
+        """
+        Args:
+            median: Median latency in seconds
+            p95: 95th percentile latency in seconds (>= median)
+            error_rate: Fraction of calls that fail with FakeProviderError
+        """
+        self.median = median
+        self.error_rate = error_rate
+        self._mu = math.log(max(median, 1e-6))
+        self._sigma = math.log(max(p95, median) / max(median, 1e-6)) / 1.645 if median > 0 else 0.0
+
+    @classmethod
+    def from_env(cls, prefix: str, median_ms: int, p95_ms: int) -> "LatencyModel":
+        """Build from <PREFIX>_LATENCY ("median_ms,p95_ms") and <PREFIX>_ERROR_RATE"""
+        spec = os.getenv(f"{prefix}_LATENCY", f"{median_ms},{p95_ms}").split(",")
+        median = float(spec[0])
+        p95 = float(spec[1]) if len(spec) > 1 else median
+        return cls(median / 1000, p95 / 1000, float(os.getenv(f"{prefix}_ERROR_RATE", "0")))
+
+    def sample(self) -> float:
+        """One latency draw in seconds"""
+        if self.median <= 0:
+            return 0.0
+        return random.lognormvariate(self._mu, self._sigma)
+
+    async def wait(self, scale: float = 1.0) -> None:
+        """Sleep for one latency draw, then fail at the configured error rate"""
+        await asyncio.sleep(self.sample() * scale)
+        if self.error_rate and random.random() < self.error_rate:
+            raise FakeProviderError("Injected provider error")
+
+
+def silent_mp3(seconds: float) -> bytes:
+    """Valid MP3 stream of silence, roughly `seconds` long"""
+    return _MP3_FRAME * max(1, round(seconds / _MP3_FRAME_SECONDS))
+
+
+class FakeGeminiClient:
+    """Mimics genai.Client: client.aio.models.generate_content(...)"""
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._generate_content))
+
+    async def _generate_content(self, model, contents, config=None):
+        fused = getattr(config, "response_mime_type", None) == "application/json"
+        # Fused calls also write ~40 words of commentary: longer generation
+        await self.latency.wait(scale=FUSED_LATENCY_SCALE if fused else 1.0)
+        frame = contents[0]
+        data = getattr(getattr(frame, "inline_data", None), "data", b"") or b""
+        # Same frame, same description; different frames vary
+        description = _DESCRIPTIONS[zlib.crc32(data) % len(_DESCRIPTIONS)]
+        if not fused:
+            return SimpleNamespace(text=description)
+        comment = _COMMENTS[zlib.crc32(data) % len(_COMMENTS)]
+        if config.system_instruction == SINGLE_SPEAKER_PROMPT:
+            comment = comment.split(" | ")[0]
+        comment = _numbered(comment)
+        return SimpleNamespace(text=json.dumps({"scene": description, "commentary": comment}))
+
+
+class _FakeChat:
+    def __init__(self, latency: LatencyModel, token_delay: float, prompt_cache: dict, conversation_id=None):
+        self._latency = latency
+        self._token_delay = token_delay
+        self._prompt_cache = prompt_cache
+        self._conversation_id = conversation_id
+        self._messages = []
+
+    def append(self, message):
+        self._messages.append(message)
+
+    def _comment(self) -> str:
+        return _numbered(_COMMENTS[zlib.crc32(repr(self._messages).encode()) % len(_COMMENTS)])
+
+    def _usage(self, completion: str) -> SimpleNamespace:
+        """~4 characters per token; the prefix shared with this conversation's last prompt is cached"""
+        prompt = "".join(str(m) for m in self._messages)
+        previous = self._prompt_cache.get(self._conversation_id, "")
+        shared = len(os.path.commonprefix([prompt, previous])) if self._conversation_id else 0
+        if self._conversation_id:
+            self._prompt_cache[self._conversation_id] = prompt
+        return SimpleNamespace(
+            prompt_tokens=len(prompt) // 4,
+            cached_prompt_text_tokens=shared // 4,
+            completion_tokens=len(completion) // 4
+        )
+
+    async def sample(self):
+        await self._latency.wait()
+        comment = self._comment()
+        return SimpleNamespace(content=comment, usage=self._usage(comment))
+
+    async def stream(self) -> AsyncIterator[tuple[object, SimpleNamespace]]:
+        # Latency model covers time to first token; tokens then trickle in
+        await self._latency.wait()
+        comment = self._comment()
+        response = SimpleNamespace(usage=self._usage(comment))
+        for i in range(0, len(comment), 4):
+            if i:
+                await asyncio.sleep(self._token_delay)
+            yield response, SimpleNamespace(content=comment[i:i + 4])
+
+
+class FakeXaiClient:
+    """Mimics xai_sdk.AsyncClient: client.chat.create(model=...).sample() / .stream()"""
+
+    def __init__(self, latency: LatencyModel, token_delay: float = 0.01):
+        prompt_cache = {}  # conversation_id -> last prompt, for simulated prefix caching
+        self.chat = SimpleNamespace(
+            create=lambda model, conversation_id=None, **options: _FakeChat(
+                latency, token_delay, prompt_cache, conversation_id
+            )
+        )
+
+
+class _FakeTextToSpeech:
+    def __init__(self, latency: LatencyModel, chunk_seconds: float):
+        self._latency = latency
+        self._chunk_seconds = chunk_seconds
+
+    @staticmethod
+    def _audio(text: str) -> bytes:
+        return silent_mp3(len(text.split()) * _SPEECH_SECONDS_PER_WORD)
+
+    async def convert(self, text: str, voice_id: str, **options) -> AsyncIterator[bytes]:
+        await self._latency.wait()
+        yield self._audio(text)
+
+    async def stream(self, text: str, voice_id: str, **options) -> AsyncIterator[bytes]:
+        # Latency model covers time to first chunk; the rest streams faster than real time
+        await self._latency.wait()
+        audio = self._audio(text)
+        step = max(len(_MP3_FRAME), round(self._chunk_seconds / _MP3_FRAME_SECONDS) * len(_MP3_FRAME))
+        for i in range(0, len(audio), step):
+            if i:
+                await asyncio.sleep(self._chunk_seconds / 4)
+            yield audio[i:i + step]
+
+
+class FakeElevenLabsClient:
+    """Mimics AsyncElevenLabs: client.text_to_speech.convert(...) / .stream(...)"""
+
+    def __init__(self, latency: LatencyModel, chunk_seconds: float = 0.5):
+        self.text_to_speech = _FakeTextToSpeech(latency, chunk_seconds)
+
+
+def gemini_client() -> FakeGeminiClient:
+    """Fake Gemini from FAKE_VISION_LATENCY / FAKE_VISION_ERROR_RATE (default 900 ms median, 2 s p95)"""
+    return FakeGeminiClient(LatencyModel.from_env("FAKE_VISION", 900, 2000))
+
+
+def xai_client() -> FakeXaiClient:
+    """Fake Grok from FAKE_LLM_LATENCY / FAKE_LLM_ERROR_RATE (default 600 ms median, 1.5 s p95)"""
+    return FakeXaiClient(LatencyModel.from_env("FAKE_LLM", 600, 1500))
+
+
+def elevenlabs_client() -> FakeElevenLabsClient:
+    """Fake ElevenLabs from FAKE_TTS_LATENCY / FAKE_TTS_ERROR_RATE (default 700 ms median, 1.6 s p95)"""
+    return FakeElevenLabsClient(LatencyModel.from_env("FAKE_TTS", 700, 1600))
@@ -0,0 +1,153 @@
+"""
+Frame Normalization
+Resize/re-encode frames in a worker pool before uploading them to Gemini
+"""
+import asyncio
+import base64
+import io
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from PIL import Image
+
+
+_TRUE = ("true", "1", "yes", "on")
+_FALSE = ("false", "0", "no", "off", "")
+
+
+def _parse_roi(value) -> tuple[float, float, float, float] | None:
+    """Region of interest as (x, y, width, height) fractions of the frame"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    try:
+        x, y, w, h = (float(v) for v in value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid region of interest: {value!r}") from None
+    if not (0 <= x < 1 and 0 <= y < 1 and 0 < w <= 1 - x and 0 < h <= 1 - y):
+        raise ValueError(f"Invalid region of interest: {value!r}")
+    return x, y, w, h
+
+
+def _parse_bool(value) -> bool:
+    """JSON booleans, 0/1, or "true"/"false"-style strings ("false" is not truthy here)"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in _TRUE + _FALSE:
+        return value.strip().lower() in _TRUE
+    raise ValueError(f"Invalid boolean: {value!r}")
+
+
+def frame_options(preferences: dict, session_id=None) -> dict:
+    """
+    Parse a session's frame_grayscale and frame_roi preferences once, at session creation
+
+    Invalid values are logged and ignored (the server default applies), so a
+    bad preference never fails every frame of the session.
+
+    Args:
+        preferences: Session preferences from the client's init message
+        session_id: For the log line
+
+    Returns:
+        dict: Overrides for FrameNormalizer.normalize ("grayscale": bool, "roi": tuple)
+    """
+    options = {}
+    for key, option, parse in (("frame_grayscale", "grayscale", _parse_bool), ("frame_roi", "roi", _parse_roi)):
+        if preferences.get(key) is None:
+            continue
+        try:
+            options[option] = parse(preferences[key])
+        except ValueError as e:
+            print(f"[{session_id}] Ignored {key} preference: {e}")
+    return options
+
+
+def normalize(
+    frame: bytes | str,
+    max_edge: int = 1024,
+    quality: int = 75,
+    grayscale: bool = False,
+    roi: tuple[float, float, float, float] | None = None
+) -> bytes:
+    """
+    Crop, downscale and re-encode a JPEG frame (CPU-bound, runs in a worker)
+
+    Args:
+        frame: JPEG bytes or base64-encoded JPEG
+        max_edge: Longest output side in pixels
+        quality: Output JPEG quality (1-95)
+        grayscale: Drop color channels
+        roi: Optional (x, y, width, height) crop as fractions of the frame
+
+    Returns:
+        bytes: JPEG frame, or the original bytes if no change was needed
+    """
+    frame_bytes = base64.b64decode(frame) if isinstance(frame, str) else frame
+    with Image.open(io.BytesIO(frame_bytes)) as image:
+        width, height = image.size
+        if max(width, height) <= max_edge and not grayscale and roi is None:
+            return frame_bytes
+
+        if roi is None:
+            # Let the JPEG decoder downscale via DCT before the exact resize
+            image.draft("L" if grayscale else "RGB", (max_edge, max_edge))
+        image = image.convert("L" if grayscale else "RGB")
+
+        if roi is not None:
+            x, y, w, h = roi
+            width, height = image.size
+            image = image.crop((
+                round(x * width), round(y * height),
+                round((x + w) * width), round((y + h) * height)
+            ))
+
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+        return output.getvalue()
+
+
+class FrameNormalizer:
+    def __init__(self):
+        """Load normalization settings and start the worker pool"""
+        self._max_edge = int(os.getenv("FRAME_MAX_EDGE", "1024"))
+        self._quality = int(os.getenv("FRAME_JPEG_QUALITY", "75"))
+        self._grayscale = _parse_bool(os.getenv("FRAME_GRAYSCALE", "false"))
+        self._roi = _parse_roi(os.getenv("FRAME_ROI"))
+
+        # Pillow releases the GIL while decoding/encoding, so threads usually suffice
+        workers = int(os.getenv("FRAME_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self._executor: Executor = (
+            ProcessPoolExecutor(max_workers=workers)
+            if os.getenv("FRAME_POOL", "thread") == "process"
+            else ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frames")
+        )
+
+    async def normalize(self, frame: bytes | str, options: dict | None = None) -> bytes:
+        """
+        Normalize a frame off the event loop
+
+        Args:
+            frame: JPEG bytes or base64-encoded JPEG
+            options: The session's frame_options(); "grayscale" and "roi"
+                override the server defaults
+
+        Returns:
+            bytes: JPEG frame ready for Vision
+        """
+        options = options or {}
+        grayscale = options.get("grayscale", self._grayscale)
+        roi = options.get("roi") or self._roi
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._executor, normalize, frame, self._max_edge, self._quality, grayscale, roi
+            )
+        except OSError:
+            # Undecodable frame: pass it through and let Vision handle (or reject) it
+            return base64.b64decode(frame) if isinstance(frame, str) else frame
@@ -0,0 +1,284 @@
+"""
+Commentary History
+Write-behind persistence of every frame's commentary to the `commentaries`
+table that the history API (backend-lambda) reads
+
+The frame-to-audio path only appends a row to an in-memory queue; a
+background task writes the queue in bulk multi-row INSERTs whenever
+HISTORY_BATCH_SIZE rows are waiting or HISTORY_FLUSH_INTERVAL seconds have
+passed, and each session's rows are flushed when it disconnects. If the
+database falls behind, the queue is capped at HISTORY_MAX_PENDING rows and
+the oldest are dropped (nexcast_history_rows{outcome="dropped"}) rather than
+slowing commentary down.
+
+Each batch also bumps sessions.commentary_count in the same transaction, so
+the history list can show counts without joining the commentaries table.
+"""
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+from . import metrics
+
+HISTORY_NONE = "none"    # Commentaries are not persisted
+HISTORY_MYSQL = "mysql"  # The sessions/commentaries database used by backend-lambda
+
+
+class CommentaryRow(NamedTuple):
+    session_id: int
+    commentator_model: str
+    scene_description: str
+    commentary_text: str
+    audio_url: str | None
+    created_at: datetime  # UTC, when the commentary was produced (not when it was written)
+
+
+class HistorySink(ABC):
+    """Backend interface for writing batches of commentary rows"""
+
+    @abstractmethod
+    async def write(self, rows: list[CommentaryRow]) -> int:
+        """
+        Insert rows in as few statements as possible
+
+        Returns:
+            int: Rows the database rejected for good (e.g. no such session);
+            raise instead for transient errors so the batch is retried
+        """
+
+    async def close(self) -> None:
+        """Release connections"""
+
+
+class MySqlHistorySink(HistorySink):
+    """Pooled async MySQL connection (aiomysql) to the backend-lambda database"""
+
+    INSERT = (
+        "INSERT INTO commentaries "
+        "(session_id, commentator_model, scene_description, commentary_text, audio_url, created_at) "
+        "VALUES (%s, %s, %s, %s, %s, %s)"
+    )
+    # Denormalized for the history list (see backend-lambda migration 002)
+    COUNT = "UPDATE sessions SET commentary_count = commentary_count + %s WHERE id = %s"
+
+    def __init__(self, host: str, port: int, user: str, password: str, database: str, pool_size: int = 2):
+        """
+        Args:
+            host, port, user, password, database: Same settings as backend-lambda (DB_*)
+            pool_size: Connections kept open; the writer itself uses one at a time
+        """
+        self._options = dict(
+            host=host, port=port, user=user, password=password, db=database,
+            minsize=1, maxsize=pool_size, autocommit=True, charset="utf8mb4",
+            init_command="SET time_zone = '+00:00'"  # created_at values are UTC
+        )
+        self._pool = None
+
+    async def _get_pool(self):
+        if self._pool is None:
+            # Only needed when this backend is selected
+            import aiomysql
+            self._pool = await aiomysql.create_pool(**self._options)
+        return self._pool
+
+    async def _insert(self, conn, cursor, rows: list[CommentaryRow]) -> None:
+        """Insert rows and bump their sessions' commentary_count in one transaction"""
+        await conn.begin()
+        try:
+            # executemany rewrites INSERT ... VALUES into one multi-row statement
+            await cursor.executemany(self.INSERT, rows)
+            counts = Counter(row.session_id for row in rows)
+            await cursor.executemany(self.COUNT, [(n, session_id) for session_id, n in counts.items()])
+            await conn.commit()
+        except BaseException:
+            await conn.rollback()
+            raise
+
+    async def write(self, rows: list[CommentaryRow]) -> int:
+        import aiomysql
+
+        pool = await self._get_pool()
+        async with pool.acquire() as conn, conn.cursor() as cursor:
+            try:
+                await self._insert(conn, cursor, rows)
+                return 0
+            except aiomysql.IntegrityError:
+                pass
+            # A bad row (e.g. a session the API never created) fails the whole
+            # statement: insert one at a time and drop only the rejects
+            rejected = 0
+            for row in rows:
+                try:
+                    await self._insert(conn, cursor, [row])
+                except aiomysql.IntegrityError as e:
+                    print(f"[{row.session_id}] Commentary rejected by database: {e}")
+                    rejected += 1
+            return rejected
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+
+
+class HistoryWriter:
+    """Batched write-behind queue in front of a HistorySink"""
+
+    def __init__(
+        self,
+        sink: HistorySink | None,
+        batch_size: int | None = None,
+        flush_interval: float | None = None,
+        max_pending: int | None = None
+    ):
+        """
+        Args:
+            sink: Where rows go (None disables persistence)
+            batch_size: Rows per INSERT; a full batch wakes the writer early
+                (defaults to HISTORY_BATCH_SIZE, 50)
+            flush_interval: Seconds between writes of a partial batch
+                (defaults to HISTORY_FLUSH_INTERVAL, 2)
+            max_pending: Queue cap; beyond it the oldest rows are dropped
+                (defaults to HISTORY_MAX_PENDING, 10000)
+        """
+        self.sink = sink
+        self.batch_size = batch_size or int(os.getenv("HISTORY_BATCH_SIZE", "50"))
+        self.flush_interval = flush_interval or float(os.getenv("HISTORY_FLUSH_INTERVAL", "2"))
+        self.max_pending = max_pending or int(os.getenv("HISTORY_MAX_PENDING", "10000"))
+        self._pending: deque[tuple[float, CommentaryRow]] = deque()  # (enqueued monotonic, row)
+        self._wake = asyncio.Event()
+        self._lock = asyncio.Lock()
+
+        # Counters
+        self.queued = 0
+        self.written = 0
+        self.dropped = 0   # Queue overflow
+        self.rejected = 0  # Refused by the database
+        self.failed_writes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.sink is not None
+
+    def record(
+        self,
+        session_id,
+        description: str,
+        comment: str,
+        model: str,
+        audio_url: str | None = None
+    ) -> None:
+        """Queue one frame's commentary; never waits on the database"""
+        if self.sink is None:
+            return
+        row = CommentaryRow(
+            int(session_id), model, description, comment, audio_url,
+            datetime.now(timezone.utc).replace(tzinfo=None)
+        )
+        self._pending.append((time.monotonic(), row))
+        self.queued += 1
+        metrics.HISTORY_ROWS.labels("queued").inc()
+        if len(self._pending) > self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+            metrics.HISTORY_ROWS.labels("dropped").inc()
+        metrics.HISTORY_PENDING.set(len(self._pending))
+        if len(self._pending) >= self.batch_size:
+            self._wake.set()
+
+    async def flush(self) -> None:
+        """Write everything queued so far (stops early if the database is failing)"""
+        if self.sink is None:
+            return
+        async with self._lock:
+            while self._pending:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                rows = [row for _, row in batch]
+                try:
+                    with metrics.timed("history_write", "mysql"):
+                        rejected = await self.sink.write(rows)
+                except asyncio.CancelledError:
+                    # Shutdown mid-write (the sink rolled back): keep the batch for close()
+                    self._pending.extendleft(reversed(batch))
+                    raise
+                except Exception as e:
+                    # Put the batch back in order (minus any overflow) and retry on the next tick
+                    print(f"History write of {len(rows)} rows failed: {e}")
+                    self.failed_writes += 1
+                    metrics.HISTORY_ROWS.labels("retried").inc(len(rows))
+                    self._pending.extendleft(reversed(batch))
+                    while len(self._pending) > self.max_pending:
+                        self._pending.popleft()
+                        self.dropped += 1
+                        metrics.HISTORY_ROWS.labels("dropped").inc()
+                    break
+                finally:
+                    metrics.HISTORY_PENDING.set(len(self._pending))
+                self.written += len(rows) - rejected
+                self.rejected += rejected
+                metrics.HISTORY_ROWS.labels("written").inc(len(rows) - rejected)
+                metrics.HISTORY_ROWS.labels("rejected").inc(rejected)
+                metrics.HISTORY_LAG_SECONDS.observe(time.monotonic() - batch[0][0])
+
+    async def run(self) -> None:
+        """Write batches on a size or time trigger (run as a background task)"""
+        if self.sink is None:
+            return
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def close(self) -> None:
+        """Final flush, then release the sink's connections"""
+        if self.sink is None:
+            return
+        await self.flush()
+        await self.sink.close()
+
+    def stats(self) -> dict:
+        """Queue depth and row counters"""
+        oldest = time.monotonic() - self._pending[0][0] if self._pending else 0.0
+        return {
+            "enabled": self.enabled,
+            "pending": len(self._pending),
+            "oldest_pending_seconds": round(oldest, 3),
+            "queued": self.queued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "failed_writes": self.failed_writes,
+        }
+
+
+def create_history_writer() -> HistoryWriter:
+    """Build the writer for the backend selected by HISTORY_STORE (none or mysql)"""
+    if os.getenv("HISTORY_STORE", HISTORY_NONE) != HISTORY_MYSQL:
+        return HistoryWriter(None)
+    return HistoryWriter(MySqlHistorySink(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", "3306")),
+        user=os.getenv("DB_USER", ""),
+        password=os.getenv("DB_PASSWORD", ""),
+        database=os.getenv("DB_NAME", "nexcast"),
+        pool_size=int(os.getenv("HISTORY_POOL_SIZE", "2"))
+    ))
+
+
+_history_writer = None
+
+
+def get_history_writer() -> HistoryWriter:
+    """Get or create history writer singleton"""
+    global _history_writer
+    if _history_writer is None:
+        _history_writer = create_history_writer()
+    return _history_writer
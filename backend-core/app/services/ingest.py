@@ -0,0 +1,108 @@
+"""
+Latest-frame-wins ingest
+Decouple reading the socket from processing so stale frames never queue up
+"""
+import asyncio
+import os
+from typing import Any, Awaitable
+
+POLICY_FINISH = "finish"  # In-flight frame completes, only waiting frames are replaced
+POLICY_CANCEL = "cancel"  # A newer frame also cancels in-flight work that hasn't sent audio yet
+
+DEFAULT_POLICY = os.getenv("FRAME_POLICY", POLICY_FINISH)
+
+# Frames in flight per session: 1 runs vision -> LLM -> TTS -> send back to back,
+# 2+ lets vision for the next frame overlap commentary and speech for this one
+DEFAULT_PIPELINE_DEPTH = int(os.getenv("PIPELINE_DEPTH", "2"))
+MAX_PIPELINE_DEPTH = int(os.getenv("MAX_PIPELINE_DEPTH", "4"))  # Cap on preferences.pipeline_depth
+
+
+class FrameSlot:
+    """Single-entry mailbox where the newest frame replaces any unprocessed one"""
+
+    def __init__(self, policy: str = DEFAULT_POLICY):
+        """
+        Args:
+            policy: POLICY_FINISH or POLICY_CANCEL (unknown values act as finish)
+        """
+        self.policy = policy
+        self._pending: Any = None
+        self._has_pending = asyncio.Event()
+        self._in_flight: asyncio.Task | None = None
+        self._committed = False
+
+        # Counters
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0      # Replaced by a newer frame before processing started
+        self.superseded = 0   # In-flight work cancelled for a newer frame
+
+    def put(self, item: Any) -> None:
+        """Offer a new frame, replacing any frame still waiting"""
+        self.received += 1
+        if self._pending is not None:
+            self.dropped += 1
+        self._pending = item
+        self._has_pending.set()
+
+        in_flight = self._in_flight
+        if (
+            self.policy == POLICY_CANCEL
+            and in_flight is not None
+            and not in_flight.done()
+            and not self._committed
+        ):
+            in_flight.cancel()
+            self._in_flight = None
+            self.superseded += 1
+
+    async def get(self) -> Any:
+        """Wait for and take the newest frame"""
+        await self._has_pending.wait()
+        self._has_pending.clear()
+        item, self._pending = self._pending, None
+        return item
+
+    @property
+    def idle(self) -> bool:
+        """True when no frame is waiting or being processed"""
+        return self._pending is None and self._in_flight is None
+
+    def commit(self) -> None:
+        """Mark in-flight work as past the point of cancellation (audio is being sent)"""
+        self._committed = True
+
+    async def run(self, work: Awaitable) -> bool:
+        """
+        Run the work for one frame, allowing a newer frame to cancel it
+
+        Returns:
+            bool: True if the work completed, False if a newer frame superseded it
+        """
+        self._committed = False
+        task = asyncio.ensure_future(work)
+        self._in_flight = task
+        try:
+            # Wait without awaiting the task directly, so cancelling it doesn't cancel us
+            await asyncio.wait({task})
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            self._in_flight = None
+
+        if task.cancelled():
+            return False
+        task.result()  # Re-raise pipeline errors
+        self.processed += 1
+        return True
+
+    def stats(self) -> dict:
+        """Counters for monitoring stale-frame handling"""
+        return {
+            "policy": self.policy,
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "superseded": self.superseded,
+        }
@@ -0,0 +1,208 @@
+"""
+Provider Rate Limiter
+Per-provider token bucket + concurrency cap, shared fairly across sessions
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator
+
+from . import metrics
+
+# Session the current frame belongs to; set once per frame by the pipeline so
+# services don't need a session argument on every call
+_current_session: ContextVar[tuple[object, float]] = ContextVar("current_session", default=(None, 1.0))
+
+WAIT_SAMPLES = 1024  # Recent queue waits kept for percentiles
+_NOBODY = object()  # No session waiting (None is a valid session id: calls outside a session)
+
+
+def set_current_session(session_id, weight: float = 1.0) -> None:
+    """Attribute provider calls made from this task to a session"""
+    _current_session.set((session_id, weight))
+
+
+def tier_weights() -> dict[str, float]:
+    """Parse RATE_TIER_WEIGHTS ("free:1,pro:3") into {tier: weight}"""
+    weights = {}
+    for item in os.getenv("RATE_TIER_WEIGHTS", "free:1,pro:3").split(","):
+        tier, _, weight = item.partition(":")
+        if tier.strip() and weight.strip():
+            weights[tier.strip()] = float(weight)
+    return weights
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..1) of unsorted samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ProviderLimiter:
+    """
+    Admission control for one provider
+
+    Calls wait in per-session FIFO queues. Free slots go to the waiting
+    session with the lowest virtual time (stride scheduling), which advances
+    by 1/weight per grant: equal weights give round-robin, a weight-3 tier
+    gets three grants for every one of a weight-1 session under contention.
+    """
+
+    def __init__(self, name: str, rate: float = 0.0, burst: int | None = None, max_concurrency: int = 16):
+        """
+        Args:
+            name: Provider/stage name for stats and logs
+            rate: Sustained requests per second (0 = no token bucket)
+            burst: Bucket size (defaults to max(1, rate))
+            max_concurrency: Cap on in-flight requests
+        """
+        self.name = name
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate))
+        self.max_concurrency = max(1, max_concurrency)
+
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        self._queues: dict[object, deque[tuple[asyncio.Future, float]]] = {}
+        self._pass: dict[object, float] = {}  # Virtual time per waiting session
+        self._vtime = 0.0
+        self._refill_timer: asyncio.TimerHandle | None = None
+
+        # Counters
+        self.granted = 0
+        self.throttled = 0  # Times dispatch paused for a token (rate, not concurrency, was the limit)
+        self._waits: deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self._wait_total = 0.0
+
+    @classmethod
+    def from_env(cls, prefix: str, name: str, max_concurrency: int | None = None) -> "ProviderLimiter":
+        """
+        Build from <PREFIX>_RATE, <PREFIX>_BURST and <PREFIX>_MAX_CONCURRENCY (default 16)
+
+        Args:
+            max_concurrency: Overrides <PREFIX>_MAX_CONCURRENCY when given
+        """
+        burst = os.getenv(f"{prefix}_BURST")
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv(f"{prefix}_MAX_CONCURRENCY", "16"))
+        return cls(
+            name,
+            rate=float(os.getenv(f"{prefix}_RATE", "0")),
+            burst=int(burst) if burst else None,
+            max_concurrency=max_concurrency
+        )
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one provider slot for the duration of the block"""
+        session_id, weight = _current_session.get()
+        enqueued = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(session_id)
+        if queue is None:
+            queue = self._queues[session_id] = deque()
+            # Joining sessions start at the current virtual time: no banked credit
+            self._pass[session_id] = max(self._pass.get(session_id, 0.0), self._vtime)
+        queue.append((future, weight))
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # Granted just as we were cancelled
+            else:
+                future.cancel()
+                self._dispatch()
+            raise
+
+        wait = time.monotonic() - enqueued
+        self._waits.append(wait)
+        self._wait_total += wait
+        metrics.QUEUE_WAIT_SECONDS.labels(self.name).observe(wait)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @property
+    def has_capacity(self) -> bool:
+        """True if a call made now would be granted without queueing"""
+        return self._in_flight < self.max_concurrency and not self._queues
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _refill(self) -> None:
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _next_session(self):
+        """Waiting session with the lowest virtual time, or _NOBODY (drops cancelled waiters)"""
+        best = _NOBODY
+        for session_id in list(self._queues):
+            queue = self._queues[session_id]
+            while queue and queue[0][0].done():
+                queue.popleft()
+            if not queue:
+                del self._queues[session_id]
+                continue
+            if best is _NOBODY or self._pass[session_id] < self._pass[best]:
+                best = session_id
+        return best
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiting sessions, fairly"""
+        while self._in_flight < self.max_concurrency:
+            session_id = self._next_session()
+            if session_id is _NOBODY:
+                self._pass.clear()  # Nobody waiting: forget virtual times
+                return
+            self._refill()
+            if self.rate > 0 and self._tokens < 1:
+                if self._refill_timer is None:
+                    self.throttled += 1
+                    delay = (1 - self._tokens) / self.rate
+                    self._refill_timer = asyncio.get_running_loop().call_later(delay, self._on_refill)
+                return
+            if self.rate > 0:
+                self._tokens -= 1
+
+            future, weight = self._queues[session_id].popleft()
+            self._vtime = self._pass[session_id]
+            self._pass[session_id] += 1 / max(weight, 0.01)
+            self._in_flight += 1
+            self.granted += 1
+            future.set_result(None)
+
+    def _on_refill(self) -> None:
+        self._refill_timer = None
+        self._dispatch()
+
+    def stats(self) -> dict:
+        """Queue depth, in-flight calls and queue-wait times (seconds)"""
+        waits = list(self._waits)
+        return {
+            "name": self.name,
+            "rate": self.rate,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "queued": sum(len(q) for q in self._queues.values()),
+            "queued_sessions": len(self._queues),
+            "granted": self.granted,
+            "throttled": self.throttled,
+            "wait_avg": self._wait_total / self.granted if self.granted else 0.0,
+            "wait_p50": percentile(waits, 0.50),
+            "wait_p95": percentile(waits, 0.95),
+            "wait_max": max(waits, default=0.0),
+        }
@@ -2,63 +2,138 @@
 Grok LLM Service
 Generate humorous commentary from vision descriptions
 """
-from xai_sdk import Client
-from xai_sdk.chat import system, user
+from xai_sdk import AsyncClient
+from xai_sdk.chat import assistant, system, user
+from . import metrics
+from .commentary import DUAL_SPEAKER_PROMPT, SINGLE_SPEAKER_PROMPT
+from .conversation import Conversation
+from .deadlines import StagePolicy
+from .limiter import ProviderLimiter
+from typing import AsyncIterator
 import os
 
+# Fixed, so it stays inside the cached prompt prefix
+_MEMORY_PROMPT = "Your earlier lines are in this conversation. Never repeat them; build on what you've said."
+
 
 class LlmService:
-    def __init__(self):
-        """Initialize Grok client (stateless)"""
-        self._client = Client(api_key=os.getenv("XAI_API_KEY"), timeout=3600)
-        self._model = "grok-4-fast"
-        self._system_prompt = (
-            "You are TWO sports commentators (American hype caster + British analyst) providing real-time commentary.\n\n"
-            "FORMAT: '[tag] commentary text | [tag] commentary text'\n"
-            "- First speaker (American): Play-by-play with high energy and excitement\n"
-            "- Second speaker (British): Tactical analysis with dry wit and humor\n"
-            "- TARGET: 15-20 words per speaker (30-40 words total)\n\n"
-            "AUDIO TAGS (use them!):\n"
-            "[excited], [intense], [dramatic], [analytical], [humorous], [laughs], [gasps]\n\n"
-            "EXAMPLES:\n"
-            "'[excited] Reinhardt just charged in and absolutely OBLITERATED their entire backline with that hammer! Devastating play! | [analytical] Notice how he baited out the sleep dart first—smart positioning to avoid the stun before committing.'\n"
-            "'[intense] They're getting shredded! Three down in five seconds and the fight just started! | [humorous] Their Mercy is panic-flying around like a headless chicken trying to rez everyone! [laughs]'\n"
-            "'[dramatic] Overtime! The point is contested and one team wipe ends this entire match right now! | [excited] The pressure is absolutely INSANE—every single second counts!'\n\n"
-            "REQUIREMENTS:\n"
-            "- Speaker 1: Describe the ACTION happening with HYPE and ENERGY\n"
-            "- Speaker 2: Provide INSIGHT, ANALYSIS, or HUMOR about the play\n"
-            "- Keep it fast-paced but give full thoughts—aim for 15-20 words each"
+    def __init__(self, max_concurrency: int | None = None, client=None):
+        """
+        Initialize async Grok client (stateless)
+
+        Args:
+            max_concurrency: Cap on in-flight Grok requests for this process
+                (defaults to LLM_MAX_CONCURRENCY, 16)
+            client: xAI client to use instead of the real one (e.g. a fake for load tests)
+        """
+        # The per-stage deadline below is the real limit; this only reaps abandoned requests
+        self._client = client or AsyncClient(
+            api_key=os.getenv("XAI_API_KEY"),
+            timeout=float(os.getenv("LLM_CLIENT_TIMEOUT", "120"))
         )
+        self._model = "grok-4-fast"
+        # Shared fairly across sessions; LLM_RATE/LLM_BURST add a token bucket
+        self.limiter = ProviderLimiter.from_env("LLM", "grok", max_concurrency)
+        # LLM_DEADLINE / LLM_HEDGE / LLM_FALLBACK_MODEL
+        self.policy = StagePolicy.from_env("LLM", "llm", self._model, 6.0, "grok-3-mini", self.limiter)
 
-    async def generate_comment(self, description: str, dual_speaker: bool = True) -> str:
+    def _create_chat(self, description: str, dual_speaker: bool, model: str, conversation: Conversation | None = None):
+        """
+        Build a chat with the single or dual speaker prompt
+
+        With a conversation, the session's recap and recent turns go between the
+        system prompt and the new description, oldest first, so consecutive
+        requests share everything up to the newest turn as a cacheable prefix.
+        """
+        if conversation is None:
+            chat = self._client.chat.create(model=model)
+        else:
+            chat = self._client.chat.create(model=model, conversation_id=conversation.id)
+        # Use different prompt for single vs dual speaker
+        chat.append(system(DUAL_SPEAKER_PROMPT if dual_speaker else SINGLE_SPEAKER_PROMPT))
+        if conversation is not None:
+            chat.append(system(_MEMORY_PROMPT))
+            if conversation.summary:
+                chat.append(system(f"Earlier in this match: {conversation.summary}"))
+            for earlier, comment in conversation.turns:
+                chat.append(user(f"Describe what's happening: {earlier}"))
+                chat.append(assistant(comment))
+        chat.append(user(f"Describe what's happening: {description}"))
+        return chat
+
+    @staticmethod
+    def _record_usage(response, conversation: Conversation | None) -> None:
+        """Track provider-reported prompt tokens (and how many hit the prompt cache)"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        prompt_tokens = usage.prompt_tokens
+        cached = getattr(usage, "cached_prompt_text_tokens", 0)
+        metrics.LLM_PROMPT_TOKENS.labels("prompt").observe(prompt_tokens)
+        metrics.LLM_PROMPT_TOKENS.labels("cached").observe(cached)
+        if conversation is not None:
+            conversation.record_usage(prompt_tokens, cached)
+
+    async def generate_comment(
+        self,
+        description: str,
+        dual_speaker: bool = True,
+        conversation: Conversation | None = None
+    ) -> str:
         """
         Generate commentary from vision description
 
         Args:
             description: Text description of current frame
             dual_speaker: True for dual commentary, False for single speaker
+            conversation: Session's rolling window (None = one-off prompt);
+                the new exchange is added to it
 
         Returns:
             str: Commentary text for TTS
         """
-        # Use different prompt for single vs dual speaker
-        if not dual_speaker:
-            single_prompt = (
-                "You are a high-energy sports commentator providing FAST real-time commentary.\n\n"
-                "FORMAT: '[tag] commentary text'\n"
-                "LENGTH: 15-20 words max\n"
-                "STYLE: Play-by-play with hype and excitement\n\n"
-                "AUDIO TAGS: [excited], [intense], [dramatic], [laughs], [gasps]\n\n"
-                "EXAMPLE: '[excited] Reinhardt just charged in and absolutely DEMOLISHED their entire backline!'\n\n"
-                "Keep it FAST and PUNCHY for quick action commentary."
-            )
-            chat = self._client.chat.create(model=self._model)
-            chat.append(system(single_prompt))
-            chat.append(user(f"Describe what's happening: {description}"))
-        else:
-            chat = self._client.chat.create(model=self._model)
-            chat.append(system(self._system_prompt))
-            chat.append(user(f"Describe what's happening: {description}"))
+        async def attempt(model: str) -> str:
+            chat = self._create_chat(description, dual_speaker, model, conversation)
+            # Async sample keeps the event loop free for other sessions (the policy holds the slot)
+            response = await chat.sample()
+            self._record_usage(response, conversation)
+            return response.content.strip()
+
+        comment = await self.policy.call(attempt)
+        if conversation is not None:
+            conversation.add(description, comment)
+        return comment
+
+    async def stream_comment(
+        self,
+        description: str,
+        dual_speaker: bool = True,
+        conversation: Conversation | None = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream commentary tokens as Grok generates them
+
+        Args:
+            description: Text description of current frame
+            dual_speaker: True for dual commentary, False for single speaker
+            conversation: Session's rolling window (None = one-off prompt);
+                the exchange is added once the stream completes
+
+        Yields:
+            str: Text deltas, in order
+        """
+        async def attempt(model: str) -> AsyncIterator[str]:
+            chat = self._create_chat(description, dual_speaker, model, conversation)
+            response = None
+            async for response, chunk in chat.stream():
+                if chunk.content:
+                    yield chunk.content
+            self._record_usage(response, conversation)
 
-        response = chat.sample()
-        return response.content.strip()
+        # Deadline covers time to first token
+        deltas = []
+        async for delta in self.policy.stream(attempt):
+            deltas.append(delta)
+            yield delta
+        if conversation is not None:
+            conversation.add(description, "".join(deltas).strip())
@@ -0,0 +1,39 @@
+"""
+Event Loop Lag Monitor
+Measures how late the event loop wakes up; sustained lag means CPU-bound work
+is starving every session on this worker
+"""
+import asyncio
+import time
+from collections import deque
+
+from .limiter import percentile
+
+LAG_SAMPLES = 600  # One minute of history at the default interval
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.1):
+        """
+        Args:
+            interval: Seconds between probes
+        """
+        self.interval = interval
+        self._lags: deque[float] = deque(maxlen=LAG_SAMPLES)
+
+    async def run(self) -> None:
+        """Probe forever (run as a background task)"""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self._lags.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def stats(self) -> dict:
+        """Recent lag percentiles in seconds"""
+        lags = list(self._lags)
+        return {
+            "samples": len(lags),
+            "lag_p50": percentile(lags, 0.50),
+            "lag_p99": percentile(lags, 0.99),
+            "lag_max": max(lags, default=0.0),
+        }
@@ -0,0 +1,94 @@
+"""
+Prometheus Metrics
+Per-stage latency histograms, session/frame gauges and byte counters
+
+Each observation is a lock-protected float add (~1 µs), cheap enough to
+leave on in production. With several uvicorn workers, set
+PROMETHEUS_MULTIPROC_DIR (run_server.py does this in production) so
+/metrics aggregates every worker instead of whichever one answered.
+"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Provider calls run 0.2-5 s; local stages (normalize, encode, send) run in ms
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 8, 13)
+
+STAGE_SECONDS = Histogram(
+    "nexcast_stage_seconds",
+    "Time spent in one pipeline stage for one frame",
+    ["stage", "provider"],
+    buckets=_LATENCY_BUCKETS
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "nexcast_provider_queue_wait_seconds",
+    "Time a provider call waited for a rate-limiter slot",
+    ["provider"],
+    buckets=_LATENCY_BUCKETS
+)
+FRAME_SECONDS = Histogram(
+    "nexcast_frame_seconds",
+    "Frame picked up to audio sent (first chunk when streaming)",
+    ["mode"],
+    buckets=_LATENCY_BUCKETS
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "nexcast_llm_prompt_tokens",
+    "Provider-reported prompt tokens per LLM call (kind=cached: served from the prompt cache)",
+    ["kind"],
+    buckets=(100, 200, 400, 600, 800, 1200, 1600, 2400, 3200, 4800)
+)
+HISTORY_LAG_SECONDS = Histogram(
+    "nexcast_history_lag_seconds",
+    "Age of the oldest commentary row in each batch when it reached the database",
+    buckets=(0.1, 0.5, 1, 2, 3, 5, 10, 30, 60, 120, 300)
+)
+FRAMES = Counter("nexcast_frames", "Frames by outcome", ["outcome"])
+FUSED_RESULTS = Counter("nexcast_fused_results", "Fused vision+commentary calls by result", ["result"])
+TAIL_EVENTS = Counter("nexcast_tail_events", "Deadline misses, hedged requests and model fallbacks", ["stage", "event"])
+ACTIVE_SESSIONS = Gauge("nexcast_active_sessions", "Live WebSocket sessions", multiprocess_mode="livesum")
+IN_FLIGHT_FRAMES = Gauge("nexcast_in_flight_frames", "Frames being processed", multiprocess_mode="livesum")
+HISTORY_PENDING = Gauge(
+    "nexcast_history_pending_rows", "Commentary rows waiting for the write-behind writer",
+    multiprocess_mode="livesum"
+)
+HISTORY_ROWS = Counter("nexcast_history_rows", "Commentary rows by write-behind outcome", ["outcome"])
+BYTES_IN = Counter("nexcast_received_bytes", "Bytes received from clients", ["kind"])
+BYTES_OUT = Counter("nexcast_sent_bytes", "Bytes sent to clients", ["kind"])
+
+
+@contextmanager
+def timed(stage: str, provider: str = "local") -> Iterator[None]:
+    """Record the block's wall time under nexcast_stage_seconds"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage, provider).observe(time.perf_counter() - start)
+
+
+def render() -> tuple[bytes, str]:
+    """Current metrics in Prometheus text format, plus the content type"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def worker_exited() -> None:
+    """Drop this worker's live gauges from the multiprocess totals"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,141 @@
+"""
+MP3 frame utilities
+Join clips at frame boundaries so multi-speaker audio is one valid stream
+"""
+from typing import Iterator
+
+# Bitrates in kbps, indexed by [version_is_mpeg1][layer][bitrate_index]
+_BITRATES = {
+    True: {
+        1: (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+        2: (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+        3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    },
+    False: {
+        1: (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+        2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+        3: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    },
+}
+
+# Sample rates in Hz, indexed by version bits then sample-rate index
+_SAMPLE_RATES = {
+    0b11: (44100, 48000, 32000),  # MPEG-1
+    0b10: (22050, 24000, 16000),  # MPEG-2
+    0b00: (11025, 12000, 8000),   # MPEG-2.5
+}
+
+_LAYERS = {0b11: 1, 0b10: 2, 0b01: 3}
+
+
+def _strip_tags(data: bytes) -> bytes:
+    """Remove a leading ID3v2 tag and a trailing ID3v1 tag"""
+    if data[:3] == b"ID3" and len(data) >= 10:
+        # Tag size is a 28-bit synchsafe integer, excluding the 10-byte header
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        if data[5] & 0x10:  # Footer present
+            size += 10
+        data = data[10 + size:]
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        data = data[:-128]
+    return data
+
+
+def _parse_header(data: bytes, pos: int) -> tuple[int, int, int, bool] | None:
+    """
+    Parse the frame header at pos
+
+    Returns:
+        (frame_length, sample_rate, samples_per_frame, is_mono) or None if
+        there is no valid header at this position
+    """
+    if pos + 4 > len(data):
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    if data[pos] != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version_bits = (b1 >> 3) & 0b11
+    layer = _LAYERS.get((b1 >> 1) & 0b11)
+    bitrate_index = (b2 >> 4) & 0x0F
+    sample_rate_index = (b2 >> 2) & 0b11
+    if version_bits == 0b01 or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version_bits == 0b11
+    bitrate = _BITRATES[mpeg1][layer][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][sample_rate_index]
+    padding = (b2 >> 1) & 1
+    is_mono = (b3 >> 6) == 0b11
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, sample_rate, 384, is_mono
+    if layer == 3 and not mpeg1:
+        return 72 * bitrate // sample_rate + padding, sample_rate, 576, is_mono
+    return 144 * bitrate // sample_rate + padding, sample_rate, 1152, is_mono
+
+
+def iter_frames(data: bytes) -> Iterator[bytes]:
+    """Yield each complete MPEG audio frame, skipping tags and junk bytes"""
+    data = _strip_tags(data)
+    pos = 0
+    while pos + 4 <= len(data):
+        header = _parse_header(data, pos)
+        if header is None or pos + header[0] > len(data):
+            # Resync on the next candidate sync word
+            pos = data.find(b"\xff", pos + 1)
+            if pos < 0:
+                return
+            continue
+        length = header[0]
+        yield data[pos:pos + length]
+        pos += length
+
+
+def _is_info_frame(frame: bytes) -> bool:
+    """Check whether a frame carries a Xing/Info or VBRI header instead of audio"""
+    header = _parse_header(frame, 0)
+    if header is None:
+        return False
+    mpeg1 = (frame[1] >> 3) & 0b11 == 0b11
+    _, _, _, is_mono = header
+    # Xing/Info lives right after the side information block
+    if mpeg1:
+        offset = 4 + (17 if is_mono else 32)
+    else:
+        offset = 4 + (9 if is_mono else 17)
+    if frame[offset:offset + 4] in (b"Xing", b"Info"):
+        return True
+    return frame[36:40] == b"VBRI"
+
+
+def join(*clips: bytes) -> bytes:
+    """
+    Join MP3 clips into one stream at frame boundaries
+
+    ID3 tags and Xing/Info/VBRI header frames are dropped from every clip,
+    since their frame counts and seek tables would describe only the first
+    clip and make players stop or seek incorrectly.
+
+    Args:
+        clips: MP3 clips encoded with the same sample rate and channel mode
+
+    Returns:
+        bytes: Concatenated audio frames
+    """
+    out = bytearray()
+    for clip in clips:
+        for frame in iter_frames(clip):
+            if not _is_info_frame(frame):
+                out += frame
+    return bytes(out)
+
+
+def duration(data: bytes) -> float:
+    """Playback length of an MP3 stream in seconds (0.0 if it has no audio frames)"""
+    seconds = 0.0
+    for frame in iter_frames(data):
+        if not _is_info_frame(frame):
+            _, sample_rate, samples, _ = _parse_header(frame, 0)
+            seconds += samples / sample_rate
+    return seconds
@@ -0,0 +1,150 @@
+"""
+Adaptive Capture Pacing
+Recommend how often each client should capture a frame, from what the server sees
+
+A fixed capture interval is wrong both ways: during a quiet menu it pays for
+frames nobody needs, and during a teamfight it misses the action. Under load,
+frames sent faster than the pipeline answers them are just dropped in the
+slot. The pacer starts from the client's own interval and adjusts it:
+
+    - scene change (dedup hash distance): static scenes stretch it up to 2x,
+      busy scenes shrink it down to 0.5x, but only while latency is within target
+    - pipeline latency: never faster than the session can answer frames
+      (latency / pipeline depth, or the full latency once over target)
+    - audio still queued on the client: no new frame until its commentary
+      would arrive about as the current audio finishes
+"""
+import math
+import os
+import time
+
+# Bounds and behaviour of the recommended interval (milliseconds / seconds)
+PACE_MIN_MS = int(os.getenv("PACE_MIN_MS", "2000"))
+PACE_MAX_MS = int(os.getenv("PACE_MAX_MS", "30000"))
+PACE_TARGET_LATENCY = float(os.getenv("PACE_TARGET_LATENCY", "4"))
+# Dedup hash distance (of 64 bits) treated as a full scene change
+PACE_ACTION_DISTANCE = int(os.getenv("PACE_ACTION_DISTANCE", "24"))
+# Only push a new pace when it moved at least this fraction from the last one sent
+PACE_HYSTERESIS = float(os.getenv("PACE_HYSTERESIS", "0.15"))
+
+DEFAULT_INTERVAL_MS = 10000  # Frontend's default capture_interval
+CLIENT_REPORT_TTL = 30.0  # Seconds a client playback report overrides the server estimate
+
+_ALPHA = 0.3  # EWMA weight of the newest sample
+
+
+def _base_interval(value) -> float:
+    """The client's capture_interval in seconds: a finite PACE_MIN_MS..PACE_MAX_MS, else the default"""
+    try:
+        interval_ms = float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_INTERVAL_MS / 1000
+    if isinstance(value, bool) or not math.isfinite(interval_ms) or not PACE_MIN_MS <= interval_ms <= PACE_MAX_MS:
+        return DEFAULT_INTERVAL_MS / 1000
+    return interval_ms / 1000
+
+
+def _ewma(current: float | None, sample: float) -> float:
+    return sample if current is None else current + _ALPHA * (sample - current)
+
+
+class CapturePacer:
+    """Per-session recommended capture interval"""
+
+    def __init__(self, base_interval_ms: float | None = None, pipeline_depth: int = 1):
+        """
+        Args:
+            base_interval_ms: The client's own capture interval, the pace for a
+                steady scene at normal load (defaults to 10000, as does anything
+                outside PACE_MIN_MS..PACE_MAX_MS)
+            pipeline_depth: Frames the session may have in flight at once
+        """
+        self.base = _base_interval(base_interval_ms)
+        self.pipeline_depth = max(1, pipeline_depth)
+        self.latency: float | None = None  # EWMA seconds from frame pickup to audio sent
+        self.change: float | None = None   # EWMA scene change, 0 (static) .. 1 (new scene)
+        self._audio_until = 0.0  # Server estimate of when the client's audio runs out
+        self._reported: tuple[float, float] | None = None  # (queued seconds, monotonic time)
+        self._sent_ms: int | None = None
+
+        # Counters
+        self.updates = 0
+
+    def observe_latency(self, seconds: float) -> None:
+        """Pickup-to-audio time of an answered frame"""
+        self.latency = _ewma(self.latency, seconds)
+
+    def observe_scene(self, distance: int | None) -> None:
+        """Hash distance of a frame from the last processed one (None = unknown)"""
+        if distance is not None:
+            self.change = _ewma(self.change, min(1.0, distance / PACE_ACTION_DISTANCE))
+
+    def audio_sent(self, seconds: float) -> None:
+        """Audio of this duration was sent; the client plays it after what it already has"""
+        now = time.monotonic()
+        self._audio_until = max(now, self._audio_until) + seconds
+
+    def client_report(self, queued: float) -> None:
+        """
+        Seconds of audio the client says it still has to play
+
+        Raises:
+            ValueError: Not a finite number (reports come straight from the client)
+        """
+        if isinstance(queued, bool) or not isinstance(queued, (int, float)) or not math.isfinite(queued):
+            raise ValueError(f"audio_queued must be a finite number of seconds, got {queued!r}")
+        self._reported = (max(0.0, float(queued)), time.monotonic())
+
+    def queued_audio(self) -> float:
+        """Seconds of commentary still to be played on the client"""
+        now = time.monotonic()
+        if self._reported is not None:
+            queued, at = self._reported
+            if now - at < CLIENT_REPORT_TTL:
+                return max(0.0, queued - (now - at))
+        return max(0.0, self._audio_until - now)
+
+    def recommend(self) -> tuple[int, str]:
+        """
+        Returns:
+            (interval in ms, reason): reason names the input that set it -
+            "load", "audio", "action", "static" or "steady"
+        """
+        interval, reason = self.base, "steady"
+        latency = self.latency or 0.0
+        if self.change is not None:
+            # 2x at a static scene, 1x at half the action distance, 0.5x at a full change
+            factor = 2 ** (1 - 2 * self.change)
+            if factor < 1 and latency > PACE_TARGET_LATENCY:
+                factor = 1.0  # No capacity to spare for speeding up
+            interval = self.base * factor
+            if abs(factor - 1) > PACE_HYSTERESIS:
+                reason = "action" if factor < 1 else "static"
+
+        floor = latency if latency > PACE_TARGET_LATENCY else latency / self.pipeline_depth
+        if floor > interval:
+            interval, reason = floor, "load"
+        backlog = self.queued_audio() - latency
+        if backlog > interval:
+            interval, reason = backlog, "audio"
+
+        return int(min(PACE_MAX_MS, max(PACE_MIN_MS, interval * 1000))), reason
+
+    def update(self) -> dict | None:
+        """The pace message to send, or None if the pace hasn't moved enough"""
+        interval_ms, reason = self.recommend()
+        if self._sent_ms is not None and abs(interval_ms - self._sent_ms) <= self._sent_ms * PACE_HYSTERESIS:
+            return None
+        self._sent_ms = interval_ms
+        self.updates += 1
+        return {"type": "pace", "interval_ms": interval_ms, "reason": reason}
+
+    def stats(self) -> dict:
+        """Current inputs and the last pace sent"""
+        return {
+            "interval_ms": self._sent_ms,
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "scene_change": round(self.change, 3) if self.change is not None else None,
+            "queued_audio": round(self.queued_audio(), 3),
+            "updates": self.updates,
+        }
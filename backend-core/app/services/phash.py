@@ -0,0 +1,109 @@
+"""
+Perceptual frame hashing
+Skip near-identical frames (menus, pause and loading screens) before Vision
+"""
+import asyncio
+import base64
+import io
+import os
+
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8  # 8x8 gradient bits -> 64-bit hash
+
+# Frames closer than this Hamming distance to the last answered frame are skipped (0 disables)
+DEFAULT_THRESHOLD = int(os.getenv("DEDUP_THRESHOLD", "5"))
+
+
+def dhash(frame: bytes | str, size: int = HASH_SIZE) -> int:
+    """
+    Difference hash of a JPEG frame
+
+    The frame is decoded at reduced scale, converted to grayscale and shrunk
+    to (size + 1) x size; each bit records whether a pixel is brighter than
+    its right-hand neighbour.
+
+    Args:
+        frame: JPEG bytes or base64-encoded JPEG
+        size: Hash side length (size * size bits)
+
+    Returns:
+        int: Perceptual hash
+    """
+    frame_bytes = base64.b64decode(frame) if isinstance(frame, str) else frame
+    with Image.open(io.BytesIO(frame_bytes)) as image:
+        # Let the JPEG decoder downscale via DCT instead of decoding full resolution
+        image.draft("L", (size * 8, size * 8))
+        pixels = np.asarray(
+            image.convert("L").resize((size + 1, size), Image.Resampling.BILINEAR),
+            dtype=np.int16
+        )
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return (a ^ b).bit_count()
+
+
+class FrameDeduplicator:
+    """Per-session check of each frame against the last frame that was answered"""
+
+    def __init__(self, threshold: int = DEFAULT_THRESHOLD):
+        """
+        Args:
+            threshold: Skip frames whose Hamming distance is below this (0 disables)
+        """
+        self.threshold = threshold
+        self._last_hash: int | None = None
+        self.last_distance: int | None = None  # Distance of the last checked frame (None before two)
+
+        # Counters
+        self.checked = 0
+        self.skipped = 0
+
+    async def check(self, frame: bytes | str) -> tuple[bool, int | None]:
+        """
+        Hash the frame off the event loop and compare it with the last answered one
+
+        The reference only moves on commit(), once a frame has been answered:
+        a frame that is dropped or fails before any audio goes out must not
+        become the baseline that later frames are skipped against.
+
+        Returns:
+            (duplicate, hash to pass to commit() once the frame is answered; None if not hashed)
+        """
+        if self.threshold <= 0:
+            return False, None
+
+        try:
+            frame_hash = await asyncio.to_thread(dhash, frame)
+        except (OSError, ValueError):
+            # Undecodable frame: let Vision handle (or reject) it
+            return False, None
+
+        self.checked += 1
+        self.last_distance = None if self._last_hash is None else hamming(frame_hash, self._last_hash)
+        if self.last_distance is not None and self.last_distance < self.threshold:
+            self.skipped += 1
+            return True, None
+        return False, frame_hash
+
+    def commit(self, frame_hash: int | None) -> None:
+        """
+        Make an answered frame the new reference, so a slowly drifting scene
+        still triggers commentary once it has changed enough
+        """
+        if frame_hash is not None:
+            self._last_hash = frame_hash
+
+    def stats(self) -> dict:
+        """Counters for tuning the threshold"""
+        return {
+            "threshold": self.threshold,
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "skip_rate": self.skipped / self.checked if self.checked else 0.0,
+        }
@@ -1,23 +1,67 @@
 """
-Commentary Pipeline: Frame -> Vision -> LLM -> TTS -> Audio
+Commentary Pipeline: Frame -> Normalize -> Vision -> LLM -> TTS -> Audio
 Singleton services for efficient resource usage
 """
+from . import fakes, metrics, mp3
+from .artifacts import get_audio_artifacts
+from .frames import FrameNormalizer
 from .vision import VisionService
 from .llm import LlmService
 from .tts import TTSService
-import base64
+from .chunker import SpeechChunker
+from .history import get_history_writer
+from .limiter import set_current_session
+from .sessions import SessionState
+from typing import AsyncIterator, NamedTuple
+import asyncio
+import os
+import time
+
+# "live" calls Gemini/Grok/ElevenLabs; "fake" swaps in simulated providers
+# (latency/error rates from FAKE_* settings) for load testing without keys
+PROVIDERS = os.getenv("PROVIDERS", "live")
+
+# "two_stage": Gemini describes, Grok writes the commentary; "fused": one Gemini
+# call does both (falls back to Grok if its commentary fails validation).
+# Sessions pick with the commentary_mode init preference.
+MODE_TWO_STAGE = "two_stage"
+MODE_FUSED = "fused"
+DEFAULT_COMMENTARY_MODE = os.getenv("COMMENTARY_MODE", MODE_TWO_STAGE)
+
+
+class DescribedFrame(NamedTuple):
+    """Output of describe_frame, input to speak/speak_streaming"""
+    description: str
+    comment: str | None  # Already written (fused mode), else None
+    comment_model: str | None  # Model that wrote `comment` (primary or fallback)
+
+
+class SpokenFrame(NamedTuple):
+    """Output of speak"""
+    audio: bytes  # MP3
+    clip_id: str | None  # Artifact store id the audio was saved under (None if the store is off)
+
 
 # Singleton instances (lazy-loaded on first use)
+_frame_normalizer = None
 _vision_service = None
 _llm_service = None
 _tts_service = None
 
 
+def get_frame_normalizer() -> FrameNormalizer:
+    """Get or create frame normalizer singleton"""
+    global _frame_normalizer
+    if _frame_normalizer is None:
+        _frame_normalizer = FrameNormalizer()
+    return _frame_normalizer
+
+
 def get_vision_service() -> VisionService:
     """Get or create Vision service singleton"""
     global _vision_service
     if _vision_service is None:
-        _vision_service = VisionService()
+        _vision_service = VisionService(client=fakes.gemini_client() if PROVIDERS == "fake" else None)
     return _vision_service
 
 
@@ -25,7 +69,7 @@ def get_llm_service() -> LlmService:
     """Get or create LLM service singleton"""
     global _llm_service
     if _llm_service is None:
-        _llm_service = LlmService()
+        _llm_service = LlmService(client=fakes.xai_client() if PROVIDERS == "fake" else None)
     return _llm_service
 
 
@@ -33,50 +77,240 @@ def get_tts_service() -> TTSService:
     """Get or create TTS service singleton"""
     global _tts_service
     if _tts_service is None:
-        _tts_service = TTSService()
+        _tts_service = TTSService(client=fakes.elevenlabs_client() if PROVIDERS == "fake" else None)
     return _tts_service
 
 
-async def process_frame(
-    session_id: str,
-    frame_base64: str,
-    preferences: dict
-) -> str:
+def _record_history(session_id, description: str, comment: str, model: str, audio: bytes) -> str | None:
     """
-    Process frame through full pipeline
+    Store the frame's audio and queue its commentary for the history table
+    (both write-behind, never block)
+
+    Args:
+        model: Model that actually wrote the commentary (the fallback after a missed deadline)
+
+    Returns:
+        str | None: The audio's clip id, if the artifact store saved it
+    """
+    artifacts = get_audio_artifacts()
+    clip_id = artifacts.save(audio) if artifacts.enabled and audio else None
+    writer = get_history_writer()
+    if writer.enabled:
+        writer.record(session_id, description, comment, model, artifacts.url(clip_id) if clip_id else None)
+    return clip_id
+
+
+async def describe_frame(
+    session: SessionState,
+    frame: bytes | str,
+    frame_hash: int | None = None
+) -> DescribedFrame:
+    """
+    First pipeline stage: normalize the frame and describe it with vision
+
+    Appends the description to the session's rolling context, so frames must
+    be described in order. In fused mode the same call also writes the
+    commentary.
 
     Args:
-        session_id: Session identifier for context tracking
-        frame_base64: Base64-encoded JPEG frame
-        preferences: User preferences (voice, commentary_style)
+        session: Session state (preferences, rolling vision context)
+        frame: JPEG bytes, or a base64-encoded JPEG from JSON clients
+        frame_hash: The frame's dhash from dedup, reused for the vision cache
 
     Returns:
-        str: Base64-encoded MP3 audio
+        DescribedFrame: Scene description, and commentary (with its model) if already written
     """
-    # 1. Vision: Frame + Context -> Description
+    session_id = session.session_id
+    set_current_session(session_id, session.weight)  # Fair share of provider slots
+
+    # 0. Normalize: shrink/re-encode the frame before upload
+    with metrics.timed("normalize"):
+        frame = await get_frame_normalizer().normalize(frame, session.frame_options)
+
+    # 1. Vision: Frame + Context -> Description (+ Commentary when fused)
     vision = get_vision_service()
-    description = await vision.analyze_with_context(frame_base64, session_id)
+    comment = comment_model = None
+    if session.preferences.get("commentary_mode", DEFAULT_COMMENTARY_MODE) == MODE_FUSED:
+        dual_speaker = bool(session.preferences.get("speaker2_voice_id"))
+        # Timed inside VisionService: Gemini calls and cache hits separately
+        description, comment = await vision.commentate(frame, session.history, dual_speaker, frame_hash)
+        if comment is not None:
+            comment_model = vision.policy.served_model()
+    else:
+        description = await vision.analyze_with_context(frame, session.history, frame_hash)
     print(f"[{session_id}] Vision: {description}")
+    await session.share_description(description)
+    return DescribedFrame(description, comment, comment_model)
+
+
+async def speak(
+    session: SessionState,
+    description: str,
+    comment: str | None = None,
+    comment_model: str | None = None
+) -> SpokenFrame:
+    """
+    Second pipeline stage: commentary and speech for a described frame
+
+    Args:
+        session: Session state (preferences)
+        description: Scene description from describe_frame
+        comment: Commentary from describe_frame, if fused mode already wrote it
+
+    Returns:
+        SpokenFrame: MP3 audio, and its clip id when the artifact store is on
+    """
+    session_id = session.session_id
+    preferences = session.preferences
+    set_current_session(session_id, session.weight)
 
     # 2. LLM: Description -> Commentary
     llm = get_llm_service()
     speaker2 = preferences.get("speaker2_voice_id")
     dual_speaker = bool(speaker2)  # True if speaker2 is set
-    comment = await llm.generate_comment(description, dual_speaker=dual_speaker)
+    if comment is None:
+        with metrics.timed("llm", "grok"):
+            comment = await llm.generate_comment(description, dual_speaker, session.conversation)
+        comment_model = llm.policy.served_model()
+    else:
+        session.conversation.add(description, comment)  # Fused: keep the LLM's memory complete
     print(f"[{session_id}] Comment: {comment}")
 
     # 3. TTS: Commentary -> Audio (ElevenLabs multi-speaker)
     tts = get_tts_service()
     speaker1 = preferences.get("speaker1_voice_id", "qVpGLzi5EhjW3WGVhOa9")
 
-    audio_bytes = await tts.synthesize(
-        text=comment,
-        voice_id=speaker1,
-        voice_id_2=speaker2 if dual_speaker else None
-    )
+    with metrics.timed("tts", "elevenlabs"):
+        audio_bytes = await tts.synthesize(
+            text=comment,
+            voice_id=speaker1,
+            voice_id_2=speaker2 if dual_speaker else None
+        )
 
-    # Convert to base64 for WebSocket transmission
-    audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
     print(f"[{session_id}] Audio generated: {len(audio_bytes)} bytes")
+    clip_id = _record_history(session_id, description, comment, comment_model, audio_bytes)
+
+    return SpokenFrame(audio_bytes, clip_id)
+
 
-    return audio_base64
+async def speak_streaming(
+    session: SessionState,
+    description: str,
+    comment: str | None = None,
+    comment_model: str | None = None
+) -> AsyncIterator[tuple[int, bytes]]:
+    """
+    Second pipeline stage with streaming LLM and TTS
+
+    Commentary tokens are split into sentence/speaker chunks while Grok is
+    still generating, and each chunk is streamed through TTS in order.
+
+    Args:
+        session: Session state (preferences)
+        description: Scene description from describe_frame
+        comment: Commentary from describe_frame, if fused mode already wrote it
+
+    Yields:
+        tuple[int, bytes]: (segment index, MP3 chunk); each segment is one
+        text chunk and decodes on its own once all of its chunks arrive
+    """
+    session_id = session.session_id
+    preferences = session.preferences
+    set_current_session(session_id, session.weight)
+
+    llm = get_llm_service()
+    tts = get_tts_service()
+    speaker1 = preferences.get("speaker1_voice_id", "qVpGLzi5EhjW3WGVhOa9")
+    speaker2 = preferences.get("speaker2_voice_id")
+    dual_speaker = bool(speaker2)
+    voices = [speaker1, speaker2] if dual_speaker else [speaker1]
+
+    # 2. LLM: stream tokens into speakable chunks (producer)
+    text_chunks: asyncio.Queue = asyncio.Queue()
+    written: list[str] = []  # Full commentary, for the history table
+    written_by = [comment_model]
+
+    async def produce():
+        chunker = SpeechChunker()
+        try:
+            if comment is not None:
+                session.conversation.add(description, comment)
+                written.append(comment)
+                for chunk in chunker.feed(comment) + chunker.flush():
+                    await text_chunks.put(chunk)
+                return
+            with metrics.timed("llm", "grok"):
+                async for delta in llm.stream_comment(description, dual_speaker, session.conversation):
+                    written.append(delta)
+                    for chunk in chunker.feed(delta):
+                        await text_chunks.put(chunk)
+                for chunk in chunker.flush():
+                    await text_chunks.put(chunk)
+            written_by[0] = llm.policy.served_model()
+        finally:
+            await text_chunks.put(None)
+
+    producer = asyncio.create_task(produce())
+
+    # 3. TTS: stream each chunk in order while the LLM keeps generating
+    clips: list[list[bytes]] = []  # Each segment's chunks, joined into one clip for the artifact store
+    try:
+        segment = 0
+        while (item := await text_chunks.get()) is not None:
+            speaker, text = item
+            print(f"[{session_id}] Chunk {segment}: {text}")
+            voice_id = voices[min(speaker, len(voices) - 1)]
+            # TTS stage = time to this segment's first chunk (the rest overlaps sending)
+            started = time.perf_counter()
+            clips.append([])
+            async for audio_chunk in tts.stream(text, voice_id=voice_id):
+                clips[-1].append(audio_chunk)
+                if started is not None:
+                    metrics.STAGE_SECONDS.labels("tts", "elevenlabs").observe(time.perf_counter() - started)
+                    started = None
+                yield segment, audio_chunk
+            segment += 1
+        # Surface LLM errors once the queue is drained
+        await producer
+        _record_history(
+            session_id, description, "".join(written).strip(), written_by[0],
+            mp3.join(*(b"".join(chunks) for chunks in clips)) if get_audio_artifacts().enabled else b""
+        )
+    finally:
+        producer.cancel()
+
+
+async def process_frame(
+    session: SessionState,
+    frame: bytes | str
+) -> bytes:
+    """
+    Process frame through full pipeline
+
+    Args:
+        session: Session state (preferences, rolling vision context)
+        frame: JPEG bytes, or a base64-encoded JPEG from JSON clients
+
+    Returns:
+        bytes: MP3 audio
+    """
+    spoken = await speak(session, *await describe_frame(session, frame))
+    return spoken.audio
+
+
+async def stream_frame(
+    session: SessionState,
+    frame: bytes | str
+) -> AsyncIterator[tuple[int, bytes]]:
+    """
+    Process frame with streaming LLM and TTS for low time-to-first-audio
+
+    Args:
+        session: Session state (preferences, rolling vision context)
+        frame: JPEG bytes, or a base64-encoded JPEG from JSON clients
+
+    Yields:
+        tuple[int, bytes]: (segment index, MP3 chunk), see speak_streaming
+    """
+    async for item in speak_streaming(session, *await describe_frame(session, frame)):
+        yield item
@@ -0,0 +1,214 @@
+"""
+Session State Store
+Shared session state (preferences, rolling descriptions, counters) that
+outlives a single connection, so a reconnect landing on another worker or
+node keeps its context
+"""
+import json
+import os
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+
+from .cache import LruCache
+
+STORE_MEMORY = "memory"  # Per-process; fine for a single uvicorn worker
+STORE_REDIS = "redis"    # Shared across workers and nodes
+
+
+class SessionStore(ABC):
+    """Backend interface; every write refreshes the session's TTL"""
+
+    @abstractmethod
+    async def save_preferences(self, session_id, preferences: dict) -> None:
+        """Store the preferences sent with init"""
+
+    @abstractmethod
+    async def load_preferences(self, session_id) -> dict | None:
+        """Preferences from a previous connection, or None"""
+
+    @abstractmethod
+    async def save_tier(self, session_id, tier: str) -> None:
+        """Grant a rate tier (server side only; never from client preferences)"""
+
+    @abstractmethod
+    async def load_tier(self, session_id) -> str | None:
+        """The session's granted rate tier, or None"""
+
+    @abstractmethod
+    async def push_description(self, session_id, description: str, keep: int) -> None:
+        """Append a vision description, keeping only the newest `keep`"""
+
+    @abstractmethod
+    async def descriptions(self, session_id) -> list[str]:
+        """Rolling descriptions, oldest first"""
+
+    @abstractmethod
+    async def incr(self, session_id, counts: dict[str, int]) -> None:
+        """Add to named counters"""
+
+    @abstractmethod
+    async def counters(self, session_id) -> dict[str, int]:
+        """All counters for the session"""
+
+    @abstractmethod
+    async def delete(self, session_id) -> None:
+        """Drop everything stored for the session"""
+
+    async def close(self) -> None:
+        """Release connections"""
+
+
+class _Entry:
+    __slots__ = ("preferences", "tier", "descriptions", "counters")
+
+    def __init__(self):
+        self.preferences: dict | None = None
+        self.tier: str | None = None
+        self.descriptions: deque[str] = deque()
+        self.counters: Counter = Counter()
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store backed by a bounded LRU with a TTL"""
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        """
+        Args:
+            ttl: Seconds after the last write before a session's state expires
+            max_entries: Session cap (least recently written evicted first)
+        """
+        self._entries = LruCache(max_entries=max_entries, max_bytes=max_entries * 4096, ttl=ttl)
+
+    def _read(self, session_id) -> _Entry | None:
+        return self._entries.peek(session_id)
+
+    def _write(self, session_id) -> _Entry:
+        entry = self._entries.peek(session_id) or _Entry()
+        self._entries.put(session_id, entry, 0)  # Re-put refreshes the TTL
+        return entry
+
+    async def save_preferences(self, session_id, preferences: dict) -> None:
+        self._write(session_id).preferences = dict(preferences)
+
+    async def load_preferences(self, session_id) -> dict | None:
+        entry = self._read(session_id)
+        return dict(entry.preferences) if entry and entry.preferences is not None else None
+
+    async def save_tier(self, session_id, tier: str) -> None:
+        self._write(session_id).tier = tier
+
+    async def load_tier(self, session_id) -> str | None:
+        entry = self._read(session_id)
+        return entry.tier if entry else None
+
+    async def push_description(self, session_id, description: str, keep: int) -> None:
+        descriptions = self._write(session_id).descriptions
+        descriptions.append(description)
+        while len(descriptions) > keep:
+            descriptions.popleft()
+
+    async def descriptions(self, session_id) -> list[str]:
+        entry = self._read(session_id)
+        return list(entry.descriptions) if entry else []
+
+    async def incr(self, session_id, counts: dict[str, int]) -> None:
+        self._write(session_id).counters.update(counts)
+
+    async def counters(self, session_id) -> dict[str, int]:
+        entry = self._read(session_id)
+        return dict(entry.counters) if entry else {}
+
+    async def delete(self, session_id) -> None:
+        self._entries.discard(session_id)
+
+
+class RedisSessionStore(SessionStore):
+    """Store on any Redis-protocol server (Redis, Valkey, KeyDB, ...)"""
+
+    def __init__(self, url: str, ttl: float, prefix: str = "nexcast:"):
+        """
+        Args:
+            url: redis:// or rediss:// connection URL
+            ttl: Seconds after the last write before a session's keys expire
+            prefix: Key namespace
+        """
+        # Only needed when this backend is selected
+        import redis.asyncio as redis
+
+        # RESP2 works with every Redis-compatible server, old or new
+        self._redis = redis.from_url(url, decode_responses=True, protocol=2)
+        self._ttl = int(ttl)
+        self._prefix = prefix
+
+    def _key(self, session_id, field: str) -> str:
+        # Hash tag keeps one session's keys on the same cluster slot
+        return f"{self._prefix}session:{{{session_id}}}:{field}"
+
+    async def save_preferences(self, session_id, preferences: dict) -> None:
+        await self._redis.set(self._key(session_id, "prefs"), json.dumps(preferences), ex=self._ttl)
+
+    async def load_preferences(self, session_id) -> dict | None:
+        raw = await self._redis.get(self._key(session_id, "prefs"))
+        return json.loads(raw) if raw is not None else None
+
+    async def save_tier(self, session_id, tier: str) -> None:
+        await self._redis.set(self._key(session_id, "tier"), tier, ex=self._ttl)
+
+    async def load_tier(self, session_id) -> str | None:
+        return await self._redis.get(self._key(session_id, "tier"))
+
+    async def push_description(self, session_id, description: str, keep: int) -> None:
+        key = self._key(session_id, "desc")
+        # One round trip for append + trim + TTL refresh
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.rpush(key, description)
+            pipe.ltrim(key, -keep, -1)
+            pipe.expire(key, self._ttl)
+            await pipe.execute()
+
+    async def descriptions(self, session_id) -> list[str]:
+        return await self._redis.lrange(self._key(session_id, "desc"), 0, -1)
+
+    async def incr(self, session_id, counts: dict[str, int]) -> None:
+        if not counts:
+            return
+        key = self._key(session_id, "counters")
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for name, amount in counts.items():
+                pipe.hincrby(key, name, amount)
+            pipe.expire(key, self._ttl)
+            await pipe.execute()
+
+    async def counters(self, session_id) -> dict[str, int]:
+        raw = await self._redis.hgetall(self._key(session_id, "counters"))
+        return {name: int(value) for name, value in raw.items()}
+
+    async def delete(self, session_id) -> None:
+        await self._redis.delete(*(self._key(session_id, f) for f in ("prefs", "tier", "desc", "counters")))
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def create_session_store() -> SessionStore:
+    """Build the backend selected by SESSION_STORE (memory or redis)"""
+    backend = os.getenv("SESSION_STORE", STORE_MEMORY)
+    ttl = float(os.getenv("SESSION_STATE_TTL", "3600"))
+    if backend == STORE_REDIS:
+        return RedisSessionStore(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            ttl,
+            prefix=os.getenv("REDIS_PREFIX", "nexcast:")
+        )
+    return InMemorySessionStore(ttl)
+
+
+_session_store = None
+
+
+def get_session_store() -> SessionStore:
+    """Get or create session store singleton"""
+    global _session_store
+    if _session_store is None:
+        _session_store = create_session_store()
+    return _session_store
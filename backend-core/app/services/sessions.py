@@ -0,0 +1,287 @@
+"""
+Session Registry
+Single owner of all per-session state on this node, with bounded memory
+"""
+import asyncio
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from typing import Callable
+
+from .conversation import Conversation
+from .frames import frame_options
+from .ingest import DEFAULT_PIPELINE_DEPTH, DEFAULT_POLICY, MAX_PIPELINE_DEPTH, FrameSlot
+from .limiter import tier_weights
+from .pacing import CapturePacer
+from .phash import DEFAULT_THRESHOLD, HASH_SIZE, FrameDeduplicator
+from .session_store import SessionStore, get_session_store
+
+SESSION_OVERHEAD = 4096  # Rough fixed bytes per session (objects, slot, dedup state, task)
+
+
+def _dedup_threshold(value) -> int:
+    """preferences.dedup_threshold as a Hamming distance (0-64), else the default"""
+    try:
+        threshold = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_THRESHOLD
+    return threshold if 0 <= threshold <= HASH_SIZE * HASH_SIZE else DEFAULT_THRESHOLD
+
+
+def _pipeline_depth(value) -> int:
+    """preferences.pipeline_depth clamped to 1..MAX_PIPELINE_DEPTH, else the default"""
+    try:
+        depth = int(value)
+    except (TypeError, ValueError):
+        depth = DEFAULT_PIPELINE_DEPTH
+    return min(MAX_PIPELINE_DEPTH, max(1, depth))
+
+
+class SessionState:
+    """Everything the node keeps for one live session"""
+
+    def __init__(
+        self,
+        session_id,
+        preferences: dict,
+        protocol: str,
+        store: SessionStore | None = None,
+        tier: str | None = None
+    ):
+        """
+        Args:
+            tier: Rate tier granted server side (SessionStore.save_tier); clients
+                can't pick their own, so a preferences.tier is ignored
+        """
+        self.session_id = session_id
+        self.preferences = dict(preferences)  # As persisted: validated values replace what the client sent
+        self.protocol = protocol
+        self.store = store  # Shared state that outlives this connection (None = local only)
+        self.history: deque[str] = deque(maxlen=3)  # Rolling vision descriptions
+        self.conversation = Conversation(session_id)  # LLM's rolling window of its own exchanges
+        self.ingest = FrameSlot(preferences.get("frame_policy", DEFAULT_POLICY))
+        self.frame_options = frame_options(preferences, session_id)  # Parsed once, for the normalizer
+        self.dedup = FrameDeduplicator(_dedup_threshold(preferences.get("dedup_threshold", DEFAULT_THRESHOLD)))
+        self.pipeline_depth = _pipeline_depth(preferences.get("pipeline_depth", DEFAULT_PIPELINE_DEPTH))
+        if "pipeline_depth" in preferences:
+            self.preferences["pipeline_depth"] = self.pipeline_depth
+        self.frames_in_flight = 0  # Taken from the slot and not yet answered (any stage)
+        # Recommended capture interval, pushed as "pace" messages when preferences.adaptive_pace is set
+        self.pacer = CapturePacer(preferences.get("capture_interval"), self.pipeline_depth)
+        # Share of provider capacity under contention (RATE_TIER_WEIGHTS)
+        self.tier = tier or "free"
+        self.weight = tier_weights().get(self.tier, 1.0)
+        self.created_at = time.monotonic()
+        self.last_active = self.created_at
+        self.on_evict: Callable[[str], None] | None = None  # Set by the connection handler
+
+    def touch(self) -> None:
+        """Record activity (resets the idle TTL)"""
+        self.last_active = time.monotonic()
+
+    @property
+    def idle(self) -> bool:
+        """True when no frame is waiting or anywhere in the pipeline"""
+        return self.ingest.idle and self.frames_in_flight == 0
+
+    async def share_description(self, description: str) -> None:
+        """Write a new vision description through to the shared store"""
+        if self.store is None:
+            return
+        try:
+            await self.store.push_description(self.session_id, description, self.history.maxlen)
+        except Exception as e:
+            # Losing shared context only matters on reconnect; keep commentating
+            print(f"[{self.session_id}] Session store write failed: {e}")
+
+    def counters(self) -> dict[str, int]:
+        """This connection's frame counters, for flushing to the store"""
+        ingest = self.ingest.stats()
+        return {
+            "frames_received": ingest["received"],
+            "frames_processed": ingest["processed"],
+            "frames_dropped": ingest["dropped"],
+            "frames_superseded": ingest["superseded"],
+            "frames_unchanged": self.dedup.skipped,
+            "llm_prompt_tokens": self.conversation.prompt_tokens,
+            "llm_cached_prompt_tokens": self.conversation.cached_prompt_tokens,
+        }
+
+    def approx_bytes(self) -> int:
+        """Rough memory held by this session"""
+        history = sum(sys.getsizeof(d) for d in self.history)
+        history += sum(sys.getsizeof(d) + sys.getsizeof(c) for d, c in self.conversation.turns)
+        preferences = sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in self.preferences.items())
+        return SESSION_OVERHEAD + history + preferences
+
+
+class SessionRegistry:
+    def __init__(
+        self,
+        max_sessions: int | None = None,
+        idle_ttl: float | None = None,
+        store: SessionStore | None = None
+    ):
+        """
+        Args:
+            max_sessions: Live session cap; the least recently active session is
+                evicted to admit a new one (defaults to MAX_SESSIONS, 500)
+            idle_ttl: Seconds without activity before a session is evicted
+                (defaults to SESSION_IDLE_TTL, 1800)
+            store: Shared state backend (defaults to the SESSION_STORE singleton)
+        """
+        self.max_sessions = max_sessions or int(os.getenv("MAX_SESSIONS", "500"))
+        self.idle_ttl = idle_ttl or float(os.getenv("SESSION_IDLE_TTL", "1800"))
+        self._store = store
+        self._sessions: OrderedDict[object, SessionState] = OrderedDict()  # Least recently active first
+
+        self.draining = False  # Set on shutdown: no new sessions or frames
+
+        # Counters
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    @property
+    def store(self) -> SessionStore:
+        if self._store is None:
+            self._store = get_session_store()
+        return self._store
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id) -> bool:
+        return session_id in self._sessions
+
+    def create(self, session_id, preferences: dict, protocol: str, tier: str | None = None) -> SessionState:
+        """Register a session, replacing any previous state under the same id"""
+        if session_id in self._sessions:
+            self._evict(session_id, "replaced")
+        self.evict_idle()
+        while len(self._sessions) >= self.max_sessions:
+            oldest = next(iter(self._sessions))
+            self._evict(oldest, "capacity")
+            self.evicted_lru += 1
+
+        state = SessionState(session_id, preferences, protocol, self.store, tier)
+        self._sessions[session_id] = state
+        return state
+
+    async def open(self, session_id, preferences: dict, protocol: str) -> SessionState:
+        """
+        Register a session, restoring shared state left by an earlier connection
+
+        Init preferences override stored ones, so a reconnect (to any worker or
+        node) may send an empty init and still keep its voices and context.
+        The rate tier only ever comes from the store.
+        """
+        stored, tier, history = None, None, []
+        try:
+            stored = await self.store.load_preferences(session_id)
+            tier = await self.store.load_tier(session_id)
+            history = await self.store.descriptions(session_id)
+        except Exception as e:
+            print(f"[{session_id}] Session store unavailable, starting fresh: {e}")
+
+        # Build (and so validate) the session before persisting its preferences:
+        # a bad init must not be stored and break every later reconnect
+        state = self.create(session_id, {**(stored or {}), **preferences}, protocol, tier)
+        state.history.extend(history)
+        try:
+            await self.store.save_preferences(session_id, state.preferences)
+        except Exception as e:
+            print(f"[{session_id}] Session store write failed: {e}")
+        return state
+
+    def get(self, session_id) -> SessionState | None:
+        """Look up a session and mark it active"""
+        state = self._sessions.get(session_id)
+        if state is not None:
+            state.touch()
+            self._sessions.move_to_end(session_id)
+        return state
+
+    def remove(self, session_id, state: SessionState | None = None) -> SessionState | None:
+        """
+        Explicit teardown (disconnect); drops all state for the session
+
+        Args:
+            state: Only remove if this is still the registered state, so a
+                stale connection can't tear down the session that replaced it
+        """
+        current = self._sessions.get(session_id)
+        if current is None or (state is not None and current is not state):
+            return None
+        return self._sessions.pop(session_id)
+
+    async def release(self, session_id, state: SessionState) -> None:
+        """Tear down a closed connection and flush its counters to the store"""
+        self.remove(session_id, state)
+        try:
+            await self.store.incr(session_id, state.counters())
+        except Exception as e:
+            print(f"[{session_id}] Session store write failed: {e}")
+
+    def _evict(self, session_id, reason: str) -> None:
+        state = self._sessions.pop(session_id)
+        print(f"[{session_id}] Session evicted ({reason})")
+        if state.on_evict is not None:
+            state.on_evict(reason)
+
+    def evict_idle(self) -> int:
+        """Evict sessions idle for longer than the TTL; returns how many"""
+        cutoff = time.monotonic() - self.idle_ttl
+        expired = [sid for sid, state in self._sessions.items() if state.last_active < cutoff]
+        for session_id in expired:
+            self._evict(session_id, "idle")
+        self.evicted_idle += len(expired)
+        return len(expired)
+
+    async def drain(self, timeout: float, poll: float = 0.1) -> None:
+        """
+        Stop admitting sessions and frames, wait for in-flight frames to finish
+        (up to `timeout` seconds), then close every session
+        """
+        self.draining = True
+        deadline = time.monotonic() + timeout
+        busy = [s for s in self._sessions.values() if not s.idle]
+        print(f"Draining {len(self._sessions)} sessions ({len(busy)} with frames in flight)")
+        while busy and time.monotonic() < deadline:
+            await asyncio.sleep(poll)
+            busy = [s for s in busy if not s.idle]
+        if busy:
+            print(f"Drain timed out with {len(busy)} frames still in flight")
+        for session_id in list(self._sessions):
+            self._evict(session_id, "shutdown")
+
+    async def run_reaper(self, interval: float = 60.0) -> None:
+        """Periodically evict idle sessions (run as a background task)"""
+        while True:
+            await asyncio.sleep(interval)
+            self.evict_idle()
+
+    def stats(self) -> dict:
+        """Live session count and approximate memory use"""
+        sizes = [state.approx_bytes() for state in self._sessions.values()]
+        return {
+            "live": len(sizes),
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+            "approx_bytes_total": sum(sizes),
+            "approx_bytes_per_session": sum(sizes) // len(sizes) if sizes else 0,
+            "approx_bytes_max": max(sizes, default=0),
+            "evicted_idle": self.evicted_idle,
+            "evicted_lru": self.evicted_lru,
+        }
+
+
+_session_registry = None
+
+
+def get_session_registry() -> SessionRegistry:
+    """Get or create session registry singleton"""
+    global _session_registry
+    if _session_registry is None:
+        _session_registry = SessionRegistry()
+    return _session_registry
@@ -2,9 +2,16 @@
 ElevenLabs Text-to-Speech Service
 Using Eleven Turbo v2.5 for low latency
 """
-from elevenlabs import ElevenLabs
+from elevenlabs import AsyncElevenLabs, VoiceSettings
 from pathlib import Path
 from dotenv import load_dotenv
+from . import mp3
+from .commentary import strip_tags
+from .audio_cache import AudioCache, audio_key
+from .deadlines import StagePolicy
+from .limiter import ProviderLimiter
+from typing import AsyncIterator
+import asyncio
 import os
 
 # Load environment variables
@@ -13,9 +20,60 @@ load_dotenv(env_path)
 
 
 class TTSService:
-    def __init__(self):
-        """Initialize ElevenLabs client"""
-        self._client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+    def __init__(self, client=None):
+        """
+        Initialize async ElevenLabs client
+
+        Args:
+            client: ElevenLabs client to use instead of the real one (e.g. a fake for load tests)
+        """
+        self._client = client or AsyncElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+        self._model_id = "eleven_v3"
+        self._output_format = "mp3_44100_128"
+        self.cache = AudioCache()
+        # ElevenLabs quota shared fairly across sessions (TTS_RATE/BURST/MAX_CONCURRENCY)
+        self.limiter = ProviderLimiter.from_env("TTS", "elevenlabs")
+        # TTS_DEADLINE / TTS_HEDGE / TTS_FALLBACK_MODEL (Flash v2.5: ~75 ms model latency)
+        self.policy = StagePolicy.from_env("TTS", "tts", self._model_id, 8.0, "eleven_flash_v2_5", self.limiter)
+
+    def _cache_key(self, text: str, voice_id: str, stability: float, similarity_boost: float,
+                   model_id: str | None = None) -> str:
+        return audio_key(
+            text, voice_id, model_id or self._model_id, self._output_format,
+            stability=stability, similarity_boost=similarity_boost
+        )
+
+    def _text_for(self, model_id: str, text: str) -> str:
+        """Audio tags only work on the primary (v3) model; the fallback would speak them"""
+        return text if model_id == self._model_id else strip_tags(text)
+
+    async def _convert(
+        self,
+        text: str,
+        voice_id: str,
+        stability: float = 0.5,
+        similarity_boost: float = 0.75
+    ) -> bytes:
+        """Synthesize one speaker's text into a complete MP3 clip (cached by content)"""
+        key = self._cache_key(text, voice_id, stability, similarity_boost)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        async def attempt(model_id: str) -> bytes:
+            audio = self._client.text_to_speech.convert(
+                text=self._text_for(model_id, text),
+                voice_id=voice_id,
+                model_id=model_id,
+                output_format=self._output_format,
+                voice_settings=VoiceSettings(stability=stability, similarity_boost=similarity_boost)
+            )
+            audio_bytes = b"".join([chunk async for chunk in audio])
+            # Fallback audio is cached under its own model, so the primary gets retried next time
+            await self.cache.put(self._cache_key(text, voice_id, stability, similarity_boost, model_id), audio_bytes)
+            return audio_bytes
+
+        return await self.policy.call(attempt)
 
     async def synthesize(
         self,
@@ -36,7 +94,7 @@ class TTSService:
             similarity_boost: 0-1 (higher = closer to original voice)
 
         Returns:
-            bytes: MP3 audio data (concatenated if multi-speaker)
+            bytes: MP3 audio data (joined at frame boundaries if multi-speaker)
         """
         # Check if multi-speaker (contains " | " and voice_id_2 is provided)
         if " | " in text and voice_id_2:
@@ -44,32 +102,59 @@ class TTSService:
             speaker1_text = parts[0].strip()
             speaker2_text = parts[1].strip()
 
-            # Synthesize speaker 1
-            audio1 = self._client.text_to_speech.convert(
-                text=speaker1_text,
-                voice_id=voice_id,
-                model_id="eleven_v3",
-                output_format="mp3_44100_128"
-            )
-            audio1_bytes = b"".join(audio1)
-
-            # Synthesize speaker 2
-            audio2 = self._client.text_to_speech.convert(
-                text=speaker2_text,
-                voice_id=voice_id_2,
-                model_id="eleven_v3",
-                output_format="mp3_44100_128"
+            # Synthesize both speakers concurrently
+            audio1_bytes, audio2_bytes = await asyncio.gather(
+                self._convert(speaker1_text, voice_id, stability, similarity_boost),
+                self._convert(speaker2_text, voice_id_2, stability, similarity_boost)
             )
-            audio2_bytes = b"".join(audio2)
 
-            # Concatenate audio (simple append - no mixing)
-            return audio1_bytes + audio2_bytes
+            # Join at frame boundaries so the result is a single valid stream
+            return mp3.join(audio1_bytes, audio2_bytes)
         else:
             # Single speaker
-            audio = self._client.text_to_speech.convert(
-                text=text,
+            return await self._convert(text, voice_id, stability, similarity_boost)
+
+    async def stream(
+        self,
+        text: str,
+        voice_id: str = "qVpGLzi5EhjW3WGVhOa9",
+        stability: float = 0.5,
+        similarity_boost: float = 0.75
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream MP3 audio for a single speaker as ElevenLabs produces it
+
+        Args:
+            text: Text with audio tags (one speaker, no " | " separator)
+            voice_id: Speaker voice
+            stability: 0-1 (lower = more emotion)
+            similarity_boost: 0-1 (higher = closer to original voice)
+
+        Yields:
+            bytes: MP3 data chunks, in playback order
+        """
+        key = self._cache_key(text, voice_id, stability, similarity_boost)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        async def attempt(model_id: str) -> AsyncIterator[bytes]:
+            # Keep a copy so a completed stream can be served from the cache next time
+            chunks = []
+            audio = self._client.text_to_speech.stream(
+                text=self._text_for(model_id, text),
                 voice_id=voice_id,
-                model_id="eleven_v3",
-                output_format="mp3_44100_128"
+                model_id=model_id,
+                output_format=self._output_format,
+                voice_settings=VoiceSettings(stability=stability, similarity_boost=similarity_boost)
             )
-            return b"".join(audio)
+            async for chunk in audio:
+                if chunk:
+                    chunks.append(chunk)
+                    yield chunk
+            await self.cache.put(self._cache_key(text, voice_id, stability, similarity_boost, model_id), b"".join(chunks))
+
+        # Deadline covers time to first chunk
+        async for chunk in self.policy.stream(attempt):
+            yield chunk
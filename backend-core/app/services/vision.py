@@ -1,20 +1,106 @@
+import asyncio
 import base64
+import json
 import os
+import time
 from collections import deque
 
 from google import genai
 from google.genai import types
 
+from . import commentary, metrics
+from .cache import SimilarityCache
+from .deadlines import StagePolicy
+from .limiter import ProviderLimiter
+from .phash import dhash
+
+_FUSED_SCHEMA = types.Schema(
+    type=types.Type.OBJECT,
+    properties={
+        "scene": types.Schema(type=types.Type.STRING),
+        "commentary": types.Schema(type=types.Type.STRING),
+    },
+    required=["scene", "commentary"]
+)
+
 
 class VisionService:
-    def __init__(self):
-        self._client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    def __init__(self, client=None):
+        """
+        Args:
+            client: Gemini client to use instead of the real one (e.g. a fake for load tests)
+        """
+        self._client = client or genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
         self._model = "gemini-2.5-flash"
-        self._session_history = {}      # {session_id: deque([desc1, desc2, desc3])}
 
-    async def analyze_with_context(self, frame_base64, session_id):
-        # Empty queue if no hitory found
-        history = self._session_history.get(session_id, deque(maxlen=3))
+        # Shared across sessions: same lobby/scoreboard screens get the same description.
+        # Only context-free descriptions are stored; one written against a session's
+        # previous frames ("note any changes") would be wrong for anyone else.
+        self.cache = SimilarityCache(
+            radius=int(os.getenv("VISION_CACHE_RADIUS", "4")),
+            max_entries=int(os.getenv("VISION_CACHE_SIZE", "4096")),
+            max_bytes=int(os.getenv("VISION_CACHE_MAX_BYTES", str(4 * 1024 * 1024))),
+            ttl=float(os.getenv("VISION_CACHE_TTL", "300"))
+        )
+        # Gemini quota shared fairly across sessions (VISION_RATE/BURST/MAX_CONCURRENCY)
+        self.limiter = ProviderLimiter.from_env("VISION", "gemini")
+        # VISION_DEADLINE / VISION_HEDGE / VISION_FALLBACK_MODEL
+        self.policy = StagePolicy.from_env("VISION", "vision", self._model, 6.0, "gemini-2.5-flash-lite", self.limiter)
+
+    async def _frame_hash(self, frame_bytes: bytes) -> int | None:
+        """Perceptual hash for cache lookups, or None if caching is off or the frame won't decode"""
+        if not self.cache.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(dhash, frame_bytes)
+        except (OSError, ValueError):
+            return None
+
+    async def _lookup(
+        self,
+        frame_bytes: bytes,
+        stage: str,
+        frame_hash: int | None = None
+    ) -> tuple[int | None, str | None]:
+        """
+        Hash the frame (unless the caller already has) and look up a recent
+        description of a near-identical one
+
+        Hits are timed under provider "cache", so they don't pull down the
+        stage's Gemini latency
+
+        Returns:
+            (frame hash or None, cached description or None)
+        """
+        start = time.perf_counter()
+        if frame_hash is None:
+            frame_hash = await self._frame_hash(frame_bytes)
+        elif not self.cache.enabled:
+            frame_hash = None
+        cached = self.cache.get(frame_hash) if frame_hash is not None else None
+        if cached is not None:
+            metrics.STAGE_SECONDS.labels(stage, "cache").observe(time.perf_counter() - start)
+        return frame_hash, cached
+
+    async def analyze_with_context(self, frame, history: deque, frame_hash: int | None = None):
+        """
+        Describe the frame in one sentence, in the context of the session's recent descriptions
+
+        Args:
+            frame: JPEG bytes or base64 string
+            history: Rolling vision descriptions (the description is appended)
+            frame_hash: dhash of the frame if the caller already computed it (dedup);
+                the hash survives normalization, so the raw frame's will do
+        """
+        # JSON clients send base64, binary clients send raw JPEG bytes
+        frame_bytes = base64.b64decode(frame) if isinstance(frame, str) else frame
+
+        # Cache hit: reuse a recent description of a near-identical frame
+        frame_hash, cached = await self._lookup(frame_bytes, "vision", frame_hash)
+        if cached is not None:
+            history.append(cached)
+            return cached
+
         context = "\n".join(f"T-{i+1}: {d}" for i, d in enumerate(reversed(history)))
 
         # Input: Current Frame + Historical Context
@@ -24,16 +110,92 @@ class VisionService:
             else "Describe this image in ONE short sentence."
         )
 
-        response = await self._client.aio.models.generate_content(
-            model=self._model,
-            contents=[
-                types.Part.from_bytes(data=base64.b64decode(frame_base64), mime_type="image/jpeg"),
-                prompt
-            ],
-            config=types.GenerateContentConfig(temperature=0.3)
-        )
-
-        desc = response.text.strip()
+        desc = await self._generate(frame_bytes, prompt, types.GenerateContentConfig(temperature=0.3), "vision")
+        if frame_hash is not None and not context:
+            self.cache.put(frame_hash, desc, len(desc.encode("utf-8")))
         history.append(desc)
-        self._session_history[session_id] = history
         return desc
+
+    async def _generate(self, frame_bytes: bytes, prompt: str, config: types.GenerateContentConfig, stage: str) -> str:
+        """One Gemini call on the frame, under the stage deadline/fallback policy (timed as `stage`)"""
+        async def attempt(model: str) -> str:
+            response = await self._client.aio.models.generate_content(
+                model=model,
+                contents=[
+                    types.Part.from_bytes(data=frame_bytes, mime_type="image/jpeg"),
+                    prompt
+                ],
+                config=config
+            )
+            return response.text.strip()
+
+        with metrics.timed(stage, "gemini"):
+            return await self.policy.call(attempt)
+
+    async def commentate(
+        self,
+        frame,
+        history: deque,
+        dual_speaker: bool = True,
+        frame_hash: int | None = None
+    ) -> tuple[str, str | None]:
+        """
+        Fused mode: describe the frame and write its commentary in one Gemini call
+
+        Saves the separate Grok round trip. Commentary is validated against the
+        speaker format; when it doesn't match (or a near-identical frame's
+        description is cached, so there's nothing to save), None is returned
+        in its place and the caller writes it with the LLM as usual.
+
+        Args:
+            frame: JPEG bytes or base64 string
+            history: Rolling vision descriptions (the scene is appended)
+            dual_speaker: Two commentators (else one)
+            frame_hash: dhash of the frame if the caller already computed it
+
+        Returns:
+            tuple[str, str | None]: (scene description, commentary or None)
+        """
+        frame_bytes = base64.b64decode(frame) if isinstance(frame, str) else frame
+
+        frame_hash, cached = await self._lookup(frame_bytes, "fused", frame_hash)
+        if cached is not None:
+            metrics.FUSED_RESULTS.labels("cache_hit").inc()
+            history.append(cached)
+            return cached, None
+
+        context = "\n".join(f"T-{i+1}: {d}" for i, d in enumerate(reversed(history)))
+        prompt = (
+            (f"Previous frames:\n{context}\n\n" if context else "")
+            + "Return JSON: \"scene\" is ONE short sentence describing what's happening NOW"
+            + (" (note any changes)" if context else "")
+            + "; \"commentary\" is your commentary on it in the required FORMAT."
+        )
+        config = types.GenerateContentConfig(
+            system_instruction=commentary.DUAL_SPEAKER_PROMPT if dual_speaker else commentary.SINGLE_SPEAKER_PROMPT,
+            temperature=0.8,
+            response_mime_type="application/json",
+            response_schema=_FUSED_SCHEMA
+        )
+        raw = await self._generate(frame_bytes, prompt, config, "fused")
+
+        try:
+            result = json.loads(raw)
+            scene = result["scene"].strip()
+        except (ValueError, KeyError, TypeError, AttributeError):
+            # No usable scene either: fall back to a plain description
+            print(f"Fused response wasn't valid JSON, describing separately: {raw[:80]!r}")
+            metrics.FUSED_RESULTS.labels("invalid_json").inc()
+            return await self.analyze_with_context(frame_bytes, history, frame_hash), None
+
+        if frame_hash is not None and not context:
+            self.cache.put(frame_hash, scene, len(scene.encode("utf-8")))
+        history.append(scene)
+        try:
+            comment = commentary.validate(str(result.get("commentary", "")), dual_speaker)
+        except commentary.CommentaryFormatError as e:
+            print(f"Fused commentary rejected, using the LLM: {e}")
+            metrics.FUSED_RESULTS.labels("invalid_commentary").inc()
+            return scene, None
+        metrics.FUSED_RESULTS.labels("ok").inc()
+        return scene, comment
@@ -0,0 +1,80 @@
+"""
+Benchmark frame normalization: upload bytes and vision latency, raw vs normalized
+Run: python -m benchmarks.bench_frames [frame.jpg ...] [--vision]
+
+Without arguments, synthetic 1080p/1440p/4K frames are used. With --vision,
+each frame is also sent to Gemini raw and normalized (needs GEMINI_API_KEY).
+"""
+import asyncio
+import io
+import statistics
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+from PIL import Image
+
+load_dotenv(Path(__file__).parent.parent / "app" / "config" / ".env")
+
+from app.services.frames import FrameNormalizer
+
+RUNS = 5
+
+
+def _synthetic_frame(width: int, height: int) -> bytes:
+    """Game-like frame: smooth gradients plus high-detail noise, encoded like the browser (q=0.8)"""
+    rng = np.random.default_rng(width)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([x / width * 255, y / height * 255, (x + y) / (width + height) * 255], axis=-1)
+    pixels = (base + rng.normal(0, 20, base.shape)).clip(0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+async def _time(coro_factory) -> tuple[float, object]:
+    """Median wall time over RUNS calls (milliseconds) and the last result"""
+    timings, result = [], None
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = await coro_factory()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+async def main():
+    paths = [a for a in sys.argv[1:] if not a.startswith("--")]
+    with_vision = "--vision" in sys.argv
+
+    if paths:
+        frames = {Path(p).name: Path(p).read_bytes() for p in paths}
+    else:
+        frames = {f"{w}x{h}": _synthetic_frame(w, h) for w, h in ((1920, 1080), (2560, 1440), (3840, 2160))}
+
+    normalizer = FrameNormalizer()
+    vision = None
+    if with_vision:
+        from app.services.vision import VisionService
+        vision = VisionService()
+
+    print(f"{'frame':>12} {'raw KB':>8} {'norm KB':>8} {'saved':>6} {'norm ms':>8}", end="")
+    print(f" {'vision raw ms':>14} {'vision norm ms':>15}" if with_vision else "")
+
+    for name, frame in frames.items():
+        norm_ms, normalized = await _time(lambda: normalizer.normalize(frame))
+        saved = 1 - len(normalized) / len(frame)
+        print(f"{name:>12} {len(frame) / 1024:8.0f} {len(normalized) / 1024:8.0f} {saved:6.0%} {norm_ms:8.1f}", end="")
+
+        if vision:
+            raw_ms, _ = await _time(lambda: vision.analyze_with_context(frame, deque(maxlen=3)))
+            vis_ms, _ = await _time(lambda: vision.analyze_with_context(normalized, deque(maxlen=3)))
+            print(f" {raw_ms:14.0f} {norm_ms + vis_ms:15.0f}")
+        else:
+            print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
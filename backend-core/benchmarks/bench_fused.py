@@ -0,0 +1,199 @@
+"""
+Benchmark fused vision+commentary against the two-stage (Gemini -> Grok) path
+Run: python -m benchmarks.bench_fused [frame.jpg ...] [--frames 20] [--fake]
+
+Each frame goes through both paths with its own rolling context: two-stage is
+Gemini describe + Grok comment, fused is one Gemini call returning both. Reports
+latency to commentary text (TTS is the same either way), provider calls, tokens
+and cost per frame. Live runs need GEMINI_API_KEY and XAI_API_KEY and use the
+providers' reported token usage; --fake uses the fake providers and estimates
+tokens (~4 characters per token, 258 per 768px image tile).
+"""
+import argparse
+import asyncio
+import io
+import math
+import os
+import statistics
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+from dotenv import load_dotenv
+from PIL import Image
+
+load_dotenv(Path(__file__).parent.parent / "app" / "config" / ".env")
+os.environ["VISION_CACHE_SIZE"] = "0"  # Every frame must reach the provider
+
+from app.services import fakes
+from app.services.frames import FrameNormalizer
+from app.services.limiter import percentile
+
+IMAGE_TILE_TOKENS = 258
+
+
+def _synthetic_frames(n: int) -> list[bytes]:
+    """Distinct 1920x1080 game-like JPEGs"""
+    frames = []
+    for seed in range(n):
+        blocks = np.random.default_rng(seed).integers(0, 256, size=(9, 16, 3))
+        pixels = np.kron(blocks, np.ones((120, 120, 1))).astype(np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format="JPEG", quality=80)
+        frames.append(buffer.getvalue())
+    return frames
+
+
+def _text_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _image_tokens(jpeg: bytes) -> int:
+    width, height = Image.open(io.BytesIO(jpeg)).size
+    if width <= 384 and height <= 384:
+        return IMAGE_TILE_TOKENS
+    return IMAGE_TILE_TOKENS * math.ceil(width / 768) * math.ceil(height / 768)
+
+
+class _Ledger:
+    """Provider calls and tokens for the frame being measured"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.tokens = defaultdict(int)  # (provider, "in"/"out") -> tokens
+
+    def add(self, provider: str, tokens_in: int, tokens_out: int):
+        self.calls += 1
+        self.tokens[provider, "in"] += tokens_in
+        self.tokens[provider, "out"] += tokens_out
+
+
+class _GeminiMeter:
+    """Wraps a Gemini client, recording token usage per call"""
+
+    def __init__(self, inner, ledger: _Ledger):
+        self._inner = inner
+        self._ledger = ledger
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self._generate_content))
+
+    async def _generate_content(self, model, contents, config=None):
+        response = await self._inner.aio.models.generate_content(model=model, contents=contents, config=config)
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None and usage.prompt_token_count:
+            self._ledger.add("gemini", usage.prompt_token_count, usage.candidates_token_count or 0)
+        else:
+            frame, prompt = contents
+            system = getattr(config, "system_instruction", None) or ""
+            tokens_in = _image_tokens(frame.inline_data.data) + _text_tokens(prompt + system)
+            self._ledger.add("gemini", tokens_in, _text_tokens(response.text))
+        return response
+
+
+class _MeteredChat:
+    def __init__(self, inner, ledger: _Ledger):
+        self._inner = inner
+        self._ledger = ledger
+        self._sent = ""
+
+    def append(self, message):
+        self._sent += str(message)
+        self._inner.append(message)
+
+    async def sample(self):
+        response = await self._inner.sample()
+        usage = getattr(response, "usage", None)
+        if usage is not None and usage.prompt_tokens:
+            tokens_out = getattr(usage, "completion_tokens", None) or _text_tokens(response.content)
+            self._ledger.add("grok", usage.prompt_tokens, tokens_out)
+        else:
+            self._ledger.add("grok", _text_tokens(self._sent), _text_tokens(response.content))
+        return response
+
+
+class _XaiMeter:
+    """Wraps an xAI client, recording token usage per chat.sample()"""
+
+    def __init__(self, inner, ledger: _Ledger):
+        self.chat = SimpleNamespace(
+            create=lambda model, **options: _MeteredChat(inner.chat.create(model=model, **options), ledger)
+        )
+
+
+def _price(spec: str) -> tuple[float, float]:
+    tokens_in, tokens_out = (float(x) for x in spec.split(","))
+    return tokens_in, tokens_out
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", help="JPEG frames (default: synthetic 1080p frames)")
+    parser.add_argument("--frames", type=int, default=20, help="Synthetic frames to run")
+    parser.add_argument("--fake", action="store_true", help="Fake providers, estimated tokens")
+    parser.add_argument("--single", action="store_true", help="Single speaker (default: dual)")
+    parser.add_argument("--gemini-price", default="0.30,2.50", help="USD per 1M input,output tokens")
+    parser.add_argument("--grok-price", default="0.20,0.50", help="USD per 1M input,output tokens")
+    args = parser.parse_args()
+
+    from app.services.llm import LlmService
+    from app.services.vision import VisionService
+
+    ledger = _Ledger()
+    gemini = fakes.gemini_client() if args.fake else None
+    xai = fakes.xai_client() if args.fake else None
+    if gemini is None:
+        from google import genai
+        from xai_sdk import AsyncClient
+        gemini = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+        xai = AsyncClient(api_key=os.getenv("XAI_API_KEY"))
+    vision = VisionService(client=_GeminiMeter(gemini, ledger))
+    llm = LlmService(client=_XaiMeter(xai, ledger))
+    prices = {"gemini": _price(args.gemini_price), "grok": _price(args.grok_price)}
+    dual_speaker = not args.single
+
+    raw = [Path(p).read_bytes() for p in args.paths] or _synthetic_frames(args.frames)
+    normalizer = FrameNormalizer()
+    frames = [await normalizer.normalize(frame) for frame in raw]
+
+    async def two_stage(frame, history):
+        description = await vision.analyze_with_context(frame, history)
+        return await llm.generate_comment(description, dual_speaker=dual_speaker)
+
+    async def fused(frame, history):
+        description, comment = await vision.commentate(frame, history, dual_speaker)
+        if comment is None:  # Rejected by validation: the pipeline would ask Grok
+            comment = await llm.generate_comment(description, dual_speaker=dual_speaker)
+        return comment
+
+    results = {}
+    for name, path in (("two-stage", two_stage), ("fused", fused)):
+        history: deque[str] = deque(maxlen=3)
+        latencies, calls, costs, tokens = [], [], [], []
+        for frame in frames:
+            ledger.reset()
+            start = time.perf_counter()
+            await path(frame, history)
+            latencies.append(time.perf_counter() - start)
+            calls.append(ledger.calls)
+            tokens.append(sum(ledger.tokens.values()))
+            costs.append(sum(
+                count * prices[provider][0 if kind == "in" else 1] / 1e6
+                for (provider, kind), count in ledger.tokens.items()
+            ))
+        results[name] = (latencies, calls, tokens, costs)
+
+    print(f"{len(frames)} frames, {'fake providers (estimated tokens)' if args.fake else 'live providers'}")
+    print(f"{'path':>10} {'p50 ms':>8} {'p95 ms':>8} {'calls':>6} {'tokens':>7} {'$/1k frames':>12}")
+    for name, (latencies, calls, tokens, costs) in results.items():
+        print(
+            f"{name:>10} {percentile(latencies, 0.5) * 1000:8.0f} {percentile(latencies, 0.95) * 1000:8.0f} "
+            f"{statistics.mean(calls):6.2f} {statistics.mean(tokens):7.0f} {statistics.mean(costs) * 1000:12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
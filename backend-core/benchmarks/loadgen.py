@@ -0,0 +1,241 @@
+"""
+Load generator: N concurrent WebSocket sessions pushing frames at a fixed rate
+Run: python -m benchmarks.loadgen --spawn --sessions 10,50,100 --fps 0.5 --duration 30
+
+--spawn starts a local server with PROVIDERS=fake (no API keys or quota used)
+and its vision/TTS caches off (--cache keeps them on); without it, point --url
+at a running server. Each step reports frame-to-audio
+latency percentiles, unanswered (dropped/superseded/failed) frames and event
+loop lag on both ends; sessions per node is the largest step whose sessions
+all connect and whose p95 stays within --slo-ms. Frames sent faster than the
+pipeline finishes are dropped by design (latest frame wins), so compare the
+unanswered rate between steps rather than against zero.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+
+import numpy as np
+import websockets
+from PIL import Image
+
+from app.routes import protocol
+from app.services.limiter import percentile
+from app.services.loop_monitor import LoopLagMonitor
+
+# Distinct frames cycled by every session. Per-session dedup doesn't skip them,
+# but every session sends the same ones, so the cross-session vision and TTS
+# caches would answer most frames: --spawn turns them off unless --cache.
+N_FRAMES = 16
+
+
+def _synthetic_frames(n: int) -> list[bytes]:
+    """Distinct 1280x720 game-like JPEGs"""
+    frames = []
+    for seed in range(n):
+        blocks = np.random.default_rng(seed).integers(0, 256, size=(9, 16, 3))
+        pixels = np.kron(blocks, np.ones((80, 80, 1))).astype(np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format="JPEG", quality=80)
+        frames.append(buffer.getvalue())
+    return frames
+
+
+class _SessionResult:
+    def __init__(self):
+        self.connected = False
+        self.sent = 0
+        self.answered = 0
+        self.unchanged = 0
+        self.latencies: list[float] = []
+
+
+async def _session(url: str, session_id: int, frames: list[bytes], fps: float, duration: float,
+                   streaming: bool) -> _SessionResult:
+    result = _SessionResult()
+    sent_at: dict[int, float] = {}
+    try:
+        async with websockets.connect(f"{url}/ws/{session_id}", max_size=None) as ws:
+            await ws.send(json.dumps({
+                "type": "init",
+                "protocol": protocol.PROTOCOL_BINARY,
+                "preferences": {"speaker1_voice_id": "voice-1", "speaker2_voice_id": "voice-2", "streaming": streaming}
+            }))
+            json.loads(await ws.recv())
+            result.connected = True
+
+            async def send_frames():
+                await asyncio.sleep(random.random() / fps)  # Spread sessions across the frame interval
+                seq = 0
+                while True:
+                    sent_at[seq] = time.perf_counter()
+                    await ws.send(protocol.pack(protocol.FRAME, seq, frames[(session_id + seq) % len(frames)]))
+                    result.sent += 1
+                    seq += 1
+                    await asyncio.sleep(1 / fps)
+
+            async def receive():
+                first_chunk = None
+                async for message in ws:
+                    now = time.perf_counter()
+                    if isinstance(message, bytes):
+                        kind, seq, _ = protocol.unpack(message)
+                        if kind == protocol.AUDIO:
+                            result.answered += 1
+                            result.latencies.append(now - sent_at.pop(seq, now))
+                        elif kind == protocol.AUDIO_CHUNK and first_chunk is None:
+                            first_chunk = now
+                        continue
+                    data = json.loads(message)
+                    if data["type"] == "no_change":
+                        result.unchanged += 1
+                    elif data["type"] == "audio_end":
+                        # Streaming: latency to the first chunk of this frame's audio
+                        result.answered += 1
+                        result.latencies.append((first_chunk or now) - sent_at.pop(data["seq"], now))
+                        first_chunk = None
+
+            sender = asyncio.create_task(send_frames())
+            try:
+                await asyncio.wait_for(receive(), timeout=duration)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                sender.cancel()
+    except (OSError, websockets.WebSocketException) as e:
+        if not result.connected:
+            print(f"  session {session_id} failed to connect: {e}")
+    return result
+
+
+def _server_stats(url: str) -> dict:
+    http = url.replace("ws://", "http://").replace("wss://", "https://")
+    try:
+        with urllib.request.urlopen(f"{http}/stats", timeout=5) as response:
+            return json.load(response)
+    except OSError:
+        return {}
+
+
+async def _run_step(args, n_sessions: int, frames: list[bytes], first_id: int) -> dict:
+    client_loop = LoopLagMonitor()
+    monitor = asyncio.create_task(client_loop.run())
+    results = await asyncio.gather(*(
+        _session(args.url, first_id + i, frames, args.fps, args.duration, args.streaming)
+        for i in range(n_sessions)
+    ))
+    monitor.cancel()
+    server = await asyncio.to_thread(_server_stats, args.url)
+
+    latencies = [lat for r in results for lat in r.latencies]
+    sent = sum(r.sent for r in results)
+    answered = sum(r.answered for r in results) + sum(r.unchanged for r in results)
+    return {
+        "sessions": n_sessions,
+        "connected": sum(r.connected for r in results),
+        "frames_sent": sent,
+        "frames_answered": answered,
+        "frames_unanswered": sent - answered,
+        "drop_rate": (sent - answered) / sent if sent else 0.0,
+        "latency_p50": percentile(latencies, 0.50),
+        "latency_p95": percentile(latencies, 0.95),
+        "latency_p99": percentile(latencies, 0.99),
+        "client_loop": client_loop.stats(),
+        "server_loop": server.get("event_loop"),
+        "providers": server.get("providers"),
+    }
+
+
+def _print_step(step: dict) -> None:
+    print(
+        f"{step['sessions']:>5} sessions ({step['connected']} connected): "
+        f"p50 {step['latency_p50'] * 1000:.0f} ms, p95 {step['latency_p95'] * 1000:.0f} ms, "
+        f"p99 {step['latency_p99'] * 1000:.0f} ms | "
+        f"{step['frames_unanswered']}/{step['frames_sent']} frames unanswered ({step['drop_rate']:.0%})"
+    )
+    server_loop = step["server_loop"] or {}
+    print(
+        f"      loop lag p99: server {server_loop.get('lag_p99', 0) * 1000:.1f} ms, "
+        f"client {step['client_loop']['lag_p99'] * 1000:.1f} ms"
+    )
+    for stage, stats in (step["providers"] or {}).items():
+        print(f"      {stage:<6} queue wait p95 {stats['wait_p95'] * 1000:.0f} ms, in flight {stats['in_flight']}")
+
+
+def _spawn_server(port: int, show_logs: bool, cache: bool = False) -> subprocess.Popen:
+    """
+    One fake-provider uvicorn worker, i.e. one node's worth of a single core
+
+    Vision and TTS caches are off unless `cache`, so the result measures
+    provider capacity rather than cache hits on the load generator's frames.
+    """
+    env = {**os.environ, "PROVIDERS": "fake"}
+    if not cache:
+        env.update({"VISION_CACHE_SIZE": "0", "TTS_CACHE_SIZE": "0", "TTS_CACHE_DIR": ""})
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--loop", "uvloop", "--http", "httptools", "--log-level", "warning"],
+        env=env,
+        stdout=None if show_logs else subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not start")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://127.0.0.1:8000", help="Server base URL")
+    parser.add_argument("--sessions", default="10,50,100", help="Comma-separated session counts to step through")
+    parser.add_argument("--fps", type=float, default=0.5, help="Frames per second per session")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per step")
+    parser.add_argument("--streaming", action="store_true", help="Request streaming audio")
+    parser.add_argument("--slo-ms", type=float, default=5000, help="p95 frame-to-audio target")
+    parser.add_argument("--spawn", action="store_true", help="Start a local fake-provider server")
+    parser.add_argument("--port", type=int, default=8099, help="Port for --spawn")
+    parser.add_argument("--server-logs", action="store_true", help="Show the spawned server's output")
+    parser.add_argument("--cache", action="store_true", help="Keep the spawned server's vision/TTS caches on")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        server = _spawn_server(args.port, args.server_logs, args.cache)
+        args.url = f"ws://127.0.0.1:{args.port}"
+
+    frames = _synthetic_frames(N_FRAMES)
+    steps, capacity = [], 0
+    try:
+        for i, n in enumerate(int(x) for x in args.sessions.split(",")):
+            step = await _run_step(args, n, frames, first_id=i * 100000)
+            steps.append(step)
+            if not args.json:
+                _print_step(step)
+            if step["connected"] == n and step["latency_p95"] * 1000 <= args.slo_ms:
+                capacity = n
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        print(json.dumps({"steps": steps, "sessions_per_node": capacity}, indent=2))
+    else:
+        print(f"\nSessions per node within SLO (p95 <= {args.slo_ms:.0f} ms): {capacity}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,15 +1,67 @@
 """
 Run uvicorn with custom WebSocket settings
+
+SERVER_ENV=development (default): single process with auto-reload
+SERVER_ENV=production: one worker per available core, uvloop/httptools,
+keepalive pings and a graceful drain on SIGTERM (see DRAIN_TIMEOUT)
 """
+import os
+import sys
+import tempfile
+
 import uvicorn
 
+
+def available_cores() -> int:
+    """CPUs this process may use, honouring affinity and a container CPU quota"""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>" (docker run --cpus)
+        quota, period = open("/sys/fs/cgroup/cpu.max").read().split()
+        if quota != "max":
+            cores = min(cores, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        ws_ping_interval=None,  # Disable ping
-        ws_ping_timeout=None,   # Disable timeout
-        ws_max_size=16777216    # 16MB max message size
-    )
+    production = os.getenv("SERVER_ENV", "development") == "production"
+    host = os.getenv("HOST", "0.0.0.0")
+    port = int(os.getenv("PORT", "8000"))
+
+    if production:
+        workers = int(os.getenv("WEB_CONCURRENCY") or available_cores())
+        # Each worker has its own memory store, so a reconnect landing on another worker loses its context
+        if workers > 1 and os.getenv("SESSION_STORE", "memory") != "redis":
+            sys.exit(f"{workers} workers need SESSION_STORE=redis (or set WEB_CONCURRENCY=1)")
+        # Workers write metrics to a shared dir so /metrics covers all of them (fresh per start)
+        if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+            os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="nexcast-metrics-")
+        uvicorn.run(
+            "app.main:app",
+            host=host,
+            port=port,
+            workers=workers,
+            loop="uvloop",
+            http="httptools",
+            ws="websockets",
+            proxy_headers=True,     # Behind nginx
+            forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "*"),
+            ws_ping_interval=float(os.getenv("WS_PING_INTERVAL", "20")),  # Detect dead clients
+            ws_ping_timeout=float(os.getenv("WS_PING_TIMEOUT", "20")),
+            ws_max_size=int(os.getenv("WS_MAX_SIZE", str(8 * 1024 * 1024))),  # Largest frame message
+            ws_max_queue=int(os.getenv("WS_MAX_QUEUE", "4")),  # Frames are latest-wins; don't buffer many
+            timeout_graceful_shutdown=float(os.getenv("GRACEFUL_TIMEOUT", "10")),
+            access_log=False
+        )
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host=host,
+            port=port,
+            reload=True,
+            ws_ping_interval=None,  # Disable ping
+            ws_ping_timeout=None,   # Disable timeout
+            ws_max_size=16777216    # 16MB max message size
+        )
@@ -0,0 +1,56 @@
+"""
+Shared test setup: the pipeline's real services on the fake provider clients
+Use `with fake_pipeline() as services:`; whatever was installed before is restored after the block
+"""
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from app.services import fakes, pipeline
+from app.services.fakes import LatencyModel
+from app.services.llm import LlmService
+from app.services.tts import TTSService
+from app.services.vision import VisionService
+
+FAST = LatencyModel(0.005, 0.01)
+
+
+class PassthroughNormalizer:
+    """Frames go to vision as sent (keeps Pillow and its thread pool out of timings)"""
+
+    async def normalize(self, frame, options=None):
+        return frame
+
+
+@contextmanager
+def fake_pipeline(
+    gemini=None,
+    xai=None,
+    elevenlabs=None,
+    vision=None,
+    llm=None,
+    tts=None,
+    normalizer=None
+):
+    """
+    Install the pipeline's services for the duration of the block
+
+    Args:
+        gemini, xai, elevenlabs: Fake SDK clients for the real services (default: FAST fakes)
+        vision, llm, tts: Whole-service stand-ins, for tests that script a stage exactly
+        normalizer: Frame normalizer stand-in (default: the real one)
+
+    Yields:
+        SimpleNamespace: The installed vision, llm and tts services
+    """
+    saved = (pipeline._frame_normalizer, pipeline._vision_service, pipeline._llm_service, pipeline._tts_service)
+    services = SimpleNamespace(
+        vision=vision or VisionService(client=gemini or fakes.FakeGeminiClient(FAST)),
+        llm=llm or LlmService(client=xai or fakes.FakeXaiClient(FAST, token_delay=0)),
+        tts=tts or TTSService(client=elevenlabs or fakes.FakeElevenLabsClient(FAST)),
+    )
+    pipeline._frame_normalizer = normalizer
+    pipeline._vision_service, pipeline._llm_service, pipeline._tts_service = services.vision, services.llm, services.tts
+    try:
+        yield services
+    finally:
+        pipeline._frame_normalizer, pipeline._vision_service, pipeline._llm_service, pipeline._tts_service = saved
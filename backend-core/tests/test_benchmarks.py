@@ -0,0 +1,31 @@
+"""
+Smoke-test the benchmarks' fake-provider paths
+Run: python -m pytest tests/test_benchmarks.py (no API keys needed)
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+
+def _run(module: str, *args: str) -> str:
+    """Run a benchmark in its own process (they set env at import) with instant fakes"""
+    env = {**os.environ, "FAKE_VISION_LATENCY": "0", "FAKE_LLM_LATENCY": "0", "FAKE_TTS_LATENCY": "0"}
+    result = subprocess.run(
+        [sys.executable, "-m", module, *args], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_bench_fused_fake_run():
+    output = _run("benchmarks.bench_fused", "--fake", "--frames", "2")
+    assert "fake providers" in output
+    assert "two-stage" in output and "fused" in output
+
+
+if __name__ == "__main__":
+    test_bench_fused_fake_run()
+    print("✓ Benchmark smoke tests passed")
@@ -0,0 +1,123 @@
+"""
+Test bounded caches and the shared vision description cache
+Run: python -m pytest tests/test_cache.py (no API key needed)
+"""
+import asyncio
+import io
+import os
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import numpy as np
+from PIL import Image
+from prometheus_client import REGISTRY
+
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+from app.services.cache import LruCache, SimilarityCache
+from app.services.vision import VisionService
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LruCache(max_entries=2)
+    cache.put("a", 1, 1)
+    cache.put("b", 2, 1)
+    cache.get("a")
+    cache.put("c", 3, 1)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1
+
+
+def test_lru_enforces_memory_cap_and_ttl():
+    cache = LruCache(max_entries=100, max_bytes=1000, ttl=0.05)
+    for i in range(10):
+        cache.put(i, "x" * 200, 200)
+    assert cache.stats()["bytes"] <= 1000
+    time.sleep(0.06)
+    assert cache.get(9) is None
+
+
+def test_similarity_cache_matches_within_radius():
+    cache = SimilarityCache(radius=2, max_entries=10)
+    cache.put(0b1111_0000, "lobby", 5)
+    assert cache.get(0b1111_0011) == "lobby"   # 2 bits off
+    assert cache.get(0b1111_0111) is None      # 3 bits off
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def _jpeg(seed: int) -> bytes:
+    blocks = np.random.default_rng(seed).integers(0, 256, size=(9, 16, 3))
+    pixels = np.kron(blocks, np.ones((40, 40, 1))).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def test_vision_cache_hit_skips_gemini_and_updates_context():
+    """A second session showing the same screen reuses the description"""
+    calls = []
+
+    async def generate_content(model, contents, config):
+        calls.append(contents[1])
+        return SimpleNamespace(text="The match lobby with ten players ready")
+
+    service = VisionService()
+    service._client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+
+    history_a, history_b = deque(maxlen=3), deque(maxlen=3)
+
+    def timings(provider):
+        return REGISTRY.get_sample_value(
+            "nexcast_stage_seconds_count", {"stage": "vision", "provider": provider}
+        ) or 0.0
+
+    async def run():
+        first = await service.analyze_with_context(_jpeg(1), history_a)
+        second = await service.analyze_with_context(_jpeg(1), history_b)
+        return first, second
+
+    before = timings("gemini"), timings("cache")
+    first, second = asyncio.run(run())
+    assert first == second
+    assert len(calls) == 1
+    assert list(history_b) == [second]
+    assert service.cache.stats()["hits"] == 1
+    # The hit is timed as the cache, not as a (very fast) Gemini call
+    assert (timings("gemini"), timings("cache")) == (before[0] + 1, before[1] + 1)
+
+
+def test_vision_cache_reuses_the_dedup_hash_and_skips_contextual_descriptions():
+    """A hash passed in isn't recomputed; descriptions written against history aren't shared"""
+    prompts = []
+
+    async def generate_content(model, contents, config):
+        prompts.append(contents[1])
+        return SimpleNamespace(text=f"Description {len(prompts)}")
+
+    def no_rehash(frame_bytes):
+        raise AssertionError("Frame hashed twice")
+
+    service = VisionService()
+    service._client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+    service._frame_hash = no_rehash
+
+    async def run():
+        contextual = await service.analyze_with_context(_jpeg(2), deque(["Players spawn"], maxlen=3), 0xAAAA)
+        fresh = await service.analyze_with_context(_jpeg(2), deque(maxlen=3), 0xAAAA)
+        reused = await service.analyze_with_context(_jpeg(2), deque(["Anything"], maxlen=3), 0xAAAA)
+        return contextual, fresh, reused
+
+    contextual, fresh, reused = asyncio.run(run())
+    assert "Previous frames" in prompts[0] and contextual == "Description 1"
+    assert fresh == reused == "Description 2" and len(prompts) == 2
+
+
+if __name__ == "__main__":
+    test_lru_evicts_least_recently_used()
+    test_lru_enforces_memory_cap_and_ttl()
+    test_similarity_cache_matches_within_radius()
+    test_vision_cache_hit_skips_gemini_and_updates_context()
+    test_vision_cache_reuses_the_dedup_hash_and_skips_contextual_descriptions()
+    print("✓ Cache tests passed")
@@ -0,0 +1,83 @@
+"""
+Test commentary format validation and the fused vision+commentary mode
+Run: python -m pytest tests/test_commentary.py (no API keys needed)
+"""
+import asyncio
+import json
+from types import SimpleNamespace
+
+from app.services import commentary, fakes, pipeline
+from app.services.commentary import CommentaryFormatError
+from app.services.sessions import SessionState
+from pipeline_fakes import FAST, PassthroughNormalizer, fake_pipeline
+
+FRAME = b"\xff\xd8\xff\xe0fake-jpeg\xff\xd9"
+
+
+class _CountingXai(fakes.FakeXaiClient):
+    """Counts chats opened, i.e. commentaries asked of the LLM"""
+
+    def __init__(self):
+        super().__init__(FAST, token_delay=0)
+        self.calls = 0
+        create = self.chat.create
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return create(*args, **kwargs)
+
+        self.chat.create = counted
+
+
+class _BadFusedGemini(fakes.FakeGeminiClient):
+    """Returns a valid scene but commentary without speaker tags"""
+
+    async def _generate_content(self, model, contents, config=None):
+        return SimpleNamespace(text=json.dumps({"scene": "A quiet lobby", "commentary": "Nothing to see here"}))
+
+
+def _rejects(text: str, dual_speaker: bool) -> bool:
+    try:
+        commentary.validate(text, dual_speaker)
+    except CommentaryFormatError:
+        return True
+    return False
+
+
+def test_validate_accepts_and_tidies_speaker_format():
+    assert commentary.validate("'[excited] Go! |[analytical] Hmm.'", True) == "[excited] Go! | [analytical] Hmm."
+    assert commentary.validate("[dramatic] Overtime! [gasps]", False) == "[dramatic] Overtime! [gasps]"
+    assert _rejects("[excited] Only one speaker", True)
+    assert _rejects("[a] one | [b] two", False)
+    assert _rejects("No tag here | [b] two", True)
+    assert _rejects("[excited] | [b] two", True)
+
+
+def _run(gemini, xai) -> tuple[SessionState, bytes]:
+    session = SessionState("fused", {
+        "speaker1_voice_id": "a", "speaker2_voice_id": "b", "commentary_mode": "fused"
+    }, "binary")
+    with fake_pipeline(gemini=gemini, xai=xai, normalizer=PassthroughNormalizer()):
+        audio = asyncio.run(pipeline.process_frame(session, FRAME))
+    return session, audio
+
+
+def test_fused_mode_skips_the_llm():
+    xai = _CountingXai()
+    session, audio = _run(fakes.FakeGeminiClient(FAST), xai)
+    assert audio and xai.calls == 0
+    assert list(session.history) and session.history[-1] in fakes._DESCRIPTIONS
+
+
+def test_invalid_fused_commentary_falls_back_to_llm():
+    xai = _CountingXai()
+    session, audio = _run(_BadFusedGemini(FAST), xai)
+    assert audio and xai.calls == 1
+    assert list(session.history) == ["A quiet lobby"]
+
+
+if __name__ == "__main__":
+    test_validate_accepts_and_tidies_speaker_format()
+    test_fused_mode_skips_the_llm()
+    test_invalid_fused_commentary_falls_back_to_llm()
+    print("✓ Commentary tests passed")
@@ -0,0 +1,69 @@
+"""
+Test the per-session LLM conversation window and prompt-token tracking
+Run: python -m pytest tests/test_conversation.py (no API keys needed)
+"""
+import asyncio
+
+from app.services import fakes
+from app.services.conversation import Conversation, estimate_tokens
+from app.services.fakes import LatencyModel
+from app.services.llm import LlmService
+
+FAST = LatencyModel(0.001, 0.002)
+
+
+def test_window_stays_within_budget_and_recaps_trimmed_scenes():
+    conversation = Conversation("s", budget=200, summary_budget=40)
+    for i in range(40):
+        conversation.add(f"Scene {i}: the team pushes the payload.", f"[excited] Comment number {i}!")
+        stats = conversation.stats()
+        assert stats["window_tokens"] <= 200
+    assert conversation.trims > 1
+    # Newest exchanges survive, the recap holds the most recent trimmed scenes
+    assert conversation.turns[-1][0].startswith("Scene 39")
+    assert conversation.summary and estimate_tokens(conversation.summary) <= 40
+    oldest_kept = int(conversation.turns[0][0].split(":")[0].split()[1])
+    assert f"Scene {oldest_kept - 1}" in conversation.summary
+
+
+def test_window_is_trimmed_in_steps_not_every_frame():
+    """Between trims the window only grows, so each prompt extends the last one"""
+    conversation = Conversation("s", budget=300, summary_budget=0)
+    for i in range(60):
+        conversation.add(f"Scene {i}", f"[excited] Line {i}")
+    assert 1 <= conversation.trims <= 60 / 5
+
+
+def test_session_conversation_reuses_cached_prefix():
+    llm = LlmService(client=fakes.FakeXaiClient(FAST, token_delay=0))
+    conversation = Conversation(1, budget=2000)
+
+    async def run():
+        for i in range(4):
+            await llm.generate_comment(f"Frame {i}: a fight breaks out at the objective", True, conversation)
+
+    asyncio.run(run())
+    stats = conversation.stats()
+    assert stats["turns"] == 4 and stats["frames"] == 4
+    # Everything but the newest turn was sent before: most prompt tokens are cached
+    assert stats["cached_prompt_tokens"] > stats["prompt_tokens"] / 2
+
+
+def test_stream_comment_records_exchange():
+    llm = LlmService(client=fakes.FakeXaiClient(FAST, token_delay=0))
+    conversation = Conversation(2)
+
+    async def run():
+        return "".join([d async for d in llm.stream_comment("A quiet lobby", False, conversation)])
+
+    comment = asyncio.run(run())
+    assert list(conversation.turns) == [("A quiet lobby", comment.strip())]
+    assert conversation.prompt_tokens > 0
+
+
+if __name__ == "__main__":
+    test_window_stays_within_budget_and_recaps_trimmed_scenes()
+    test_window_is_trimmed_in_steps_not_every_frame()
+    test_session_conversation_reuses_cached_prefix()
+    test_stream_comment_records_exchange()
+    print("✓ Conversation tests passed")
@@ -0,0 +1,129 @@
+"""
+Test per-stage deadlines, hedged requests and fast-model fallback
+Run: python -m pytest tests/test_deadlines.py
+"""
+import asyncio
+
+from app.services.deadlines import HEDGE_MIN_SAMPLES, StagePolicy
+from app.services.limiter import ProviderLimiter
+
+
+def _slow_primary(latency: dict[str, float], calls: list):
+    """Attempt whose latency depends on the model"""
+    async def attempt(model: str) -> str:
+        calls.append(model)
+        await asyncio.sleep(latency[model])
+        return model
+    return attempt
+
+
+def test_missed_deadline_falls_back_to_faster_model():
+    policy = StagePolicy("llm", "big", deadline=0.05, fallback_model="small")
+    calls = []
+    result = asyncio.run(policy.call(_slow_primary({"big": 1.0, "small": 0.01}, calls)))
+    assert result == "small" and calls == ["big", "small"]
+    assert policy.events["deadline_missed"] == 1 and policy.events["fallback"] == 1
+
+
+def test_missed_deadline_without_fallback_fails_fast():
+    policy = StagePolicy("vision", "big", deadline=0.02)
+
+    async def run():
+        try:
+            await policy.call(_slow_primary({"big": 1.0}, []))
+        except asyncio.TimeoutError:
+            return "timeout"
+
+    assert asyncio.run(run()) == "timeout"
+    assert policy.events["deadline_missed"] == 1 and policy.events["fallback"] == 0
+
+
+def test_hedge_fires_after_p95_and_first_response_wins():
+    limiter = ProviderLimiter("test", max_concurrency=4)
+    policy = StagePolicy("tts", "m", deadline=1.0, hedge=True, limiter=limiter)
+    policy._latencies.extend([0.02] * HEDGE_MIN_SAMPLES)
+    delays = iter([0.5, 0.01])  # First attempt stalls, the hedge is fast
+
+    async def attempt(model: str) -> str:
+        await asyncio.sleep(next(delays))  # The policy holds the slot
+        return "ok"
+
+    async def run():
+        start = asyncio.get_running_loop().time()
+        result = await policy.call(attempt)
+        return result, asyncio.get_running_loop().time() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result == "ok" and elapsed < 0.2
+    assert policy.events["hedged"] == 1 and policy.events["hedge_won"] == 1
+    assert limiter.stats()["in_flight"] == 0  # Losing attempt was cancelled and released its slot
+
+
+def test_queue_wait_does_not_count_against_deadline():
+    """Contention on a real limiter: every call waits its turn, none falls back"""
+    limiter = ProviderLimiter("test", max_concurrency=1)
+    policy = StagePolicy("llm", "primary", deadline=0.5, fallback_model="fast", limiter=limiter)
+    calls = []
+
+    async def run():
+        return await asyncio.gather(*(
+            policy.call(_slow_primary({"primary": 0.3, "fast": 0.01}, calls)) for _ in range(4)
+        ))
+
+    assert asyncio.run(run()) == ["primary"] * 4
+    assert calls == ["primary"] * 4
+    assert policy.events["deadline_missed"] == 0 and policy.events["fallback_missed"] == 0
+    assert max(policy._latencies) < 0.45  # Samples are provider time, not queue time
+    assert limiter.stats()["wait_max"] > 0.5  # The last call really did queue
+
+
+def test_fallback_keeps_the_slot():
+    """A missed deadline retries in the slot already held instead of re-queueing"""
+    limiter = ProviderLimiter("test", max_concurrency=1)
+    policy = StagePolicy("llm", "big", deadline=0.05, fallback_model="small", limiter=limiter)
+    order = []
+
+    async def slow_then_fast(model: str) -> str:
+        order.append(model)
+        await asyncio.sleep(1.0 if model == "big" else 0.01)
+        return model
+
+    async def other(model: str) -> str:
+        order.append("other")
+        return model
+
+    async def run():
+        first = asyncio.ensure_future(policy.call(slow_then_fast))
+        await asyncio.sleep(0.01)  # First call holds the only slot
+        second = asyncio.ensure_future(policy.call(other))
+        return await first, await second
+
+    assert asyncio.run(run()) == ("small", "big")
+    assert order == ["big", "small", "other"]
+
+
+def test_stream_deadline_covers_first_item_only():
+    policy = StagePolicy("tts", "slow", deadline=0.05, fallback_model="fast")
+
+    async def attempt(model: str):
+        await asyncio.sleep(1.0 if model == "slow" else 0.0)
+        for i in range(3):
+            if i:
+                await asyncio.sleep(0.03)  # Later chunks may exceed the deadline in total
+            yield f"{model}-{i}"
+
+    async def run():
+        return [chunk async for chunk in policy.stream(attempt)]
+
+    assert asyncio.run(run()) == ["fast-0", "fast-1", "fast-2"]
+    assert policy.events["deadline_missed"] == 1 and policy.events["fallback"] == 1
+
+
+if __name__ == "__main__":
+    test_missed_deadline_falls_back_to_faster_model()
+    test_missed_deadline_without_fallback_fails_fast()
+    test_hedge_fires_after_p95_and_first_response_wins()
+    test_queue_wait_does_not_count_against_deadline()
+    test_fallback_keeps_the_slot()
+    test_stream_deadline_covers_first_item_only()
+    print("✓ Deadline tests passed")
@@ -0,0 +1,66 @@
+"""
+Test the fake provider clients through the real services and pipeline
+Run: python -m pytest tests/test_fakes.py (no API keys needed)
+"""
+import asyncio
+import io
+
+import numpy as np
+from PIL import Image
+
+from app.services import fakes, mp3, pipeline
+from app.services.fakes import FakeProviderError, LatencyModel
+from app.services.sessions import SessionState
+from pipeline_fakes import fake_pipeline
+
+
+def _jpeg() -> bytes:
+    pixels = np.random.default_rng(0).integers(0, 256, size=(360, 640, 3)).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def _session() -> SessionState:
+    return SessionState("load", {"speaker1_voice_id": "a", "speaker2_voice_id": "b"}, "binary")
+
+
+def test_latency_model_matches_median_and_p95():
+    model = LatencyModel(0.5, 1.0)
+    samples = sorted(model.sample() for _ in range(20000))
+    assert 0.45 < samples[10000] < 0.55
+    assert 0.9 < samples[19000] < 1.1
+
+
+def test_fake_providers_produce_playable_audio():
+    with fake_pipeline():
+        audio = asyncio.run(pipeline.process_frame(_session(), _jpeg()))
+    frames = list(mp3.iter_frames(audio))
+    assert frames and len(b"".join(frames)) == len(audio)
+
+
+def test_fake_streaming_yields_ordered_segments():
+    async def run():
+        return [segment async for segment, _ in pipeline.stream_frame(_session(), _jpeg())]
+
+    with fake_pipeline():
+        segments = asyncio.run(run())
+    assert segments and segments == sorted(segments)
+
+
+def test_error_rate_surfaces_provider_errors():
+    with fake_pipeline(gemini=fakes.FakeGeminiClient(LatencyModel(0.0, 0.0, error_rate=1.0))):
+        try:
+            asyncio.run(pipeline.process_frame(_session(), _jpeg()))
+        except FakeProviderError:
+            pass
+        else:
+            raise AssertionError("Expected the injected provider error")
+
+
+if __name__ == "__main__":
+    test_latency_model_matches_median_and_p95()
+    test_fake_providers_produce_playable_audio()
+    test_fake_streaming_yields_ordered_segments()
+    test_error_rate_surfaces_provider_errors()
+    print("✓ Fake provider tests passed")
@@ -0,0 +1,71 @@
+"""
+Test frame normalization before Vision upload
+Run: python -m pytest tests/test_frames.py
+"""
+import asyncio
+import io
+
+import numpy as np
+from PIL import Image
+
+from app.services.frames import FrameNormalizer, frame_options, normalize
+
+
+def _jpeg(width: int, height: int) -> bytes:
+    pixels = np.random.default_rng(0).integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def _size(frame: bytes) -> tuple[tuple[int, int], str]:
+    with Image.open(io.BytesIO(frame)) as image:
+        return image.size, image.mode
+
+
+def test_large_frame_is_downscaled_to_long_edge():
+    """A 1440p frame shrinks to the target long edge and far fewer bytes"""
+    frame = _jpeg(2560, 1440)
+    normalized = normalize(frame, max_edge=1024, quality=75)
+    assert _size(normalized) == ((1024, 576), "RGB")
+    assert len(normalized) < len(frame) / 3
+
+
+def test_small_frame_passes_through_untouched():
+    """Frames already within limits aren't re-encoded"""
+    frame = _jpeg(640, 360)
+    assert normalize(frame, max_edge=1024) is frame
+
+
+def test_grayscale_and_region_of_interest():
+    """ROI crops by fraction before resizing; grayscale drops color"""
+    normalized = normalize(_jpeg(2000, 1000), max_edge=400, grayscale=True, roi=(0.5, 0.0, 0.5, 0.5))
+    assert _size(normalized) == ((400, 200), "L")
+
+
+def test_normalizer_applies_session_preferences():
+    """Per-session ROI overrides the server default and runs off the loop"""
+    normalizer = FrameNormalizer()
+    options = frame_options({"frame_roi": [0, 0, 0.25, 0.5], "frame_grayscale": "false"})
+    normalized = asyncio.run(normalizer.normalize(_jpeg(2000, 1000), options))
+    assert _size(normalized) == ((500, 500), "RGB")
+
+
+def test_bad_frame_preferences_are_ignored_once():
+    """Malformed values fall back to the server default instead of failing every frame"""
+    for roi in ([0, 0, 1], "a,b,c,d", 7, [0.5, 0, 0.6, 1]):
+        assert frame_options({"frame_roi": roi}) == {}, roi
+    assert frame_options({"frame_grayscale": "maybe"}) == {}
+    assert frame_options({"frame_grayscale": "False"}) == {"grayscale": False}
+    assert frame_options({"frame_grayscale": 1, "frame_roi": "0,0,0.5,0.5"}) == {
+        "grayscale": True, "roi": (0.0, 0.0, 0.5, 0.5)
+    }
+
+
+if __name__ == "__main__":
+    test_large_frame_is_downscaled_to_long_edge()
+    test_small_frame_passes_through_untouched()
+    test_grayscale_and_region_of_interest()
+    test_normalizer_applies_session_preferences()
+    test_bad_frame_preferences_are_ignored_once()
+    print("✓ Frame normalization tests passed")
@@ -0,0 +1,181 @@
+"""
+Test the write-behind commentary history writer
+Run: python -m pytest tests/test_history.py (no database needed)
+"""
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes import protocol
+from app.services import fakes, history
+from app.services.fakes import LatencyModel
+from app.services.history import HistorySink, HistoryWriter
+from app.services.llm import LlmService
+from pipeline_fakes import FAST, fake_pipeline
+
+FRAME = b"\xff\xd8\xff\xe0fake-jpeg\xff\xd9"
+
+
+class _RecordingSink(HistorySink):
+    def __init__(self, fail: int = 0, reject_session: int | None = None):
+        self.batches = []
+        self.fail = fail  # Transient failures before writes succeed
+        self.reject_session = reject_session
+
+    async def write(self, rows):
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("database went away")
+        await asyncio.sleep(0)
+        self.batches.append(list(rows))
+        return sum(row.session_id == self.reject_session for row in rows)
+
+
+def _record(writer: HistoryWriter, n: int, session_id: int = 1):
+    for i in range(n):
+        writer.record(session_id, f"Scene {i}", f"[excited] Line {i}", "grok-4-fast")
+
+
+def test_batches_on_size_and_time_triggers():
+    sink = _RecordingSink()
+    writer = HistoryWriter(sink, batch_size=3, flush_interval=0.05)
+
+    async def run():
+        task = asyncio.create_task(writer.run())
+        _record(writer, 2)
+        await asyncio.sleep(0.01)
+        assert sink.batches == []
+        _record(writer, 5)  # A full batch wakes the writer, which drains the queue
+        await asyncio.sleep(0.01)
+        assert [len(b) for b in sink.batches] == [3, 3, 1]
+        _record(writer, 1)
+        await asyncio.sleep(0.1)  # A partial batch goes out on the timer
+        task.cancel()
+
+    asyncio.run(run())
+    assert [len(b) for b in sink.batches] == [3, 3, 1, 1]
+    assert writer.stats()["written"] == 8 and writer.stats()["pending"] == 0
+
+
+def test_failed_write_is_retried_in_order_and_overflow_drops_oldest():
+    sink = _RecordingSink(fail=1)
+    writer = HistoryWriter(sink, batch_size=10, max_pending=4)
+    _record(writer, 6)
+    assert writer.dropped == 2
+
+    asyncio.run(writer.flush())
+    assert sink.batches == [] and writer.failed_writes == 1 and writer.stats()["pending"] == 4
+    asyncio.run(writer.flush())
+    assert [row.scene_description for row in sink.batches[0]] == ["Scene 2", "Scene 3", "Scene 4", "Scene 5"]
+
+
+def test_rejected_rows_are_counted_not_retried():
+    sink = _RecordingSink(reject_session=99)
+    writer = HistoryWriter(sink, batch_size=10)
+    _record(writer, 2)
+    _record(writer, 1, session_id=99)
+    asyncio.run(writer.flush())
+    assert writer.written == 2 and writer.rejected == 1 and writer.stats()["pending"] == 0
+
+
+def test_shutdown_mid_write_keeps_the_batch():
+    """Cancelling the writer during a write leaves the rows for the final flush"""
+    class _SlowSink(_RecordingSink):
+        async def write(self, rows):
+            if not self.batches:
+                self.batches.append(None)  # Stand-in for the write that never lands
+                await asyncio.sleep(60)
+            return await super().write(rows)
+
+    sink = _SlowSink()
+    writer = HistoryWriter(sink, batch_size=2, flush_interval=60)
+
+    async def run():
+        task = asyncio.create_task(writer.run())
+        _record(writer, 3)
+        await asyncio.sleep(0.01)  # First batch of 2 is mid-write
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await writer.close()
+
+    asyncio.run(run())
+    assert [row.scene_description for row in sink.batches[1] + sink.batches[2]] == ["Scene 0", "Scene 1", "Scene 2"]
+    assert writer.written == 3
+
+
+def test_commentary_persisted_on_disconnect():
+    """Audio goes out before any write; the row lands once the client leaves"""
+    sink = _RecordingSink()
+    history._history_writer = HistoryWriter(sink, batch_size=50, flush_interval=60)
+    try:
+        with fake_pipeline(), TestClient(app).websocket_connect("/ws/2101") as ws:
+            ws.send_json({"type": "init", "protocol": "binary", "preferences": {}})
+            ws.receive_json()
+            ws.send_bytes(protocol.pack(protocol.FRAME, 0, FRAME))
+            assert protocol.unpack(ws.receive_bytes())[0] == protocol.AUDIO
+            assert sink.batches == []
+    finally:
+        writer, history._history_writer = history._history_writer, None
+    assert writer.stats()["written"] == 1
+    row = sink.batches[0][0]
+    assert (row.session_id, row.commentator_model) == (2101, "grok-4-fast")
+    assert row.scene_description in fakes._DESCRIPTIONS
+    assert row.commentary_text.split(" Take ")[0] in fakes._COMMENTS
+
+
+class _SlowPrimaryXai(fakes.FakeXaiClient):
+    """The primary model misses its deadline; the fallback answers"""
+
+    def __init__(self, primary: str):
+        super().__init__(FAST, token_delay=0)
+        create = self.chat.create
+
+        def create_slow_primary(model, conversation_id=None, **options):
+            chat = create(model, conversation_id, **options)
+            if model == primary:
+                chat._latency = LatencyModel(1.0, 1.0)
+            return chat
+
+        self.chat.create = create_slow_primary
+
+
+def _persisted_row(preferences: dict, services: dict) -> history.CommentaryRow:
+    sink = _RecordingSink()
+    history._history_writer = HistoryWriter(sink, batch_size=50, flush_interval=60)
+    try:
+        with fake_pipeline(**services), TestClient(app).websocket_connect("/ws/2102") as ws:
+            ws.send_json({"type": "init", "protocol": "binary", "preferences": preferences})
+            ws.receive_json()
+            ws.send_bytes(protocol.pack(protocol.FRAME, 0, FRAME))
+            while True:  # Until the whole clip is out (one AUDIO message, or chunks then audio_end)
+                message = ws.receive()
+                if "bytes" in message and protocol.unpack(message["bytes"])[0] == protocol.AUDIO:
+                    break
+                if "text" in message and json.loads(message["text"])["type"] == "audio_end":
+                    break
+    finally:
+        history._history_writer = None
+    return sink.batches[0][0]
+
+
+def test_history_records_the_model_that_wrote_the_commentary():
+    """A missed deadline is credited to the fallback model, in both speak paths"""
+    llm = LlmService(client=_SlowPrimaryXai("grok-4-fast"))
+    llm.policy.deadline = 0.2
+    for preferences in ({}, {"streaming": True}):
+        row = _persisted_row(preferences, {"llm": llm})
+        assert row.commentator_model == "grok-3-mini", preferences
+    fused = _persisted_row({"commentary_mode": "fused"}, {})
+    assert fused.commentator_model == "gemini-2.5-flash"
+
+
+if __name__ == "__main__":
+    test_batches_on_size_and_time_triggers()
+    test_failed_write_is_retried_in_order_and_overflow_drops_oldest()
+    test_rejected_rows_are_counted_not_retried()
+    test_shutdown_mid_write_keeps_the_batch()
+    test_commentary_persisted_on_disconnect()
+    test_history_records_the_model_that_wrote_the_commentary()
+    print("✓ History tests passed")
@@ -0,0 +1,79 @@
+"""
+Test latest-frame-wins ingest and in-flight cancellation
+Run: python -m pytest tests/test_ingest.py
+"""
+import asyncio
+
+from app.services.ingest import POLICY_CANCEL, POLICY_FINISH, FrameSlot
+
+WORK_TIME = 0.1  # Simulated pipeline time per frame (seconds)
+
+
+async def _burst(policy: str, commit: bool = False) -> tuple[FrameSlot, list[int]]:
+    """Push 5 frames while the first is still processing, then drain"""
+    slot = FrameSlot(policy)
+    completed = []
+
+    async def work(frame):
+        await asyncio.sleep(WORK_TIME / 2)
+        if commit:
+            slot.commit()
+        await asyncio.sleep(WORK_TIME / 2)
+        completed.append(frame)
+
+    async def worker():
+        while True:
+            await slot.run(work(await slot.get()))
+
+    task = asyncio.create_task(worker())
+    slot.put(0)
+    await asyncio.sleep(WORK_TIME / 4)
+    for frame in range(1, 5):
+        slot.put(frame)
+    await asyncio.sleep(WORK_TIME * 3)
+    task.cancel()
+    return slot, completed
+
+
+def test_newest_frame_replaces_waiting_frames():
+    """Only the newest frame runs after the in-flight one finishes"""
+    slot, completed = asyncio.run(_burst(POLICY_FINISH))
+    assert completed == [0, 4]
+    assert slot.stats() == {
+        "policy": POLICY_FINISH, "received": 5, "processed": 2, "dropped": 3, "superseded": 0
+    }
+
+
+def test_cancel_policy_supersedes_in_flight_work():
+    """A newer frame cancels stale work that hasn't sent audio yet"""
+    slot, completed = asyncio.run(_burst(POLICY_CANCEL))
+    assert completed == [4]
+    assert slot.superseded == 1
+    assert slot.dropped == 3
+
+
+def test_cancel_policy_spares_committed_work():
+    """Work that already started sending audio runs to completion"""
+    async def run():
+        slot = FrameSlot(POLICY_CANCEL)
+
+        async def work():
+            slot.commit()
+            await asyncio.sleep(WORK_TIME)
+            return True
+
+        in_flight = asyncio.create_task(slot.run(work()))
+        await asyncio.sleep(WORK_TIME / 2)
+        slot.put(1)
+        return await in_flight, slot
+
+    finished, slot = asyncio.run(run())
+    assert finished
+    assert slot.superseded == 0
+
+
+if __name__ == "__main__":
+    test_newest_frame_replaces_waiting_frames()
+    test_cancel_policy_supersedes_in_flight_work()
+    test_cancel_policy_spares_committed_work()
+    print("✓ Ingest tests passed")
@@ -0,0 +1,67 @@
+"""
+Test that concurrent LLM calls don't serialize on the event loop
+Run: python -m pytest tests/test_llm_concurrency.py (no API key needed)
+"""
+import asyncio
+import gc
+import os
+import time
+
+os.environ.setdefault("XAI_API_KEY", "test-key")
+
+from app.services.llm import LlmService
+
+LATENCY = 0.2  # Simulated Grok response time (seconds)
+
+
+class _FakeResponse:
+    content = "[excited] What a play! | [analytical] Textbook rotation."
+
+
+class _FakeChat:
+    def append(self, message):
+        pass
+
+    async def sample(self):
+        await asyncio.sleep(LATENCY)
+        return _FakeResponse()
+
+
+class _FakeChatClient:
+    def create(self, model):
+        return _FakeChat()
+
+
+def _service(max_concurrency: int) -> LlmService:
+    service = LlmService(max_concurrency=max_concurrency)
+    service._client.chat = _FakeChatClient()
+    return service
+
+
+async def _run_sessions(max_concurrency: int, n: int) -> float:
+    # The async gRPC client must be built inside a running loop
+    service = _service(max_concurrency)
+    gc.collect()  # A full collection of the whole suite's heap mid-run would be timed as LLM latency
+    start = time.perf_counter()
+    await asyncio.gather(*(service.generate_comment(f"frame {i}") for i in range(n)))
+    return time.perf_counter() - start
+
+
+def test_concurrent_sessions_finish_in_time_of_one():
+    """N concurrent sessions take about as long as a single one"""
+    single = asyncio.run(_run_sessions(16, 1))
+    many = asyncio.run(_run_sessions(16, 10))
+    print(f"1 session: {single:.2f}s, 10 sessions: {many:.2f}s")
+    assert many < single * 1.5
+
+
+def test_concurrency_cap_is_enforced():
+    """Calls beyond the cap wait for a free slot"""
+    elapsed = asyncio.run(_run_sessions(2, 4))
+    assert elapsed >= LATENCY * 2
+
+
+if __name__ == "__main__":
+    test_concurrent_sessions_finish_in_time_of_one()
+    test_concurrency_cap_is_enforced()
+    print("✓ LLM concurrency tests passed")
@@ -0,0 +1,65 @@
+"""
+Test per-stage latency metrics and the Prometheus /metrics endpoint
+Run: python -m pytest tests/test_metrics.py (no API keys needed)
+"""
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.main import app
+from app.routes import protocol
+from pipeline_fakes import PassthroughNormalizer, fake_pipeline
+
+FRAME = b"\xff\xd8\xff\xe0fake-jpeg\xff\xd9"
+
+
+def _samples(client: TestClient) -> dict:
+    """{(name, labels): value} from one scrape"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+def _value(samples: dict, name: str, **labels) -> float:
+    return samples.get((name, tuple(sorted(labels.items()))), 0.0)
+
+
+def test_frame_is_timed_per_stage_and_counted():
+    client = TestClient(app)
+    with fake_pipeline(normalizer=PassthroughNormalizer()):
+        before = _samples(client)
+        with client.websocket_connect("/ws/1501") as ws:
+            ws.send_json({"type": "init", "protocol": "binary", "preferences": {"speaker1_voice_id": "a"}})
+            ws.receive_json()
+            during = _samples(client)
+            ws.send_bytes(protocol.pack(protocol.FRAME, 1, FRAME))
+            kind, seq, audio = protocol.unpack(ws.receive_bytes())
+        after = _samples(client)
+
+    assert kind == protocol.AUDIO and seq == 1
+    for stage, provider in (("normalize", "local"), ("vision", "gemini"), ("llm", "grok"),
+                            ("tts", "elevenlabs"), ("send", "websocket")):
+        count = "nexcast_stage_seconds_count"
+        assert _value(after, count, stage=stage, provider=provider) == \
+            _value(before, count, stage=stage, provider=provider) + 1, stage
+
+    def delta(name, **labels):
+        return _value(after, name, **labels) - _value(before, name, **labels)
+
+    assert delta("nexcast_received_bytes_total", kind="binary") == len(protocol.pack(protocol.FRAME, 1, FRAME))
+    assert delta("nexcast_sent_bytes_total", kind="binary") == len(protocol.pack(protocol.AUDIO, 1, audio))
+    assert delta("nexcast_frames_total", outcome="answered") == 1
+    assert delta("nexcast_frame_seconds_count", mode="complete") == 1
+    assert delta("nexcast_provider_queue_wait_seconds_count", provider="gemini") == 1
+    assert _value(during, "nexcast_active_sessions") == _value(before, "nexcast_active_sessions") + 1
+    assert _value(after, "nexcast_active_sessions") == _value(before, "nexcast_active_sessions")
+    assert _value(after, "nexcast_in_flight_frames") == 0
+
+
+if __name__ == "__main__":
+    test_frame_is_timed_per_stage_and_counted()
+    print("✓ Metrics tests passed")
@@ -0,0 +1,115 @@
+"""
+Test server-driven adaptive capture pacing
+Run: python -m pytest tests/test_pacing.py (no server or API key needed)
+"""
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes import protocol
+from app.services import mp3
+from app.services.pacing import PACE_MAX_MS, PACE_MIN_MS, CapturePacer
+from pipeline_fakes import fake_pipeline
+
+FRAME = b"\xff\xd8\xff\xe0fake-jpeg\xff\xd9"
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz: 417-byte frames of 1152 samples
+MP3_FRAME = b"\xff\xfb\x90\x00" + bytes(413)
+
+
+def _pacer(**observed) -> CapturePacer:
+    pacer = CapturePacer(10000, pipeline_depth=2)
+    for _ in range(10):
+        if "distance" in observed:
+            pacer.observe_scene(observed["distance"])
+        if "latency" in observed:
+            pacer.observe_latency(observed["latency"])
+    return pacer
+
+
+def test_scene_change_sets_pace_within_bounds():
+    assert _pacer().recommend() == (10000, "steady")
+    assert _pacer(distance=0, latency=2).recommend() == (20000, "static")
+    assert _pacer(distance=24, latency=2).recommend() == (5000, "action")
+    # No speeding up without spare capacity
+    assert _pacer(distance=24, latency=6).recommend()[0] >= 6000
+    slow = CapturePacer(25000)
+    slow.observe_scene(0)
+    assert slow.recommend()[0] == PACE_MAX_MS
+    fast = CapturePacer(2500)
+    fast.observe_scene(64)
+    assert fast.recommend()[0] == PACE_MIN_MS
+
+
+def test_backs_off_under_load_and_audio_backlog():
+    assert _pacer(distance=12, latency=16).recommend() == (16000, "load")
+    pacer = _pacer(distance=24, latency=2)
+    pacer.audio_sent(9)
+    pacer.audio_sent(9)
+    interval, reason = pacer.recommend()
+    assert reason == "audio" and 15000 < interval <= 16000
+    # A client report overrides the server's own estimate
+    pacer.client_report(0)
+    assert pacer.recommend() == (5000, "action")
+
+
+def test_bad_capture_interval_falls_back_to_default():
+    for bad in (None, "abc", True, -5000, 0, 10 ** 9, float("nan"), float("inf"), [5000]):
+        assert CapturePacer(bad).base == 10.0, bad
+    assert CapturePacer("5000").base == 5.0
+    assert CapturePacer(2500.0).base == 2.5
+
+
+def test_client_report_rejects_non_numbers():
+    pacer = _pacer(distance=12, latency=2)
+    for bad in ("x", None, float("inf"), float("nan"), True):
+        try:
+            pacer.client_report(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"Accepted audio_queued={bad!r}")
+    assert pacer._reported is None
+
+
+def test_update_only_on_meaningful_change():
+    pacer = _pacer(distance=12, latency=2)
+    assert pacer.update() == {"type": "pace", "interval_ms": 10000, "reason": "steady"}
+    pacer.observe_scene(14)
+    assert pacer.update() is None
+    pacer = _pacer(distance=24, latency=2)
+    pacer._sent_ms = 10000
+    assert pacer.update()["interval_ms"] == 5000
+
+
+def test_mp3_duration():
+    assert abs(mp3.duration(MP3_FRAME * 50) - 50 * 1152 / 44100) < 1e-9
+    assert mp3.duration(b"not audio") == 0.0
+
+
+def test_pace_message_follows_audio_for_opted_in_clients():
+    with fake_pipeline(), TestClient(app).websocket_connect("/ws/2001") as ws:
+        ws.send_json({"type": "init", "protocol": "binary", "preferences": {
+            "adaptive_pace": True, "capture_interval": 4000
+        }})
+        ws.receive_json()
+        # Bad playback reports are ignored, not fatal
+        ws.send_json({"type": "playback", "audio_queued": "x"})
+        ws.send_json({"type": "playback", "audio_queued": None})
+        ws.send_bytes(protocol.pack(protocol.FRAME, 0, FRAME))
+        kind, _, audio = protocol.unpack(ws.receive_bytes())
+        assert kind == protocol.AUDIO
+        pace = ws.receive_json()
+    # 6-8 s of audio queued: wait for it rather than capturing every 4 s
+    seconds = mp3.duration(audio)
+    assert seconds > 5
+    assert pace["type"] == "pace" and pace["reason"] == "audio"
+    assert seconds * 1000 - 500 < pace["interval_ms"] <= seconds * 1000
+
+
+if __name__ == "__main__":
+    test_scene_change_sets_pace_within_bounds()
+    test_backs_off_under_load_and_audio_backlog()
+    test_bad_capture_interval_falls_back_to_default()
+    test_client_report_rejects_non_numbers()
+    test_update_only_on_meaningful_change()
+    test_mp3_duration()
+    test_pace_message_follows_audio_for_opted_in_clients()
+    print("✓ Pacing tests passed")
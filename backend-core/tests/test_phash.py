@@ -0,0 +1,78 @@
+"""
+Test perceptual-hash frame deduplication
+Run: python -m pytest tests/test_phash.py
+"""
+import asyncio
+import io
+
+import numpy as np
+from PIL import Image
+
+from app.services.phash import FrameDeduplicator, dhash, hamming
+
+
+def _jpeg(pixels: np.ndarray, quality: int = 80) -> bytes:
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8)).save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def _scene(seed: int) -> np.ndarray:
+    """Blocky random RGB scene at 720p"""
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, size=(9, 16, 3))
+    return np.kron(blocks, np.ones((80, 80, 1)))
+
+
+def test_similar_frames_hash_close_and_different_frames_far():
+    """Re-encoding noise barely moves the hash; a new scene moves it a lot"""
+    base = dhash(_jpeg(_scene(1)))
+    noise = np.random.default_rng(0).normal(0, 3, (720, 1280, 3))
+    reencoded = dhash(_jpeg((_scene(1) + noise).clip(0, 255), quality=60))
+    other = dhash(_jpeg(_scene(2)))
+    assert hamming(base, reencoded) < 5
+    assert hamming(base, other) > 15
+
+
+def test_deduplicator_skips_unchanged_frames():
+    """Only frames that differ from the last answered frame go through"""
+    async def run():
+        dedup = FrameDeduplicator(threshold=5)
+        frames = [_jpeg(_scene(1)), _jpeg(_scene(1), 70), _jpeg(_scene(2)), _jpeg(_scene(2))]
+        results = []
+        for frame in frames:
+            duplicate, frame_hash = await dedup.check(frame)
+            dedup.commit(frame_hash)
+            results.append(duplicate)
+        return results, dedup.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == [False, True, False, True]
+    assert stats["skip_rate"] == 0.5
+
+
+def test_unanswered_frame_does_not_become_the_reference():
+    """A changed frame that is never answered leaves the old reference in place"""
+    async def run():
+        dedup = FrameDeduplicator(threshold=5)
+        dedup.commit((await dedup.check(_jpeg(_scene(1))))[1])
+        changed, _ = await dedup.check(_jpeg(_scene(2)))  # Dropped before its audio went out
+        again, _ = await dedup.check(_jpeg(_scene(2)))
+        return changed, again
+
+    assert asyncio.run(run()) == (False, False)
+
+
+def test_deduplicator_passes_undecodable_frames():
+    """Frames Pillow can't decode are left for Vision to handle"""
+    dedup = FrameDeduplicator(threshold=5)
+    assert asyncio.run(dedup.check(b"not a jpeg")) == (False, None)
+    assert asyncio.run(dedup.check(b"not a jpeg")) == (False, None)
+
+
+if __name__ == "__main__":
+    test_similar_frames_hash_close_and_different_frames_far()
+    test_deduplicator_skips_unchanged_frames()
+    test_unanswered_frame_does_not_become_the_reference()
+    test_deduplicator_passes_undecodable_frames()
+    print("✓ Perceptual hash tests passed")
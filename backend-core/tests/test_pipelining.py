@@ -0,0 +1,122 @@
+"""
+Test stage-level pipelining within a session (vision N+1 overlaps LLM/TTS N)
+Run: python -m pytest tests/test_pipelining.py (no server or API key needed)
+"""
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes import protocol
+from app.routes import ws_stream
+from app.services import fakes, metrics
+from app.services.fakes import LatencyModel
+from app.services.sessions import SessionState
+from pipeline_fakes import fake_pipeline
+
+STAGE_TIME = 0.15  # Simulated latency of vision, LLM and TTS each
+FRAMES = [b"\xff\xd8\xff\xe0frame-%d\xff\xd9" % i for i in range(3)]
+
+
+STAGE = LatencyModel(STAGE_TIME, STAGE_TIME)
+
+
+class _TimedGemini(fakes.FakeGeminiClient):
+    """Notes when each frame enters vision"""
+
+    def __init__(self, events: list):
+        super().__init__(STAGE)
+        self.events = events
+
+    async def _generate_content(self, model, contents, config=None):
+        self.events.append(("vision_start", contents[0].inline_data.data))
+        return await super()._generate_content(model, contents, config)
+
+
+class _TimedElevenLabs(fakes.FakeElevenLabsClient):
+    """Notes when each clip (numbered in order) is done"""
+
+    def __init__(self, events: list):
+        super().__init__(STAGE)
+        convert = self.text_to_speech.convert
+
+        async def timed_convert(text, voice_id, **options):
+            async for chunk in convert(text, voice_id, **options):
+                yield chunk
+            events.append(("tts_done", sum(event == "tts_done" for event, _ in events)))
+
+        self.text_to_speech.convert = timed_convert
+
+
+def _run(depth: int) -> tuple[list[int], list]:
+    """Send three frames back to back (each once the previous is taken), collect audio"""
+    events = []
+    with fake_pipeline(
+        gemini=_TimedGemini(events),
+        xai=fakes.FakeXaiClient(STAGE, token_delay=0),
+        elevenlabs=_TimedElevenLabs(events)
+    ), TestClient(app).websocket_connect(f"/ws/{1700 + depth}") as ws:
+        ws.send_json({"type": "init", "protocol": "binary", "preferences": {"pipeline_depth": depth}})
+        ws.receive_json()
+        seqs = []
+        for seq, frame in enumerate(FRAMES):
+            ws.send_bytes(protocol.pack(protocol.FRAME, seq, frame))
+            # Let the worker take this frame before the next one replaces it
+            time.sleep(STAGE_TIME * (1.1 if depth > 1 else 3.1))
+        for _ in FRAMES:
+            kind, seq, _ = protocol.unpack(ws.receive_bytes())
+            assert kind == protocol.AUDIO
+            seqs.append(seq)
+    return seqs, events
+
+
+def test_vision_for_next_frame_overlaps_speech_for_current():
+    seqs, events = _run(depth=2)
+    assert seqs == [0, 1, 2]  # Audio stays in frame order
+    # Frame 1 entered vision before frame 0's speech was done
+    assert events.index(("vision_start", FRAMES[1])) < events.index(("tts_done", 0))
+
+
+def test_depth_one_runs_stages_back_to_back():
+    seqs, events = _run(depth=1)
+    assert seqs == [0, 1, 2]
+    assert events.index(("vision_start", FRAMES[1])) > events.index(("tts_done", 0))
+
+
+class _StuckSocket:
+    """Accepts nothing: the first send never completes"""
+
+    async def send_bytes(self, data):
+        await asyncio.Event().wait()
+
+    async def send_text(self, text):
+        await asyncio.Event().wait()
+
+
+def test_disconnect_finishes_frames_waiting_to_be_spoken():
+    """Frames described but not yet spoken when the socket goes don't leak in-flight counts"""
+    async def run():
+        session = SessionState("pipelined-leak", {"pipeline_depth": 3}, protocol.PROTOCOL_BINARY)
+        before = metrics.IN_FLIGHT_FRAMES._value.get()
+        worker = asyncio.create_task(ws_stream._pipelined_worker(_StuckSocket(), session))
+        for seq, frame in enumerate(FRAMES):
+            session.ingest.put((seq, frame))
+            await asyncio.sleep(0.05)  # Described and queued behind frame 0's stuck send
+        in_flight = session.frames_in_flight
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        await asyncio.sleep(0)  # Let the cancelled sender run its cleanup
+        return in_flight, session.frames_in_flight, metrics.IN_FLIGHT_FRAMES._value.get() - before
+
+    with fake_pipeline():
+        in_flight, left, gauge = asyncio.run(run())
+    assert in_flight == 3
+    assert left == 0 and gauge == 0
+
+
+if __name__ == "__main__":
+    test_vision_for_next_frame_overlaps_speech_for_current()
+    test_depth_one_runs_stages_back_to_back()
+    test_disconnect_finishes_frames_waiting_to_be_spoken()
+    print("✓ Pipelining tests passed")
@@ -5,6 +5,7 @@ Run: python test_services.py
 import asyncio
 import base64
 import os
+from collections import deque
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -37,7 +38,7 @@ async def test_vision():
     test_image = base64.b64encode(test_image_bytes).decode()
 
     try:
-        result = await service.analyze_with_context(test_image, "test_session_1")
+        result = await service.analyze_with_context(test_image, deque(maxlen=3))
         print(f"✓ Description: {result}")
         return True
     except Exception as e:
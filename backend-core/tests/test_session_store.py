@@ -0,0 +1,204 @@
+"""
+Test the shared session-state backends (in-process and Redis protocol)
+Run: python -m pytest tests/test_session_store.py (no Redis server needed)
+"""
+import asyncio
+
+from app.services.ingest import DEFAULT_PIPELINE_DEPTH
+from app.services.session_store import InMemorySessionStore, RedisSessionStore
+from app.services.sessions import SessionRegistry
+
+
+class _RespStandIn:
+    """Minimal in-process Redis-protocol server covering the commands the store uses"""
+
+    def __init__(self):
+        self.data: dict[str, object] = {}
+        self.ttls: dict[str, int] = {}
+        self._server = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"redis://127.0.0.1:{port}/0"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _read_command(self, reader) -> list[str] | None:
+        header = await reader.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:])):
+            size = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(size + 2))[:-2].decode())
+        return args
+
+    async def _serve(self, reader, writer):
+        while (command := await self._read_command(reader)) is not None:
+            writer.write(self._encode(self._execute(command[0].upper(), command[1:])))
+            await writer.drain()
+        writer.close()
+
+    def _encode(self, value) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if value == "OK":
+            return b"+OK\r\n"
+        if isinstance(value, int):
+            return f":{value}\r\n".encode()
+        if isinstance(value, list):
+            return f"*{len(value)}\r\n".encode() + b"".join(self._encode(str(v)) for v in value)
+        raw = str(value).encode()
+        return f"${len(raw)}\r\n".encode() + raw + b"\r\n"
+
+    def _execute(self, name: str, args: list[str]):
+        if name in ("CLIENT", "SELECT"):
+            return "OK"
+        if name == "SET":
+            self.data[args[0]] = args[1]
+            if len(args) > 3 and args[2].upper() == "EX":
+                self.ttls[args[0]] = int(args[3])
+            return "OK"
+        if name == "GET":
+            return self.data.get(args[0])
+        if name == "RPUSH":
+            items = self.data.setdefault(args[0], [])
+            items.extend(args[1:])
+            return len(items)
+        if name == "LTRIM":
+            items = self.data.get(args[0], [])
+            start, stop = int(args[1]), int(args[2])
+            self.data[args[0]] = items[start:None if stop == -1 else stop + 1]
+            return "OK"
+        if name == "LRANGE":
+            return list(self.data.get(args[0], []))
+        if name == "HINCRBY":
+            fields = self.data.setdefault(args[0], {})
+            fields[args[1]] = int(fields.get(args[1], 0)) + int(args[2])
+            return fields[args[1]]
+        if name == "HGETALL":
+            return [x for pair in self.data.get(args[0], {}).items() for x in pair]
+        if name == "EXPIRE":
+            self.ttls[args[0]] = int(args[1])
+            return 1
+        if name == "DEL":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        raise AssertionError(f"Unexpected command {name}")
+
+
+async def _exercise(store):
+    await store.save_preferences(7, {"speaker1_voice_id": "us"})
+    await store.save_tier(7, "pro")
+    for i in range(5):
+        await store.push_description(7, f"frame {i}", keep=3)
+    await store.incr(7, {"frames_received": 4, "frames_unchanged": 1})
+    await store.incr(7, {"frames_received": 2})
+
+    assert await store.load_preferences(7) == {"speaker1_voice_id": "us"}
+    assert await store.load_tier(7) == "pro"
+    assert await store.descriptions(7) == ["frame 2", "frame 3", "frame 4"]
+    assert await store.counters(7) == {"frames_received": 6, "frames_unchanged": 1}
+
+    await store.delete(7)
+    assert await store.load_preferences(7) is None
+    assert await store.load_tier(7) is None
+    assert await store.descriptions(7) == []
+
+
+def test_in_memory_store():
+    asyncio.run(_exercise(InMemorySessionStore(ttl=60)))
+
+
+def test_in_memory_store_expires_idle_sessions():
+    async def run():
+        store = InMemorySessionStore(ttl=0.05)
+        await store.save_preferences(1, {"streaming": True})
+        await asyncio.sleep(0.06)
+        return await store.load_preferences(1)
+
+    assert asyncio.run(run()) is None
+
+
+def test_redis_store_against_stand_in():
+    server = _RespStandIn()
+
+    async def run():
+        store = RedisSessionStore(await server.start(), ttl=600)
+        try:
+            await _exercise(store)
+            await store.push_description(8, "lobby", keep=3)
+        finally:
+            await store.close()
+            await server.stop()
+
+    asyncio.run(run())
+    assert server.ttls["nexcast:session:{8}:desc"] == 600
+
+
+def test_reconnect_on_another_node_restores_context():
+    """Two registries (two workers/nodes) sharing one store"""
+    server = _RespStandIn()
+
+    async def run():
+        url = await server.start()
+        store_a, store_b = RedisSessionStore(url, ttl=600), RedisSessionStore(url, ttl=600)
+        try:
+            node_a, node_b = SessionRegistry(store=store_a), SessionRegistry(store=store_b)
+            first = await node_a.open(3, {"speaker1_voice_id": "us"}, "json")
+            first.history.append("Ten players in the lobby")
+            await first.share_description("Ten players in the lobby")
+            first.ingest.put((0, b"frame"))
+            await node_a.release(3, first)
+
+            second = await node_b.open(3, {}, "binary")
+            return second, await store_b.counters(3)
+        finally:
+            await store_a.close()
+            await store_b.close()
+            await server.stop()
+
+    second, counters = asyncio.run(run())
+    assert second.preferences == {"speaker1_voice_id": "us"}
+    assert list(second.history) == ["Ten players in the lobby"]
+    assert counters["frames_received"] == 1
+
+
+def test_bad_init_is_persisted_as_parsed():
+    """A reconnect restores the value the session ran with, not what the client sent"""
+    async def run():
+        store = InMemorySessionStore(ttl=60)
+        registry = SessionRegistry(store=store)
+        await registry.open(4, {"speaker1_voice_id": "us"}, "json")
+        await registry.open(4, {"pipeline_depth": "abc"}, "json")
+        reconnected = await registry.open(4, {}, "json")
+        return reconnected, await store.load_preferences(4)
+
+    reconnected, stored = asyncio.run(run())
+    assert stored == {"speaker1_voice_id": "us", "pipeline_depth": DEFAULT_PIPELINE_DEPTH}
+    assert reconnected.preferences == stored and reconnected.pipeline_depth == DEFAULT_PIPELINE_DEPTH
+
+def test_rate_tier_comes_from_the_store_not_the_client():
+    async def run():
+        store = InMemorySessionStore(ttl=60)
+        registry = SessionRegistry(store=store)
+        claimed = await registry.open(5, {"tier": "pro"}, "json")
+        await store.save_tier(6, "pro")
+        granted = await registry.open(6, {}, "json")
+        return claimed, granted
+
+    claimed, granted = asyncio.run(run())
+    assert (claimed.tier, claimed.weight) == ("free", 1.0)
+    assert granted.tier == "pro" and granted.weight > 1.0
+
+
+if __name__ == "__main__":
+    test_in_memory_store()
+    test_in_memory_store_expires_idle_sessions()
+    test_redis_store_against_stand_in()
+    test_reconnect_on_another_node_restores_context()
+    test_bad_init_is_persisted_as_parsed()
+    test_rate_tier_comes_from_the_store_not_the_client()
+    print("✓ Session store tests passed")
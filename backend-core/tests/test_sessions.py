@@ -0,0 +1,108 @@
+"""
+Test the session registry (explicit teardown, idle TTL and LRU cap)
+Run: python -m pytest tests/test_sessions.py
+"""
+import asyncio
+import time
+
+from app.services.ingest import DEFAULT_PIPELINE_DEPTH, MAX_PIPELINE_DEPTH
+from app.services.phash import DEFAULT_THRESHOLD
+from app.services.sessions import SessionRegistry, SessionState
+
+
+def test_capacity_evicts_least_recently_active():
+    registry = SessionRegistry(max_sessions=2)
+    evicted = []
+    for session_id in ("a", "b"):
+        registry.create(session_id, {}, "json").on_evict = lambda reason, sid=session_id: evicted.append((sid, reason))
+    registry.get("a")  # "b" is now least recently active
+    registry.create("c", {}, "json")
+
+    assert evicted == [("b", "capacity")]
+    assert "a" in registry and "c" in registry and "b" not in registry
+    assert registry.stats()["evicted_lru"] == 1
+
+
+def test_idle_sessions_are_reaped():
+    registry = SessionRegistry(idle_ttl=0.05)
+    registry.create("a", {}, "json")
+    time.sleep(0.06)
+    registry.create("b", {}, "json")
+
+    assert "a" not in registry and "b" in registry
+    assert registry.stats()["evicted_idle"] == 1
+
+
+def test_stale_connection_cannot_remove_replacement():
+    """A reconnect under the same id survives the old socket's teardown"""
+    registry = SessionRegistry()
+    old = registry.create("a", {}, "json")
+    new = registry.create("a", {}, "binary")
+
+    assert registry.remove("a", old) is None
+    assert registry.get("a") is new
+    assert registry.remove("a", new) is new
+    assert len(registry) == 0
+
+
+def test_stats_report_memory():
+    registry = SessionRegistry()
+    state = registry.create("a", {"commentator": "grok"}, "json")
+    state.history.append("The match lobby with ten players ready")
+    stats = registry.stats()
+
+    assert stats["live"] == 1
+    assert stats["approx_bytes_total"] == state.approx_bytes() > 0
+
+
+def test_bad_dedup_threshold_falls_back_to_default():
+    for bad in ("abc", None, [5], -1, 65):
+        assert SessionState("a", {"dedup_threshold": bad}, "json").dedup.threshold == DEFAULT_THRESHOLD, bad
+    assert SessionState("a", {"dedup_threshold": "12"}, "json").dedup.threshold == 12
+    assert SessionState("a", {"dedup_threshold": 0}, "json").dedup.threshold == 0
+
+
+def test_bad_pipeline_depth_falls_back_or_clamps():
+    for bad in ("abc", None, [2], 1.5j):
+        state = SessionState("a", {"pipeline_depth": bad}, "json")
+        assert state.pipeline_depth == DEFAULT_PIPELINE_DEPTH, bad
+        assert state.preferences["pipeline_depth"] == DEFAULT_PIPELINE_DEPTH
+    assert SessionState("a", {"pipeline_depth": "3"}, "json").pipeline_depth == min(3, MAX_PIPELINE_DEPTH)
+    assert SessionState("a", {"pipeline_depth": 0}, "json").pipeline_depth == 1
+    assert SessionState("a", {"pipeline_depth": 10 ** 6}, "json").pipeline_depth == MAX_PIPELINE_DEPTH
+
+
+def test_drain_waits_for_in_flight_frames():
+    """Shutdown lets the frame in flight finish, then closes every session"""
+    registry = SessionRegistry()
+    closed, finished = [], []
+
+    async def run():
+        busy = registry.create("busy", {}, "json")
+        busy.on_evict = lambda reason: closed.append(("busy", reason, bool(finished)))
+        registry.create("quiet", {}, "json").on_evict = lambda reason: closed.append(("quiet", reason, bool(finished)))
+
+        async def frame():
+            await asyncio.sleep(0.05)
+            finished.append(True)
+
+        work = asyncio.create_task(busy.ingest.run(frame()))
+        await asyncio.sleep(0)
+        await registry.drain(timeout=1, poll=0.01)
+        await work
+
+    asyncio.run(run())
+    assert registry.draining and len(registry) == 0
+    assert [(sid, reason) for sid, reason, _ in closed] == [("busy", "shutdown"), ("quiet", "shutdown")]
+    assert all(done for _, _, done in closed)
+
+
+if __name__ == "__main__":
+    test_capacity_evicts_least_recently_active()
+    test_idle_sessions_are_reaped()
+    test_stale_connection_cannot_remove_replacement()
+    test_stats_report_memory()
+    test_bad_dedup_threshold_falls_back_to_default()
+    test_bad_pipeline_depth_falls_back_or_clamps()
+    test_drain_waits_for_in_flight_frames()
+    print("✓ Session registry tests passed")
@@ -0,0 +1,99 @@
+"""
+Test the streaming pipeline: LLM tokens -> speech chunks -> streaming TTS
+Run: python -m pytest tests/test_streaming.py (no API key needed)
+"""
+import asyncio
+import time
+
+from app.services import pipeline
+from app.services.chunker import SpeechChunker
+from app.services.deadlines import StagePolicy
+from app.services.sessions import SessionState
+from pipeline_fakes import PassthroughNormalizer, fake_pipeline
+
+COMMENT = (
+    "[excited] Reinhardt just charged in and OBLITERATED their backline! Devastating play! | "
+    "[analytical] Notice how he baited the sleep dart first. Smart."
+)
+TOKEN_DELAY = 0.01  # Simulated Grok inter-token delay (seconds)
+
+
+def _chunk_all(text: str, step: int) -> list[tuple[int, str]]:
+    chunker = SpeechChunker()
+    chunks = []
+    for i in range(0, len(text), step):
+        chunks += chunker.feed(text[i:i + step])
+    return chunks + chunker.flush()
+
+
+def test_chunker_splits_sentences_and_speakers():
+    """Chunks break at sentence ends and at the speaker separator"""
+    expected = [
+        (0, "[excited] Reinhardt just charged in and OBLITERATED their backline!"),
+        (0, "Devastating play!"),
+        (1, "[analytical] Notice how he baited the sleep dart first."),
+        (1, "Smart."),
+    ]
+    # Token boundaries must not change the result
+    for step in (1, 3, 7, len(COMMENT)):
+        assert _chunk_all(COMMENT, step) == expected
+
+
+def test_chunker_merges_short_sentences():
+    """Sentences under min_chars wait for more text"""
+    assert _chunk_all("[gasps] Wow! What a shot from downtown! Incredible.", 4) == [
+        (0, "[gasps] Wow! What a shot from downtown!"),
+        (0, "Incredible."),
+    ]
+
+
+class _FakeVision:
+    async def analyze_with_context(self, frame_base64, history, frame_hash=None):
+        return "Reinhardt charges the enemy backline"
+
+
+class _FakeLlm:
+    policy = StagePolicy("llm", "grok-test")
+
+    async def stream_comment(self, description, dual_speaker=True, conversation=None):
+        for i in range(0, len(COMMENT), 4):
+            await asyncio.sleep(TOKEN_DELAY)
+            yield COMMENT[i:i + 4]
+
+
+class _FakeTTS:
+    async def stream(self, text, voice_id):
+        for _ in range(2):
+            yield f"{voice_id}:{text}|".encode()
+
+
+async def _stream() -> tuple[list[tuple[int, bytes]], float, float]:
+    session = SessionState("test", {"speaker1_voice_id": "us", "speaker2_voice_id": "uk"}, "json")
+
+    start = time.perf_counter()
+    first_audio = None
+    chunks = []
+    async for segment, audio in pipeline.stream_frame(session, b""):
+        if first_audio is None:
+            first_audio = time.perf_counter() - start
+        chunks.append((segment, audio))
+    return chunks, first_audio, time.perf_counter() - start
+
+
+def test_stream_frame_yields_audio_before_llm_finishes():
+    """First audio arrives after the first sentence, not the whole comment"""
+    with fake_pipeline(vision=_FakeVision(), llm=_FakeLlm(), tts=_FakeTTS(), normalizer=PassthroughNormalizer()):
+        chunks, first_audio, total = asyncio.run(_stream())
+    print(f"Time to first audio: {first_audio:.2f}s, total: {total:.2f}s")
+
+    assert first_audio < total / 2
+    assert [segment for segment, _ in chunks] == [0, 0, 1, 1, 2, 2, 3, 3]
+    assert chunks[0][1].startswith(b"us:[excited]")
+    assert chunks[-1][1].startswith(b"uk:Smart.")
+
+
+if __name__ == "__main__":
+    test_chunker_splits_sentences_and_speakers()
+    test_chunker_merges_short_sentences()
+    test_stream_frame_yields_audio_before_llm_finishes()
+    print("✓ Streaming tests passed")
@@ -0,0 +1,153 @@
+"""
+Test multi-speaker TTS: concurrent synthesis and MP3 frame joining
+Run: python -m pytest tests/test_tts.py (no API key needed)
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from app.services import mp3
+from app.services.audio_cache import _DiskTier
+from app.services.deadlines import StagePolicy
+from app.services.tts import TTSService
+
+LATENCY = 0.2  # Simulated ElevenLabs response time (seconds)
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, stereo -> 417-byte frames
+FRAME_HEADER = b"\xff\xfb\x90\x00"
+FRAME_LENGTH = 417
+
+
+def _frame(fill: bytes = b"\x00") -> bytes:
+    return FRAME_HEADER + fill * (FRAME_LENGTH - 4)
+
+
+def _clip(n_frames: int, fill: bytes) -> bytes:
+    """Build a clip the way encoders do: ID3v2 tag, Info frame, audio, ID3v1 tag"""
+    id3v2 = b"ID3\x04\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10
+    info = bytearray(_frame())
+    info[36:40] = b"Info"
+    id3v1 = b"TAG" + b"\x00" * 125
+    return id3v2 + bytes(info) + _frame(fill) * n_frames + id3v1
+
+
+def test_join_keeps_only_audio_frames():
+    """Tags and Info frames are dropped, audio frames are kept in order"""
+    joined = mp3.join(_clip(3, b"\x01"), _clip(2, b"\x02"))
+    assert len(joined) == 5 * FRAME_LENGTH
+    frames = list(mp3.iter_frames(joined))
+    assert [f[4:5] for f in frames] == [b"\x01"] * 3 + [b"\x02"] * 2
+
+
+def test_join_resyncs_after_junk():
+    """Bytes between frames are skipped instead of corrupting the stream"""
+    joined = mp3.join(_frame(b"\x01") + b"junk" + _frame(b"\x02"))
+    assert len(joined) == 2 * FRAME_LENGTH
+
+
+class _FakeTextToSpeech:
+    def __init__(self):
+        self.calls = 0
+
+    async def convert(self, text, voice_id, **options):
+        self.calls += 1
+        await asyncio.sleep(LATENCY)
+        yield _clip(2, b"\x01" if voice_id == "voice-1" else b"\x02")
+
+
+async def _synthesize_dual() -> tuple[bytes, float]:
+    service = TTSService()
+    service._client = SimpleNamespace(text_to_speech=_FakeTextToSpeech())
+    start = time.perf_counter()
+    audio = await service.synthesize(
+        "[excited] What a play! | [analytical] Textbook rotation.",
+        voice_id="voice-1",
+        voice_id_2="voice-2"
+    )
+    return audio, time.perf_counter() - start
+
+
+def test_dual_speaker_runs_concurrently():
+    """Two speakers take about as long as one and join in speaker order"""
+    audio, elapsed = asyncio.run(_synthesize_dual())
+    print(f"Dual-speaker synthesis: {elapsed:.2f}s")
+    assert elapsed < LATENCY * 1.5
+    frames = list(mp3.iter_frames(audio))
+    assert [f[4:5] for f in frames] == [b"\x01"] * 2 + [b"\x02"] * 2
+
+
+def test_repeated_line_is_served_from_cache():
+    """The same line with the same voice settings only hits ElevenLabs once"""
+    async def run():
+        service = TTSService()
+        fake = _FakeTextToSpeech()
+        service._client = SimpleNamespace(text_to_speech=fake)
+        first = await service.synthesize("[gasps] No way!", voice_id="voice-1", voice_id_2=None)
+        second = await service.synthesize("[gasps] No way!", voice_id="voice-1", voice_id_2=None)
+        # Different voice settings are a different clip
+        await service.synthesize("[gasps] No way!", voice_id="voice-1", voice_id_2=None, stability=1.0)
+        return fake.calls, first == second, service.cache.stats()
+
+    calls, same, stats = asyncio.run(run())
+    assert calls == 2
+    assert same
+    assert stats["hits"] == 1 and stats["bytes_saved"] > 0
+
+
+def test_fallback_model_gets_text_without_audio_tags():
+    """A missed deadline retries on Flash, which doesn't understand [tags]"""
+    class _SlowV3:
+        def __init__(self):
+            self.texts = {}
+
+        async def convert(self, text, voice_id, model_id, **options):
+            self.texts[model_id] = text
+            await asyncio.sleep(1.0 if model_id == "eleven_v3" else 0.0)
+            yield _clip(1, b"\x01")
+
+    async def run():
+        service = TTSService()
+        fake = _SlowV3()
+        service._client = SimpleNamespace(text_to_speech=fake)
+        service.policy = StagePolicy("tts", "eleven_v3", deadline=0.05, fallback_model="eleven_flash_v2_5")
+        await service.synthesize("[excited] What a play! [laughs]", voice_id="voice-1", voice_id_2=None)
+        return fake.texts
+
+    texts = asyncio.run(run())
+    assert texts["eleven_v3"] == "[excited] What a play! [laughs]"
+    assert texts["eleven_flash_v2_5"] == "What a play!"
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    """Disk tier stays under its byte cap and survives a restart"""
+    tier = _DiskTier(str(tmp_path), max_bytes=250)
+    tier.put("aa01", b"x" * 100)
+    tier.put("bb02", b"y" * 100)
+    tier.get("aa01")
+    tier.put("cc03", b"z" * 100)
+    assert tier.get("bb02") is None
+    assert _DiskTier(str(tmp_path), max_bytes=250).get("aa01") == b"x" * 100
+
+
+def test_disk_tier_survives_io_errors_and_shares_a_directory(tmp_path):
+    """Workers share clips on disk; a failed read or write is a miss, not an error"""
+    worker_a, worker_b = _DiskTier(str(tmp_path), max_bytes=1000), _DiskTier(str(tmp_path), max_bytes=1000)
+    worker_a.put("aa01", b"x" * 100)
+    assert worker_b.get("aa01") == b"x" * 100
+    assert worker_b.stats()["entries"] == 1
+    assert not list(tmp_path.glob("*/*.tmp"))
+
+    (tmp_path / "dd").write_bytes(b"")  # Shard directory can't be created
+    worker_a.put("dd04", b"y" * 100)
+    (tmp_path / "ee" / "ee05.mp3").mkdir(parents=True)  # Clip can't be read
+    assert worker_a.get("ee05") is None and worker_a.stats()["entries"] == 1
+    assert worker_a.stats()["write_errors"] == 1 and worker_a.stats()["read_errors"] == 1
+
+
+if __name__ == "__main__":
+    test_join_keeps_only_audio_frames()
+    test_join_resyncs_after_junk()
+    test_dual_speaker_runs_concurrently()
+    test_repeated_line_is_served_from_cache()
+    test_fallback_model_gets_text_without_audio_tags()
+    print("✓ TTS tests passed")
@@ -0,0 +1,86 @@
+"""
+Test WebSocket protocol negotiation (binary frames/audio with JSON fallback)
+Run: python -m pytest tests/test_ws_protocol.py (no server or API key needed)
+"""
+import base64
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routes import protocol
+from app.services import fakes, mp3
+from pipeline_fakes import FAST, fake_pipeline
+
+FRAME = b"\xff\xd8\xff\xe0fake-jpeg\xff\xd9"
+
+
+class _RecordingGemini(fakes.FakeGeminiClient):
+    """Keeps the frames vision was asked to describe"""
+
+    def __init__(self):
+        super().__init__(FAST)
+        self.frames = []
+
+    async def _generate_content(self, model, contents, config=None):
+        self.frames.append(contents[0].inline_data.data)
+        return await super()._generate_content(model, contents, config)
+
+
+def _is_mp3(audio: bytes) -> bool:
+    return audio.startswith(b"\xff\xfb") and mp3.duration(audio) > 0
+
+
+def test_binary_protocol_round_trip():
+    """Raw JPEG in, raw MP3 out, frame reaches vision without base64"""
+    gemini = _RecordingGemini()
+    with fake_pipeline(gemini=gemini), TestClient(app).websocket_connect("/ws/1") as ws:
+        ws.send_json({"type": "init", "protocol": "binary", "preferences": {}})
+        assert ws.receive_json() == {"type": "ready", "protocol": "binary"}
+
+        ws.send_bytes(protocol.pack(protocol.FRAME, 7, FRAME))
+        kind, seq, payload = protocol.unpack(ws.receive_bytes())
+
+    assert (kind, seq) == (protocol.AUDIO, 7) and _is_mp3(payload)
+    assert gemini.frames == [FRAME]
+
+
+def test_json_protocol_fallback():
+    """Clients that don't ask for binary keep the base64 JSON protocol"""
+    with fake_pipeline(), TestClient(app).websocket_connect("/ws/2") as ws:
+        ws.send_json({"type": "init", "preferences": {}})
+        assert ws.receive_json() == {"type": "ready", "protocol": "json"}
+
+        ws.send_json({"type": "frame", "frame": base64.b64encode(FRAME).decode()})
+        data = ws.receive_json()
+
+    assert sorted(data) == ["audio", "type"] and data["type"] == "audio"
+    assert _is_mp3(base64.b64decode(data["audio"]))
+
+
+def test_malformed_messages_are_dropped():
+    """Bad binary or JSON messages are skipped; the session keeps going"""
+    gemini = _RecordingGemini()
+    with fake_pipeline(gemini=gemini), TestClient(app).websocket_connect("/ws/3") as ws:
+        ws.send_json({"type": "init", "protocol": "binary", "preferences": {}})
+        ws.receive_json()
+
+        ws.send_bytes(b"\x01")  # Shorter than a header
+        ws.send_bytes(b"\x7f" + b"\x00" * 8)  # Unknown message type
+        ws.send_text("{not json")
+        ws.send_text("[1, 2]")
+        ws.send_json({"type": "frame"})  # No frame
+        ws.send_json({"type": "frame", "frame": 123})
+        ws.send_json({"type": "frame", "frame": ""})
+        ws.send_json({"type": "frame", "frame": "AAAA", "seq": "x"})
+        ws.send_bytes(protocol.pack(protocol.FRAME, 9, FRAME))
+        kind, seq, _ = protocol.unpack(ws.receive_bytes())
+
+    assert (kind, seq) == (protocol.AUDIO, 9)
+    assert gemini.frames == [FRAME]
+
+
+if __name__ == "__main__":
+    test_binary_protocol_round_trip()
+    test_json_protocol_fallback()
+    test_malformed_messages_are_dropped()
+    print("✓ WebSocket protocol tests passed")
@@ -0,0 +1,185 @@
+"""
+Benchmark DB connection reuse across warm Lambda invocations
+Run (from backend-lambda): python -m benchmarks.bench_connections [--fake] [--requests 500] [--containers 20]
+
+A burst of requests is spread over a fixed number of warm containers, each
+handling its share back to back the way Lambda does (one invocation per
+container at a time). Each container gets its own copy of db.connection, so
+module-level state behaves as it would in separate containers. Every request
+opens a connection, runs one history-style query and releases it, once with
+DB_REUSE_CONNECTIONS=false (the old behaviour) and once with reuse.
+
+Reports per-request latency and connection churn (new connections opened).
+Live runs use the DB_* settings and count churn from the server's
+Connections status; --fake swaps pymysql.connect for a simulated server with
+--handshake-ms per connect (TCP + TLS + auth) and --query-ms per round trip.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import statistics
+import threading
+import time
+from pathlib import Path
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+QUERY = "SELECT id, status FROM sessions ORDER BY id DESC LIMIT 1"
+
+
+class _FakeServer:
+    """Counts connections; each connect and round trip costs simulated network time"""
+
+    def __init__(self, handshake: float, round_trip: float):
+        self.handshake = handshake
+        self.round_trip = round_trip
+        self.connects = 0
+        self.open = 0
+        self.peak_open = 0
+        self._lock = threading.Lock()
+
+    def connect(self, **options):
+        time.sleep(self.handshake)
+        with self._lock:
+            self.connects += 1
+            self.open += 1
+            self.peak_open = max(self.peak_open, self.open)
+        return _FakeConnection(self)
+
+    def closed(self):
+        with self._lock:
+            self.open -= 1
+
+
+class _FakeConnection:
+    def __init__(self, server: _FakeServer):
+        self._server = server
+        self.open = True
+        self.server_status = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, args=None):
+        time.sleep(self._server.round_trip)
+        self.server_status |= SERVER_STATUS.SERVER_STATUS_IN_TRANS  # SELECT opens a transaction
+
+    def fetchall(self):
+        return []
+
+    def ping(self, reconnect=False):
+        time.sleep(self._server.round_trip)
+
+    def rollback(self):
+        time.sleep(self._server.round_trip)
+        self.server_status &= ~SERVER_STATUS.SERVER_STATUS_IN_TRANS
+
+    def commit(self):
+        self.rollback()
+
+    def close(self):
+        if self.open:
+            self.open = False
+            self._server.closed()
+
+
+def _load_container(index: int):
+    """A fresh copy of db.connection (its own module-level connection)"""
+    path = Path(__file__).resolve().parent.parent / "db" / "connection.py"
+    spec = importlib.util.spec_from_file_location(f"_container_{index}_connection", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _server_connections() -> int:
+    """Total connections the server has accepted (live runs)"""
+    conn = pymysql.connect(
+        host=os.getenv("DB_PROXY_HOST") or os.getenv("DB_HOST"),
+        database=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        port=int(os.getenv("DB_PORT", "3306")),
+    )
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SHOW GLOBAL STATUS LIKE 'Connections'")
+            return int(cursor.fetchone()[1])
+    finally:
+        conn.close()
+
+
+def _burst(reuse: bool, requests: int, containers: int, fake: _FakeServer | None) -> tuple[list[float], int]:
+    """Run the burst; returns (per-request seconds, connections opened)"""
+    os.environ["DB_REUSE_CONNECTIONS"] = "true" if reuse else "false"
+    modules = [_load_container(i) for i in range(containers)]
+    if fake is not None:
+        pymysql.connect = fake.connect  # Every container's module uses this pymysql
+    latencies: list[float] = []
+    lock = threading.Lock()
+    before = fake.connects if fake is not None else _server_connections()
+
+    def container(module, count: int):
+        for _ in range(count):
+            start = time.perf_counter()
+            conn = module.get_db_connection()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(QUERY)
+                cursor.fetchall()
+            finally:
+                module.release_db_connection(conn)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    shares = [requests // containers + (i < requests % containers) for i in range(containers)]
+    threads = [threading.Thread(target=container, args=(m, n)) for m, n in zip(modules, shares)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Containers going cold close their connections
+    for module in modules:
+        if module._conn is not None:
+            module.release_db_connection(module._conn)
+            module._conn.close()
+
+    after = fake.connects if fake is not None else _server_connections() - 1  # Minus our own status query
+    return latencies, after - before
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="Requests in the burst")
+    parser.add_argument("--containers", type=int, default=20, help="Warm containers serving it")
+    parser.add_argument("--fake", action="store_true", help="Simulated server instead of DB_*")
+    parser.add_argument("--handshake-ms", type=float, default=25.0, help="Simulated connect cost")
+    parser.add_argument("--query-ms", type=float, default=1.0, help="Simulated round trip")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests over {args.containers} containers, "
+          f"{'simulated server' if args.fake else 'live database'}")
+    print(f"{'mode':>15} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'connects':>9} {'peak open':>10}")
+    for name, reuse in (("per-invocation", False), ("reuse", True)):
+        fake = _FakeServer(args.handshake_ms / 1000, args.query_ms / 1000) if args.fake else None
+        with contextlib.redirect_stdout(io.StringIO()):  # Per-container connect logs
+            latencies, connects = _burst(reuse, args.requests, args.containers, fake)
+        peak = str(fake.peak_open) if fake is not None else "-"
+        print(
+            f"{name:>15} {_percentile(latencies, 0.5) * 1000:8.1f} {_percentile(latencies, 0.95) * 1000:8.1f} "
+            f"{_percentile(latencies, 0.99) * 1000:8.1f} {statistics.mean(latencies) * 1000:8.1f} "
+            f"{connects:9d} {peak:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
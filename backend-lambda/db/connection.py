@@ -1,19 +1,133 @@
 import os
+import ssl
+import time
 import pymysql
+from pymysql.constants import SERVER_STATUS
 
-def get_db_connection():
-    """Get a MySQL database connection"""
-    return pymysql.connect(
-        host=os.getenv('DB_HOST'),
+# Keep one connection per container across warm invocations (Lambda runs one
+# invocation per container at a time, so it is never shared concurrently)
+REUSE_CONNECTIONS = os.getenv('DB_REUSE_CONNECTIONS', 'true').lower() == 'true'
+# Ping a reused connection idle for longer than this (seconds); the container may
+# have been frozen past MySQL's wait_timeout. 0 pings on every invocation.
+PING_AFTER = float(os.getenv('DB_PING_AFTER', '10'))
+# RDS Proxy: connect to the proxy endpoint instead of DB_HOST, over TLS, optionally
+# with short-lived IAM auth tokens instead of DB_PASSWORD
+PROXY_HOST = os.getenv('DB_PROXY_HOST')
+IAM_AUTH = os.getenv('DB_IAM_AUTH', 'false').lower() == 'true'
+
+_conn = None
+_last_used = 0.0
+
+# Counters (per container), logged with each new reusable connection
+_stats = {'connects': 0, 'reuses': 0, 'pings': 0, 'reconnects': 0, 'resets': 0}
+
+
+def _password(host, port, user):
+    """DB_PASSWORD, or an IAM auth token (valid 15 minutes, only needed to connect)"""
+    if not IAM_AUTH:
+        return os.getenv('DB_PASSWORD')
+    import boto3
+    return boto3.client('rds').generate_db_auth_token(
+        DBHostname=host, Port=port, DBUsername=user, Region=os.getenv('AWS_REGION')
+    )
+
+
+def _connect():
+    """Open a new MySQL connection (TCP, TLS and auth handshakes)"""
+    host = PROXY_HOST or os.getenv('DB_HOST')
+    port = int(os.getenv('DB_PORT', '3306'))
+    user = os.getenv('DB_USER')
+    options = {}
+    if PROXY_HOST or IAM_AUTH:
+        # RDS Proxy and IAM auth require TLS. Proxy certificates chain to the system
+        # CAs; direct IAM connections need DB_SSL_CA set to the RDS CA bundle.
+        options['ssl'] = {'ca': os.getenv('DB_SSL_CA') or ssl.get_default_verify_paths().openssl_cafile}
+    conn = pymysql.connect(
+        host=host,
         database=os.getenv('DB_NAME'),
-        user=os.getenv('DB_USER'),
-        password=os.getenv('DB_PASSWORD'),
-        port=int(os.getenv('DB_PORT', '3306')),
+        user=user,
+        password=_password(host, port, user),
+        port=port,
         cursorclass=pymysql.cursors.DictCursor,
-        autocommit=False
+        autocommit=False,
+        connect_timeout=5,
+        **options
     )
+    _stats['connects'] += 1
+    if REUSE_CONNECTIONS:
+        print(f"DB connection opened ({'proxy' if PROXY_HOST else 'direct'}), stats: {_stats}")
+    return conn
+
+
+def _in_transaction(conn):
+    """Whether the server reported an open transaction in its last reply (no round trip)"""
+    return bool(conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS)
+
+
+def _discard(conn):
+    global _conn
+    if conn is _conn:
+        _conn = None
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def get_db_connection():
+    """
+    Get a MySQL database connection
+
+    Warm invocations get the container's previous connection back: pinged if it
+    sat idle (reconnecting if the server dropped it) and with any transaction
+    left open by the last invocation rolled back. Set DB_REUSE_CONNECTIONS=false
+    for a fresh connection per invocation.
+    """
+    global _conn
+    if not REUSE_CONNECTIONS:
+        return _connect()
+
+    conn = _conn
+    if conn is not None and conn.open:
+        try:
+            if time.monotonic() - _last_used > PING_AFTER:
+                _stats['pings'] += 1
+                conn.ping(reconnect=False)
+            if _in_transaction(conn):
+                _stats['resets'] += 1
+                conn.rollback()
+            _stats['reuses'] += 1
+            return conn
+        except pymysql.MySQLError:
+            _stats['reconnects'] += 1
+            _discard(conn)
+
+    _conn = _connect()
+    return _conn
+
 
 def release_db_connection(conn):
-    """Close a database connection"""
-    if conn:
+    """
+    Hand a connection back at the end of an invocation
+
+    A reused connection stays open, but its transaction is ended so the next
+    invocation neither inherits uncommitted writes nor reads an old
+    REPEATABLE READ snapshot. Connections in an unknown state are closed.
+    """
+    global _last_used
+    if not conn:
+        return
+    if not REUSE_CONNECTIONS or conn is not _conn:
         conn.close()
+        return
+    try:
+        if _in_transaction(conn):
+            conn.rollback()
+        _last_used = time.monotonic()
+    except Exception:
+        _discard(conn)
+
+
+def connection_stats():
+    """Connects, reuses, pings, reconnects and transaction resets in this container"""
+    return dict(_stats)
@@ -0,0 +1,15 @@
+-- Migration: Denormalized commentary count and keyset index for the history list
+-- Date: 2026-10-18
+--
+-- commentary_count is incremented by the backend-core history writer in the
+-- same transaction as each batch of commentary inserts, so listing sessions
+-- no longer joins and groups over commentaries. The (user_id, started_at, id)
+-- index serves keyset pagination (newest first) without a filesort.
+
+ALTER TABLE sessions
+ADD COLUMN commentary_count INT NOT NULL DEFAULT 0,
+ADD INDEX idx_user_started (user_id, started_at, id);
+
+-- Backfill existing sessions
+UPDATE sessions s
+SET commentary_count = (SELECT COUNT(*) FROM commentaries c WHERE c.session_id = s.id);
@@ -22,7 +22,10 @@ CREATE TABLE IF NOT EXISTS sessions (
     speaking_rate DECIMAL(3,2) DEFAULT 1.0,
     pitch DECIMAL(4,1) DEFAULT 0.0,
     volume INT DEFAULT 100,
+    -- Maintained by the commentary writer (avoids aggregating commentaries per page)
+    commentary_count INT NOT NULL DEFAULT 0,
     INDEX idx_user_sessions (user_id),
+    INDEX idx_user_started (user_id, started_at, id),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
@@ -1,6 +1,19 @@
+import base64
+import gzip
+import hashlib
 import json
+import os
+from datetime import datetime
 from db.connection import get_db_connection, release_db_connection
 
+# Commentaries per /history/{session_id} page (clients pass `limit` up to COMMENTARY_PAGE_MAX)
+COMMENTARY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', '200'))
+COMMENTARY_PAGE_MAX = 1000
+# Bodies at least this large are gzipped for clients that accept it
+GZIP_MIN_BYTES = int(os.getenv('HISTORY_GZIP_MIN_BYTES', '1024'))
+# Bump when the session detail response format changes, so old ETags stop matching
+DETAIL_FORMAT_VERSION = 2
+
 def get_cors_headers(event):
     """Get CORS headers for response"""
     origin = event.get('headers', {}).get('origin', '*')
@@ -14,8 +27,8 @@ def get_cors_headers(event):
 def handler(event, context):
     """
     Session history endpoints
-    GET /history/{session_id}
-    GET /history/list
+    GET /history/{session_id}?limit=&cursor=
+    GET /history/list?limit=&cursor=&include_total=
     """
     # HTTP API v2 event structure
     path = event.get('rawPath', event.get('path', ''))
@@ -63,8 +76,70 @@ def handler(event, context):
     }
 
 
+def encode_cursor(started_at, session_id):
+    """Opaque cursor for the position after a session in newest-first order"""
+    raw = json.dumps([started_at.isoformat(), session_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(started_at, session_id) from a cursor, or raise ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        started_at, session_id = json.loads(raw)
+        return datetime.fromisoformat(started_at), int(session_id)
+    except Exception as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+
+def encode_commentary_cursor(commentary_id):
+    """Opaque cursor for the position after a commentary in a session"""
+    return base64.urlsafe_b64encode(str(commentary_id).encode()).decode().rstrip('=')
+
+
+def decode_commentary_cursor(cursor):
+    """Commentary id from a cursor, or raise ValueError"""
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except Exception as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+
+def get_header(event, name):
+    """Request header by lowercase name (HTTP API lowercases them, REST API doesn't)"""
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def json_response(event, status_code, payload, headers):
+    """JSON response, gzipped when it's large and the client accepts gzip"""
+    body = json.dumps(payload)
+    accepts_gzip = 'gzip' in (get_header(event, 'accept-encoding') or '').lower()
+    if len(body) >= GZIP_MIN_BYTES and accepts_gzip:
+        return {
+            'statusCode': status_code,
+            'headers': {**headers, 'Content-Type': 'application/json', 'Content-Encoding': 'gzip'},
+            'body': base64.b64encode(gzip.compress(body.encode(), compresslevel=6)).decode(),
+            'isBase64Encoded': True
+        }
+    return {
+        'statusCode': status_code,
+        'headers': {**headers, 'Content-Type': 'application/json'},
+        'body': body
+    }
+
+
 def list_sessions(user_sub, event):
-    """List all sessions for a user with pagination"""
+    """
+    List a user's sessions, newest first, with keyset pagination
+
+    Pass the previous page's `next_cursor` as `cursor` to get the next page;
+    each page is an index range scan on (user_id, started_at, id), so it costs
+    the same however deep it is. `include_total=true` adds an exact count
+    (clients only need it once). Legacy `offset` paging still works.
+    """
     cors_headers = get_cors_headers(event)
     conn = None
     try:
@@ -72,39 +147,61 @@ def list_sessions(user_sub, event):
         query_params = event.get('queryStringParameters') or {}
         limit = int(query_params.get('limit', 10))
         offset = int(query_params.get('offset', 0))
+        cursor_param = query_params.get('cursor')
+        include_total = query_params.get('include_total', 'false').lower() == 'true'
 
         # Validate pagination params
         limit = max(1, min(limit, 100))  # Between 1 and 100
         offset = max(0, offset)
+        try:
+            after = decode_cursor(cursor_param) if cursor_param else None
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': cors_headers,
+                'body': json.dumps({'error': str(e)})
+            }
 
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # Get total count for pagination metadata
-        cursor.execute("""
-            SELECT COUNT(DISTINCT s.id) as count
-            FROM sessions s
-            JOIN users u ON u.id = s.user_id
-            WHERE u.cognito_sub = %s
-        """, (user_sub,))
-        total_count = cursor.fetchone()['count']
-
-        cursor.execute("""
+        # Sessions after the cursor (or at the offset); one extra row tells whether there's more
+        keyset = ''
+        params = [user_sub]
+        if after is not None:
+            keyset = 'AND (s.started_at < %s OR (s.started_at = %s AND s.id < %s))'
+            params += [after[0], after[0], after[1]]
+        params.append(limit + 1)
+        paging = 'LIMIT %s'
+        if after is None and offset:
+            paging += ' OFFSET %s'
+            params.append(offset)
+        cursor.execute(f"""
             SELECT s.id, s.started_at, s.ended_at, s.status, s.frame_count,
                    s.voice, s.commentary_style, s.speaking_rate, s.pitch, s.volume,
-                   COUNT(c.id) as commentary_count
+                   s.commentary_count
             FROM sessions s
-            LEFT JOIN commentaries c ON c.session_id = s.id
             JOIN users u ON u.id = s.user_id
-            WHERE u.cognito_sub = %s
-            GROUP BY s.id, s.started_at, s.ended_at, s.status, s.frame_count,
-                     s.voice, s.commentary_style, s.speaking_rate, s.pitch, s.volume
-            ORDER BY s.started_at DESC
-            LIMIT %s OFFSET %s
-        """, (user_sub, limit, offset))
+            WHERE u.cognito_sub = %s {keyset}
+            ORDER BY s.started_at DESC, s.id DESC
+            {paging}
+        """, params)
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        total_count = None
+        if include_total:
+            cursor.execute("""
+                SELECT COUNT(*) as count
+                FROM sessions s
+                JOIN users u ON u.id = s.user_id
+                WHERE u.cognito_sub = %s
+            """, (user_sub,))
+            total_count = cursor.fetchone()['count']
 
         sessions = []
-        for row in cursor.fetchall():
+        for row in rows:
             # Calculate duration
             duration = None
             if row['started_at'] and row['ended_at']:
@@ -127,17 +224,22 @@ def list_sessions(user_sub, event):
                 'commentary_count': row['commentary_count']
             })
 
+        pagination = {
+            'limit': limit,
+            'has_more': has_more,
+            'next_cursor': encode_cursor(rows[-1]['started_at'], rows[-1]['id']) if has_more else None
+        }
+        if after is None:
+            pagination['offset'] = offset
+        if total_count is not None:
+            pagination['total'] = total_count
+
         return {
             'statusCode': 200,
             'headers': cors_headers,
             'body': json.dumps({
                 'sessions': sessions,
-                'pagination': {
-                    'total': total_count,
-                    'limit': limit,
-                    'offset': offset,
-                    'has_more': (offset + limit) < total_count
-                }
+                'pagination': pagination
             })
         }
     except Exception as e:
@@ -151,18 +253,62 @@ def list_sessions(user_sub, event):
             release_db_connection(conn)
 
 
+def session_etag(session_row, after_id, limit):
+    """
+    Weak ETag for one page of an ended session (weak because the gzipped and
+    plain bodies are the same page but not the same bytes)
+
+    Built from what the session row already tells us, so a matching
+    If-None-Match is answered without reading commentaries. commentary_count
+    is part of it because the writer may still flush a session's last rows
+    just after it ends.
+    """
+    key = json.dumps([
+        DETAIL_FORMAT_VERSION, session_row['id'], session_row['ended_at'].isoformat(),
+        session_row['frame_count'], session_row['commentary_count'], after_id, limit
+    ])
+    return 'W/"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(etag, if_none_match):
+    """Whether an If-None-Match header covers the ETag (weak comparison: W/"x" matches "x", * matches any)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return '*' in tags or etag.removeprefix('W/') in tags
+
+
 def get_session_history(session_id, user_sub, event):
-    """Get detailed history for a specific session"""
+    """
+    Get detailed history for a specific session, one page of commentaries at a time
+
+    Commentaries come in id (insertion) order; pass the previous page's
+    `next_cursor` as `cursor` for the next page. Pages of ended sessions never
+    change, so they carry an ETag and a matching If-None-Match gets a 304.
+    """
     cors_headers = get_cors_headers(event)
     conn = None
     try:
+        query_params = event.get('queryStringParameters') or {}
+        limit = max(1, min(int(query_params.get('limit', COMMENTARY_PAGE_SIZE)), COMMENTARY_PAGE_MAX))
+        cursor_param = query_params.get('cursor')
+        try:
+            after_id = decode_commentary_cursor(cursor_param) if cursor_param else 0
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': cors_headers,
+                'body': json.dumps({'error': str(e)})
+            }
+
         conn = get_db_connection()
         cursor = conn.cursor()
 
         # Get session details and verify ownership
         cursor.execute("""
             SELECT s.id, s.started_at, s.ended_at, s.status, s.frame_count,
-                   s.voice, s.commentary_style, s.speaking_rate, s.pitch, s.volume
+                   s.voice, s.commentary_style, s.speaking_rate, s.pitch, s.volume,
+                   s.commentary_count
             FROM sessions s
             JOIN users u ON u.id = s.user_id
             WHERE s.id = %s AND u.cognito_sub = %s
@@ -176,22 +322,40 @@ def get_session_history(session_id, user_sub, event):
                 'body': json.dumps({'error': 'Session not found'})
             }
 
+        # Ended sessions are immutable: let the client revalidate instead of re-downloading
+        headers = {**cors_headers, 'Vary': 'Accept-Encoding'}
+        if session_row['status'] == 'ended' and session_row['ended_at']:
+            etag = session_etag(session_row, after_id, limit)
+            headers.update({'ETag': etag, 'Cache-Control': 'private, no-cache'})
+            if etag_matches(etag, get_header(event, 'if-none-match')):
+                return {
+                    'statusCode': 304,
+                    'headers': headers,
+                    'body': ''
+                }
+        else:
+            headers['Cache-Control'] = 'no-store'
+
         # Calculate duration
         duration = None
         if session_row['started_at'] and session_row['ended_at']:
             duration = int((session_row['ended_at'] - session_row['started_at']).total_seconds())
 
-        # Get commentaries
+        # One page of commentaries (range scan on idx_session_commentaries, which ends in the
+        # primary key); one extra row tells whether there's more
         cursor.execute("""
             SELECT id, commentator_model, scene_description,
                    commentary_text, audio_url, created_at
             FROM commentaries
-            WHERE session_id = %s
-            ORDER BY created_at ASC
-        """, (session_id,))
-
+            WHERE session_id = %s AND id > %s
+            ORDER BY id ASC
+            LIMIT %s
+        """, (session_id, after_id, limit + 1))
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         commentaries = []
-        for row in cursor.fetchall():
+        for row in rows:
             commentaries.append({
                 'id': row['id'],
                 'commentator_model': row['commentator_model'],
@@ -201,26 +365,28 @@ def get_session_history(session_id, user_sub, event):
                 'created_at': row['created_at'].isoformat() if row['created_at'] else None
             })
 
-        return {
-            'statusCode': 200,
-            'headers': cors_headers,
-            'body': json.dumps({
-                'session_id': int(session_id),
-                'started_at': session_row['started_at'].isoformat() if session_row['started_at'] else None,
-                'ended_at': session_row['ended_at'].isoformat() if session_row['ended_at'] else None,
-                'duration': duration,
-                'status': session_row['status'],
-                'frame_count': session_row['frame_count'],
-                'preferences': {
-                    'voice': session_row['voice'],
-                    'commentary_style': session_row['commentary_style'],
-                    'speaking_rate': float(session_row['speaking_rate']) if session_row['speaking_rate'] else 1.0,
-                    'pitch': float(session_row['pitch']) if session_row['pitch'] else 0.0,
-                    'volume': session_row['volume']
-                },
-                'commentaries': commentaries
-            })
-        }
+        return json_response(event, 200, {
+            'session_id': int(session_id),
+            'started_at': session_row['started_at'].isoformat() if session_row['started_at'] else None,
+            'ended_at': session_row['ended_at'].isoformat() if session_row['ended_at'] else None,
+            'duration': duration,
+            'status': session_row['status'],
+            'frame_count': session_row['frame_count'],
+            'preferences': {
+                'voice': session_row['voice'],
+                'commentary_style': session_row['commentary_style'],
+                'speaking_rate': float(session_row['speaking_rate']) if session_row['speaking_rate'] else 1.0,
+                'pitch': float(session_row['pitch']) if session_row['pitch'] else 0.0,
+                'volume': session_row['volume']
+            },
+            'commentary_count': session_row['commentary_count'],
+            'commentaries': commentaries,
+            'pagination': {
+                'limit': limit,
+                'has_more': has_more,
+                'next_cursor': encode_commentary_cursor(rows[-1]['id']) if has_more else None
+            }
+        }, headers)
     except Exception as e:
         return {
             'statusCode': 500,
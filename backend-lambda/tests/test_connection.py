@@ -0,0 +1,88 @@
+"""
+Test warm-container connection reuse against a fake pymysql connection
+Run: python -m pytest tests/test_connection.py (no database needed)
+"""
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+from db import connection
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.open = True
+        self.alive = True
+        self.server_status = 0
+        self.calls = []
+
+    def ping(self, reconnect=True):
+        self.calls.append('ping')
+        if not self.alive:
+            raise pymysql.err.OperationalError(2006, 'MySQL server has gone away')
+
+    def rollback(self):
+        self.calls.append('rollback')
+        self.server_status &= ~SERVER_STATUS.SERVER_STATUS_IN_TRANS
+
+    def close(self):
+        self.calls.append('close')
+        self.open = False
+
+
+def _with_fake_db(test):
+    """Run test(opened) with pymysql.connect handing out fakes (appended to opened)"""
+    opened = []
+
+    def connect(**options):
+        opened.append(_FakeConnection())
+        return opened[-1]
+
+    saved = pymysql.connect, connection.REUSE_CONNECTIONS, connection.PING_AFTER
+    pymysql.connect, connection.REUSE_CONNECTIONS, connection.PING_AFTER = connect, True, 10
+    connection._conn, connection._last_used = None, 0.0
+    try:
+        test(opened)
+    finally:
+        pymysql.connect, connection.REUSE_CONNECTIONS, connection.PING_AFTER = saved
+        connection._conn, connection._last_used = None, 0.0
+
+
+def test_warm_invocation_reuses_the_connection():
+    def test(opened):
+        conn = connection.get_db_connection()
+        connection.release_db_connection(conn)
+        assert connection.get_db_connection() is conn
+        assert len(opened) == 1 and conn.calls == []  # Used recently: no ping
+
+    _with_fake_db(test)
+
+
+def test_dead_connection_is_replaced_after_a_failed_ping():
+    def test(opened):
+        conn = connection.get_db_connection()
+        connection.release_db_connection(conn)
+        conn.alive = False
+        connection._last_used -= connection.PING_AFTER + 1  # Container was frozen
+        replacement = connection.get_db_connection()
+        assert replacement is not conn and len(opened) == 2
+        assert conn.calls == ['ping', 'close'] and not conn.open
+
+    _with_fake_db(test)
+
+
+def test_open_transaction_is_rolled_back_on_release():
+    def test(opened):
+        conn = connection.get_db_connection()
+        conn.server_status |= SERVER_STATUS.SERVER_STATUS_IN_TRANS  # Invocation forgot to commit
+        connection.release_db_connection(conn)
+        assert conn.calls == ['rollback'] and conn.open
+        assert connection.get_db_connection() is conn and conn.calls == ['rollback']
+
+    _with_fake_db(test)
+
+
+if __name__ == '__main__':
+    test_warm_invocation_reuses_the_connection()
+    test_dead_connection_is_replaced_after_a_failed_ping()
+    test_open_transaction_is_rolled_back_on_release()
+    print('✓ Connection reuse tests passed')
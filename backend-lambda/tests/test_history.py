@@ -0,0 +1,175 @@
+"""
+Test the history API's pagination, caching and compression helpers
+Run: python -m pytest tests/test_history.py (no database needed)
+"""
+import base64
+import gzip
+import json
+from datetime import datetime
+
+from functions import history
+
+
+class _FakeCursor:
+    def __init__(self, rows, one=None):
+        self.rows = rows
+        self.one = one
+        self.queries = []
+
+    def execute(self, sql, params):
+        self.queries.append((sql, list(params)))
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.one if self.one is not None else {'count': len(self.rows)}
+
+
+class _FakeConnection:
+    def __init__(self, rows, one=None):
+        self.fake_cursor = _FakeCursor(rows, one)
+
+    def cursor(self):
+        return self.fake_cursor
+
+
+def _session_row(session_id, started_at):
+    return {
+        'id': session_id, 'started_at': started_at, 'ended_at': None, 'status': 'active',
+        'frame_count': 0, 'voice': 'Rachel', 'commentary_style': 'hype', 'speaking_rate': None,
+        'pitch': None, 'volume': 80, 'commentary_count': 0
+    }
+
+
+def _with_db(conn, handler, *args):
+    saved = history.get_db_connection, history.release_db_connection
+    history.get_db_connection, history.release_db_connection = lambda: conn, lambda c: None
+    try:
+        return handler(*args)
+    finally:
+        history.get_db_connection, history.release_db_connection = saved
+
+
+def _list(query_params, rows):
+    """list_sessions against canned rows; returns (response, executed queries)"""
+    conn = _FakeConnection(rows)
+    response = _with_db(conn, history.list_sessions, 'user-sub', {'queryStringParameters': query_params})
+    return response, conn.fake_cursor.queries
+
+
+ENDED_SESSION = {
+    **_session_row(7, datetime(2025, 3, 1, 12, 0)), 'ended_at': datetime(2025, 3, 1, 12, 30), 'status': 'ended'
+}
+COMMENTARIES = [
+    {
+        'id': i, 'commentator_model': 'grok-4-fast', 'scene_description': f'Scene {i}',
+        'commentary_text': 'What a play! ' * 20, 'audio_url': None, 'created_at': datetime(2025, 3, 1, 12, i)
+    }
+    for i in range(1, 11)
+]
+
+
+def _session_history(headers):
+    """get_session_history of an ended session with ten commentaries"""
+    conn = _FakeConnection(COMMENTARIES, one=ENDED_SESSION)
+    return _with_db(conn, history.get_session_history, '7', 'user-sub', {'headers': headers})
+
+
+def test_session_cursor_round_trip():
+    started_at = datetime(2025, 3, 1, 12, 30, 5, 250000)
+    cursor = history.encode_cursor(started_at, 42)
+    assert '=' not in cursor
+    assert history.decode_cursor(cursor) == (started_at, 42)
+
+
+def test_bad_session_cursors_are_rejected():
+    for bad in ('', 'not-base64!', history.encode_cursor(datetime(2025, 1, 1), 1)[:-3], 'WzFd'):
+        try:
+            history.decode_cursor(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f'Accepted cursor {bad!r}')
+    response, queries = _list({'cursor': 'garbage'}, [])
+    assert response['statusCode'] == 400 and queries == []
+
+
+def test_cursor_takes_precedence_over_offset():
+    """A request with both pages by keyset: no OFFSET, and no offset echoed back"""
+    after = datetime(2025, 3, 1, 12, 0)
+    rows = [_session_row(41 - i, datetime(2025, 3, 1, 11, 59 - i)) for i in range(3)]
+    response, queries = _list({'limit': '2', 'offset': '5', 'cursor': history.encode_cursor(after, 42)}, rows)
+
+    sql, params = queries[0]
+    assert 'OFFSET' not in sql and params == ['user-sub', after, after, 42, 3]
+    body = json.loads(response['body'])
+    assert [s['session_id'] for s in body['sessions']] == [41, 40]
+    assert 'offset' not in body['pagination'] and body['pagination']['has_more']
+    assert history.decode_cursor(body['pagination']['next_cursor']) == (rows[1]['started_at'], 40)
+
+
+def test_commentary_cursor_round_trip_and_rejection():
+    assert history.decode_commentary_cursor(history.encode_commentary_cursor(123456)) == 123456
+    for bad in ('', '!!', base64.urlsafe_b64encode(b'12x').decode()):
+        try:
+            history.decode_commentary_cursor(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f'Accepted cursor {bad!r}')
+
+
+def test_if_none_match_uses_weak_comparison():
+    etag = 'W/"abc"'
+    assert history.etag_matches(etag, 'W/"abc"')
+    assert history.etag_matches(etag, '"abc"')
+    assert history.etag_matches(etag, '"other", W/"abc"')
+    assert history.etag_matches(etag, '*')
+    assert not history.etag_matches(etag, '"abcd"')
+    assert not history.etag_matches(etag, '')
+    assert not history.etag_matches(etag, None)
+
+
+def test_large_bodies_are_gzipped_for_clients_that_accept_it():
+    gzip_event = {'headers': {'Accept-Encoding': 'br, GZIP'}}
+    small = {'text': 'x'}
+    large = {'text': 'x' * history.GZIP_MIN_BYTES}
+
+    plain = history.json_response(gzip_event, 200, small, {'Vary': 'Accept-Encoding'})
+    assert 'isBase64Encoded' not in plain and json.loads(plain['body']) == small
+    assert 'Content-Encoding' not in plain['headers'] and plain['headers']['Vary'] == 'Accept-Encoding'
+
+    packed = history.json_response(gzip_event, 200, large, {})
+    assert packed['isBase64Encoded'] and packed['headers']['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(base64.b64decode(packed['body']))) == large
+    assert len(packed['body']) < len(json.dumps(large))
+
+    unaccepted = history.json_response({'headers': {}}, 200, large, {})
+    assert 'isBase64Encoded' not in unaccepted and json.loads(unaccepted['body']) == large
+
+
+def test_session_history_revalidates_and_compresses():
+    first = _session_history({'Accept-Encoding': 'gzip'})
+    etag = first['headers']['ETag']
+    assert first['statusCode'] == 200 and first['headers']['Content-Encoding'] == 'gzip'
+    body = json.loads(gzip.decompress(base64.b64decode(first['body'])))
+    assert len(body['commentaries']) == 10
+
+    cached = _session_history({'If-None-Match': etag})
+    assert cached['statusCode'] == 304 and cached['body'] == ''
+    weak = _session_history({'if-none-match': '"stale", ' + etag.removeprefix('W/')})
+    assert weak['statusCode'] == 304
+
+    changed = _session_history({'If-None-Match': 'W/"stale"'})
+    assert changed['statusCode'] == 200 and 'Content-Encoding' not in changed['headers']
+    assert changed['headers']['ETag'] == etag and len(json.loads(changed['body'])['commentaries']) == 10
+
+
+if __name__ == '__main__':
+    test_session_cursor_round_trip()
+    test_bad_session_cursors_are_rejected()
+    test_cursor_takes_precedence_over_offset()
+    test_commentary_cursor_round_trip_and_rejection()
+    test_if_none_match_uses_weak_comparison()
+    test_large_bodies_are_gzipped_for_clients_that_accept_it()
+    test_session_history_revalidates_and_compresses()
+    print('✓ History API tests passed')
@@ -3,7 +3,9 @@ import type { UseScreenCaptureReturn } from '../interfaces/capture';
 
 /**
  * Hook for capturing screen frames
- * @param captureInterval - Interval between captures in milliseconds (default: 10000ms)
+ * @param captureInterval - Interval between captures in milliseconds (default: 10000ms).
+ * May change while capturing (e.g. server pace updates); the pending capture is rescheduled
+ * to the new interval, counted from the last capture.
  */
 export const useScreenCapture = (
   captureInterval: number = 10000
@@ -17,6 +19,8 @@ export const useScreenCapture = (
   const videoRef = useRef<HTMLVideoElement | null>(null);
   const canvasRef = useRef<HTMLCanvasElement | null>(null);
   const intervalIdRef = useRef<NodeJS.Timeout | null>(null);
+  const captureIntervalRef = useRef(captureInterval);
+  const lastCaptureRef = useRef(0); // Date.now() of the last capture (or of starting)
   const animationIdRef = useRef<number | null>(null);
 
   /**
@@ -54,6 +58,29 @@ export const useScreenCapture = (
     setFrameCount((prev) => prev + 1);
   }, []);
 
+  /**
+   * Schedule the next capture, reading the interval at each tick so pace changes apply
+   * @param delay - Milliseconds until the capture (default: the current interval)
+   */
+  const scheduleCapture = useCallback((delay?: number) => {
+    intervalIdRef.current = setTimeout(() => {
+      lastCaptureRef.current = Date.now();
+      captureFrame();
+      scheduleCapture();
+    }, delay ?? captureIntervalRef.current);
+  }, [captureFrame]);
+
+  // Follow interval changes without restarting the capture: a pending capture
+  // moves to the new interval (a drop from 30 s to 2 s applies now, not in 30 s)
+  useEffect(() => {
+    captureIntervalRef.current = captureInterval;
+    if (intervalIdRef.current) {
+      clearTimeout(intervalIdRef.current);
+      const elapsed = Date.now() - lastCaptureRef.current;
+      scheduleCapture(Math.max(0, captureInterval - elapsed));
+    }
+  }, [captureInterval, scheduleCapture]);
+
   /**
    * Start screen capture
    */
@@ -100,8 +127,9 @@ export const useScreenCapture = (
       // Start continuous preview (30 FPS)
       animationIdRef.current = requestAnimationFrame(renderPreview);
 
-      // Start interval counter for LLM processing (Phase 2)
-      intervalIdRef.current = setInterval(captureFrame, captureInterval);
+      // Start capture timer for LLM processing (Phase 2)
+      lastCaptureRef.current = Date.now();
+      scheduleCapture();
 
       // Handle user stopping screen share
       stream.getVideoTracks()[0].addEventListener('ended', () => {
@@ -115,7 +143,7 @@ export const useScreenCapture = (
       setError(errorMessage);
       console.error('Screen capture error:', err);
     }
-  }, [captureFrame, captureInterval, renderPreview]);
+  }, [scheduleCapture, renderPreview]);
 
   /**
    * Stop screen capture
@@ -127,9 +155,9 @@ export const useScreenCapture = (
       animationIdRef.current = null;
     }
 
-    // Clear interval
+    // Clear capture timer
     if (intervalIdRef.current) {
-      clearInterval(intervalIdRef.current);
+      clearTimeout(intervalIdRef.current);
       intervalIdRef.current = null;
     }
 
@@ -5,6 +5,7 @@ import type { UseWebSocketAudioReturn } from "../interfaces/websocket";
 export const useWebSocketAudio = (): UseWebSocketAudioReturn => {
     const [isConnected, setIsConnected] = useState(false);
     const [error, setError] = useState<string | null>(null);
+    const [recommendedInterval, setRecommendedInterval] = useState<number | null>(null);
     const wsRef = useRef<WebSocket | null>(null);
     const audioContextRef = useRef<AudioContext | null>(null);
     const nextPlayTimeRef = useRef<number>(0);
@@ -43,7 +44,7 @@ export const useWebSocketAudio = (): UseWebSocketAudioReturn => {
                 console.log('WebSocket connected');
                 ws.send(JSON.stringify({
                     type: 'init',
-                    preferences: preferences
+                    preferences: { ...preferences, adaptive_pace: true }
                 }))
             }
 
@@ -56,9 +57,18 @@ export const useWebSocketAudio = (): UseWebSocketAudioReturn => {
                     console.log('WebSocket ready');
                 }
 
+                // Server-recommended capture interval (load, queued audio, scene activity)
+                if (data.type === 'pace') {
+                    setRecommendedInterval(data.interval_ms);
+                    console.log(`Capture pace ${data.interval_ms}ms (${data.reason})`);
+                }
+
                 if (data.type === 'audio') {
                     try {
-                        const audioBytes = Uint8Array.from(atob(data.audio), c=> c.charCodeAt(0))
+                        // Inline base64, or a stored clip to fetch (audio_delivery: 'url')
+                        const audioBytes = data.audio
+                            ? Uint8Array.from(atob(data.audio), c=> c.charCodeAt(0))
+                            : new Uint8Array(await (await fetch(new URL(data.url, wsUrl.replace(/^ws/, 'http')))).arrayBuffer());
 
                         if (!audioContextRef.current) {
                             audioContextRef.current = new AudioContext();
@@ -108,20 +118,27 @@ export const useWebSocketAudio = (): UseWebSocketAudioReturn => {
         // Clear audio queue
         audioQueueRef.current = [];
         nextPlayTimeRef.current = 0;
+        setRecommendedInterval(null);
         setIsConnected(false);
     }, []);
 
     const sendFrame = useCallback((frameBase64: string) => {
         if (wsRef.current?.readyState === WebSocket.OPEN) {
+            // Seconds of commentary still to play, so the server can pace captures
+            const context = audioContextRef.current;
+            const queued = audioQueueRef.current.reduce((total, buffer) => total + buffer.duration, 0)
+                + (context ? Math.max(0, nextPlayTimeRef.current - context.currentTime) : 0);
+
             wsRef.current.send(JSON.stringify({
                 type: 'frame',
-                frame: frameBase64.split(',')[1]    // remove "data:image/jpeg;base64" prefix
+                frame: frameBase64.split(',')[1],    // remove "data:image/jpeg;base64" prefix
+                audio_queued: queued
             }));
             console.log('Frame sent');
         }
     }, []);
 
-    return { isConnected, error, connect, disconnect, sendFrame}
+    return { isConnected, error, recommendedInterval, connect, disconnect, sendFrame}
 }
 
 
@@ -14,9 +14,16 @@ export interface AudioMessage extends WebSocketMessage {
   data: string; // Base64 audio
 }
 
+export interface PaceMessage {
+  type: 'pace';
+  interval_ms: number; // Recommended capture interval
+  reason: 'load' | 'audio' | 'action' | 'static' | 'steady';
+}
+
 export interface UseWebSocketAudioReturn {
   isConnected: boolean;
   error: string | null;
+  recommendedInterval: number | null; // Latest server pace in ms (null until one arrives)
   connect: (sessionId: number, preferences: SessionPreferences) => void;
   disconnect: () => void;
   sendFrame: (frameBase64: string) => void;
@@ -24,8 +24,8 @@ export const Playground = () => {
     capture_interval: 10000,
   });
 
-  // Screen capture hook
-  const capture = useScreenCapture(preferences.capture_interval || 10000);
+  // Screen capture hook (server pace overrides the configured interval once it arrives)
+  const capture = useScreenCapture(wsAudio.recommendedInterval ?? (preferences.capture_interval || 10000));
 
   // Timer ref
   const timerIntervalRef = useRef<NodeJS.Timeout | null>(null);
@@ -13,6 +13,8 @@ export const SessionHistory = () => {
   const [currentPage, setCurrentPage] = useState(1);
   const [totalSessions, setTotalSessions] = useState(0);
   const [hasMore, setHasMore] = useState(false);
+  // cursors[i] fetches page i + 1 (page 1 has none); Previous reuses them
+  const [cursors, setCursors] = useState<(string | undefined)[]>([undefined]);
 
   useEffect(() => {
     loadSessions();
@@ -22,11 +24,19 @@ export const SessionHistory = () => {
     try {
       setIsLoading(true);
       setError(null);
-      const offset = (currentPage - 1) * ITEMS_PER_PAGE;
-      const response = await api.getHistory({ limit: ITEMS_PER_PAGE, offset });
+      // The total only changes when sessions are added, so count once on page 1
+      const response = await api.getHistory({
+        limit: ITEMS_PER_PAGE,
+        cursor: cursors[currentPage - 1],
+        include_total: currentPage === 1,
+      });
       setSessions(response.sessions);
-      setTotalSessions(response.pagination.total);
+      if (response.pagination.total !== undefined) {
+        setTotalSessions(response.pagination.total);
+      }
       setHasMore(response.pagination.has_more);
+      const nextCursor = response.pagination.next_cursor ?? undefined;
+      setCursors((prev) => [...prev.slice(0, currentPage), nextCursor]);
     } catch (err) {
       const errorMessage =
         err instanceof Error ? err.message : 'Failed to load session history';
@@ -58,21 +58,29 @@ export interface Commentary {
 }
 
 export interface SessionDetail extends Session {
-  commentaries: Commentary[];
+  commentaries: Commentary[]; // One page, oldest first
+  pagination: {
+    limit: number;
+    has_more: boolean;
+    next_cursor: string | null;
+  };
 }
 
 export interface PaginationParams {
   limit?: number;
   offset?: number;
+  cursor?: string; // next_cursor of the previous page (takes precedence over offset)
+  include_total?: boolean; // Exact total costs a COUNT, so only ask when it's shown
 }
 
 export interface PaginatedResponse<T> {
   sessions: T[];
   pagination: {
-    total: number;
     limit: number;
-    offset: number;
     has_more: boolean;
+    next_cursor: string | null;
+    offset?: number; // Only for offset requests
+    total?: number; // Only with include_total
   };
 }
 
@@ -111,6 +119,8 @@ export const api = {
     const queryParams = new URLSearchParams();
     if (params?.limit) queryParams.append('limit', params.limit.toString());
     if (params?.offset) queryParams.append('offset', params.offset.toString());
+    if (params?.cursor) queryParams.append('cursor', params.cursor);
+    if (params?.include_total) queryParams.append('include_total', 'true');
 
     const url = `/history/list${queryParams.toString() ? `?${queryParams.toString()}` : ''}`;
     const response = await apiClient.get(url);
@@ -120,8 +130,17 @@ export const api = {
   /**
    * Get detailed information about a specific session
    */
-  async getSessionDetails(sessionId: number): Promise<SessionDetail> {
-    const response = await apiClient.get(`/history/${sessionId}`);
+  async getSessionDetails(
+    sessionId: number,
+    params?: { limit?: number; cursor?: string }
+  ): Promise<SessionDetail> {
+    const queryParams = new URLSearchParams();
+    if (params?.limit) queryParams.append('limit', params.limit.toString());
+    if (params?.cursor) queryParams.append('cursor', params.cursor);
+
+    // Ended sessions carry an ETag, so the browser revalidates repeat views (304)
+    const url = `/history/${sessionId}${queryParams.toString() ? `?${queryParams.toString()}` : ''}`;
+    const response = await apiClient.get(url);
     return response.data;
   },
 